@@ -0,0 +1,122 @@
+"""
+Бенчмарк пропускной способности RLE и шифра Цезаря (МБ/с исходного текста).
+
+Текст — случайные серии латинских и кириллических букв, пробелов и знаков
+препинания (без цифр). Сравниваются:
+  - решения из ноутбука (result += ... по символу; только первые --loop-mb МБ);
+  - кодеки homework_02.textcodecs на строке в памяти;
+  - transform_stream между файлами кусками по --chunk-size.
+Результаты сверяются, декодирование должно вернуть исходный текст.
+
+Запуск из корня проекта:
+    python -m homework_02.benchmarks.textcodecs --size-mb 64 --loop-mb 4
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from homework_02.textcodecs import CHUNK_SIZE, RLEDecoder, RLEEncoder, caesar, transform_stream
+
+ALPHABET = 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZабвгдеёжз  .,!\n'
+
+
+def make_text(size: int, seed: int = 0) -> str:
+    """Текст из size символов с сериями длиной 1-8"""
+    rng = random.Random(seed)
+    parts, length = [], 0
+    while length < size:
+        run = rng.choice(ALPHABET) * rng.choice((1, 1, 1, 2, 2, 3, 5, 8))
+        parts.append(run)
+        length += len(run)
+    return ''.join(parts)[:size]
+
+
+def notebook_rle(string: str) -> str:
+    result = ""
+    count = 1
+    for i in range(1, len(string)):
+        if string[i] == string[i - 1]:
+            count += 1
+        else:
+            result += str(count) + string[i - 1]
+            count = 1
+    result += str(count) + string[-1]
+    return result
+
+
+def notebook_caesar(text: str, key: int) -> str:
+    result = ""
+    for char in text:
+        if 'a' <= char <= 'z':
+            shifted = (ord(char) - ord('a') + key) % 26
+            result += chr(ord('a') + shifted)
+        elif 'A' <= char <= 'Z':
+            shifted = (ord(char) - ord('A') + key) % 26
+            result += chr(ord('A') + shifted)
+        else:
+            result += char
+    return result
+
+
+def throughput(func, size_bytes: int, *args) -> tuple:
+    started = time.perf_counter()
+    result = func(*args)
+    return size_bytes / (time.perf_counter() - started) / 1e6, result
+
+
+def stream_file(source: str, target: str, codec: str, action: str, chunk_size: int) -> None:
+    if codec == 'caesar':
+        with open(source, 'rb') as src, open(target, 'wb') as dst:
+            transform_stream(src, dst, codec, action, 3, chunk_size)
+    else:
+        with open(source, encoding='utf-8', newline='') as src, \
+                open(target, 'w', encoding='utf-8', newline='') as dst:
+            transform_stream(src, dst, codec, action, chunk_size=chunk_size)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size-mb', type=float, default=64, help='размер текста в миллионах символов')
+    parser.add_argument('--loop-mb', type=float, default=4, help='сколько из них прогнать через ноутбук')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    text = make_text(int(args.size_mb * 1e6))
+    size = len(text.encode('utf-8'))
+    sample = text[:int(args.loop_mb * 1e6)]
+    sample_size = len(sample.encode('utf-8'))
+    print(f"text: {size / 1e6:.1f} MB UTF-8, notebook sample: {sample_size / 1e6:.1f} MB")
+
+    loop_rle, expected_rle = throughput(notebook_rle, sample_size, sample)
+    rle, encoded = throughput(RLEEncoder().encode, size, text, True)
+    assert encoded.startswith(expected_rle[:-16]), "RLE output differs from notebook"
+    rle_decode, decoded = throughput(RLEDecoder().decode, size, encoded, True)
+    assert decoded == text, "RLE decode did not restore the text"
+    loop_caesar, expected_caesar = throughput(notebook_caesar, sample_size, sample, 3)
+    caesar_str, shifted = throughput(caesar, size, text, 3)
+    assert shifted.startswith(expected_caesar), "Caesar output differs from notebook"
+    caesar_bytes, _ = throughput(caesar, size, text.encode('utf-8'), 3)
+
+    print(f"{'':>16} {'notebook':>10} {'in memory':>10} {'files':>10}   MB/s")
+    with tempfile.TemporaryDirectory() as directory:
+        plain, coded, restored = (os.path.join(directory, name) for name in ('plain', 'coded', 'restored'))
+        with open(plain, 'w', encoding='utf-8', newline='') as file:
+            file.write(text)
+        for codec, action, loop, memory in (
+            ('rle', 'encode', loop_rle, rle),
+            ('rle', 'decode', None, rle_decode),
+            ('caesar', 'encode', loop_caesar, caesar_bytes),
+        ):
+            source, target = (coded, restored) if action == 'decode' else (plain, coded)
+            files, _ = throughput(stream_file, size, source, target, codec, action, args.chunk_size)
+            if action == 'decode':
+                with open(restored, encoding='utf-8', newline='') as file:
+                    assert file.read() == text, "streamed RLE decode did not restore the text"
+            print(f"{codec + ' ' + action:>16} {f'{loop:.1f}' if loop else '-':>10} {memory:>10.1f} {files:>10.1f}")
+    print(f"caesar on str (str.translate): {caesar_str:.1f} MB/s")
+
+
+if __name__ == '__main__':
+    main()
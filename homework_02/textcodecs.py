@@ -0,0 +1,252 @@
+"""
+Потоковые RLE и шифр Цезаря из заданий 3 и 4
+
+Текст обрабатывается кусками фиксированного размера, поэтому файлы и
+потоки могут быть сколь угодно большими. RLE-кодер и декодер устроены как
+инкрементальные кодеки из стандартного модуля codecs: encode/decode
+принимают очередной кусок и флаг final, а незавершенная серия (или
+число без символа) переносится в следующий кусок. Серии ищутся и
+форматируются векторно (NumPy над кодами символов). Шифр Цезаря —
+таблицы str.translate/bytes.translate, посчитанные один раз на ключ.
+
+Формат RLE как в задании: число повторов и символ (aaab -> 3a1b). Цифры в
+исходном тексте сделали бы запись неоднозначной, поэтому кодер их не
+принимает.
+
+Запуск из корня проекта:
+    python -m homework_02.textcodecs rle encode input.txt output.rle
+    python -m homework_02.textcodecs caesar decode --key 3 < secret.txt
+"""
+import argparse
+import string
+import sys
+from functools import lru_cache
+from typing import BinaryIO, Callable, TextIO, Union
+
+import numpy as np
+
+# Размер куска: символов для текстовых потоков, байт для двоичных
+CHUNK_SIZE = 1024 * 1024
+
+CODECS = ('rle', 'caesar')
+ACTIONS = ('encode', 'decode')
+
+# Счетчик длиннее 18 цифр не помещается в int64
+_MAX_COUNT_DIGITS = 18
+
+_ZERO, _NINE = ord('0'), ord('9')
+
+
+def _code_points(text: str) -> np.ndarray:
+    return np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+
+
+def _text(code_points: np.ndarray) -> str:
+    return code_points.astype(np.uint32, copy=False).tobytes().decode('utf-32-le')
+
+
+def _runs(code_points: np.ndarray):
+    """Символы серий и их длины"""
+    starts = np.flatnonzero(code_points[1:] != code_points[:-1]) + 1
+    starts = np.concatenate([[0], starts])
+    counts = np.diff(np.append(starts, len(code_points)))
+    return code_points[starts], counts
+
+
+def _format_runs(chars: np.ndarray, counts: np.ndarray) -> str:
+    """Запись серий в виде 'число символ' без цикла по сериям"""
+    if not len(chars):
+        return ''
+    digits = np.ones(len(counts), dtype=np.int64)
+    power = 10
+    while (counts >= power).any():
+        digits += counts >= power
+        power *= 10
+    ends = np.cumsum(digits + 1)
+    starts = ends - digits - 1
+    out = np.empty(ends[-1], dtype=np.uint32)
+    for position in range(int(digits.max())):
+        runs = digits > position
+        exponent = digits[runs] - 1 - position
+        out[starts[runs] + position] = _ZERO + counts[runs] // 10 ** exponent % 10
+    out[ends - 1] = chars
+    return _text(out)
+
+
+class RLEEncoder:
+    """Инкрементальный RLE-кодер: последняя серия куска ждет продолжения в следующем"""
+
+    def __init__(self):
+        self._char = 0
+        self._count = 0
+
+    def encode(self, text: str, final: bool = False) -> str:
+        """
+        Кодирование очередного куска
+
+        :param text: кусок текста без цифр
+        :param final: последний кусок (вывести отложенную серию)
+        :raises ValueError: если в тексте есть цифры
+        """
+        code_points = _code_points(text)
+        if ((code_points >= _ZERO) & (code_points <= _NINE)).any():
+            raise ValueError("RLE input must not contain digits")
+        out = ''
+        if len(code_points):
+            chars, counts = _runs(code_points)
+            if self._count and chars[0] == self._char:
+                counts[0] += self._count
+            elif self._count:
+                chars = np.concatenate([[self._char], chars])
+                counts = np.concatenate([[self._count], counts])
+            self._char, self._count = int(chars[-1]), int(counts[-1])
+            out = _format_runs(chars[:-1], counts[:-1])
+        if final:
+            out += self.flush()
+        return out
+
+    def flush(self) -> str:
+        """Вывод отложенной серии"""
+        out = f'{self._count}{chr(self._char)}' if self._count else ''
+        self._char, self._count = 0, 0
+        return out
+
+
+class RLEDecoder:
+    """Инкрементальный RLE-декодер: число в конце куска ждет свой символ в следующем"""
+
+    def __init__(self):
+        self._pending = ''
+
+    def decode(self, text: str, final: bool = False) -> str:
+        """
+        Декодирование очередного куска
+
+        :param text: кусок закодированного текста
+        :param final: последний кусок
+        :raises ValueError: если у символа нет числа или в конце нет символа
+        """
+        code_points = _code_points(self._pending + text)
+        is_digit = (code_points >= _ZERO) & (code_points <= _NINE)
+        chars = np.flatnonzero(~is_digit)
+        tail = int(chars[-1]) + 1 if len(chars) else 0
+        self._pending = _text(code_points[tail:])
+        if final and self._pending:
+            raise ValueError("RLE input ends with a count without a character")
+        if not len(chars):
+            return ''
+
+        # Серия g занимает позиции от starts[g] до chars[g] включительно: цифры и символ
+        starts = np.concatenate([[0], chars[:-1] + 1])
+        lengths = chars - starts
+        if not lengths.all():
+            raise ValueError(f"RLE count is missing before position {int(chars[lengths == 0][0])}")
+        if (lengths > _MAX_COUNT_DIGITS).any():
+            raise ValueError("RLE count is too large")
+        if (lengths == 1).all():
+            counts = code_points[chars - 1].astype(np.int64) - _ZERO
+        else:
+            # Порядок цифры — расстояние до символа своей серии
+            exponent = np.repeat(chars, lengths + 1) - 1 - np.arange(tail)
+            values = np.where(is_digit[:tail], code_points[:tail].astype(np.int64) - _ZERO, 0)
+            values *= np.power(10, np.maximum(exponent, 0), dtype=np.int64)
+            counts = np.add.reduceat(values, starts)
+        return _text(np.repeat(code_points[chars], counts))
+
+
+@lru_cache(maxsize=None)
+def caesar_table(key: int) -> dict:
+    """Таблица str.translate для сдвига на key"""
+    key %= 26
+    lower, upper = string.ascii_lowercase, string.ascii_uppercase
+    return str.maketrans(lower + upper, lower[key:] + lower[:key] + upper[key:] + upper[:key])
+
+
+@lru_cache(maxsize=None)
+def caesar_bytes_table(key: int) -> bytes:
+    """
+    Таблица bytes.translate для сдвига на key
+
+    Латинские буквы в UTF-8 однобайтовые, а байты многобайтовых символов
+    всегда больше 127, поэтому таблица подходит для текста в UTF-8 и ASCII.
+    """
+    key %= 26
+    lower, upper = string.ascii_lowercase.encode(), string.ascii_uppercase.encode()
+    return bytes.maketrans(lower + upper, lower[key:] + lower[:key] + upper[key:] + upper[:key])
+
+
+def caesar(text: Union[str, bytes], key: int) -> Union[str, bytes]:
+    """Сдвиг латинских букв на key (для расшифровки — на -key), остальное без изменений"""
+    if isinstance(text, (bytes, bytearray)):
+        return text.translate(caesar_bytes_table(key))
+    return text.translate(caesar_table(key))
+
+
+def transformer(codec: str, action: str, key: int = 0) -> Callable[[Union[str, bytes], bool], Union[str, bytes]]:
+    """
+    Функция (кусок, final) -> результат для codec и action
+
+    Для RLE функция хранит состояние между кусками одного потока.
+    """
+    if codec not in CODECS:
+        raise ValueError(f"Unknown codec: {codec}; expected one of {CODECS}")
+    if action not in ACTIONS:
+        raise ValueError(f"Unknown action: {action}; expected one of {ACTIONS}")
+    if codec == 'caesar':
+        shift = key if action == 'encode' else -key
+        return lambda chunk, final: caesar(chunk, shift)
+    return RLEEncoder().encode if action == 'encode' else RLEDecoder().decode
+
+
+def transform_stream(source: Union[TextIO, BinaryIO], target: Union[TextIO, BinaryIO], codec: str,
+                     action: str, key: int = 0, chunk_size: int = CHUNK_SIZE) -> None:
+    """
+    Перекодирование потока кусками по chunk_size
+
+    Для RLE нужны текстовые потоки, шифр Цезаря работает и с двоичными.
+    """
+    transform = transformer(codec, action, key)
+    chunk = source.read(chunk_size)
+    while chunk:
+        following = source.read(chunk_size)
+        target.write(transform(chunk, not following))
+        chunk = following
+    if codec == 'rle':
+        # Пустой поток: final еще не передавался
+        target.write(transform('', True))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('codec', choices=CODECS)
+    parser.add_argument('action', choices=ACTIONS)
+    parser.add_argument('input', nargs='?', default='-', help="файл или '-' для stdin")
+    parser.add_argument('output', nargs='?', default='-', help="файл или '-' для stdout")
+    parser.add_argument('--key', type=int, default=3, help='сдвиг шифра Цезаря')
+    parser.add_argument('--encoding', default='utf-8', help='кодировка текста для RLE')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    # Шифр Цезаря меняет только ASCII-байты, поэтому файлы читаются без декодирования
+    binary = args.codec == 'caesar'
+    if args.input == '-':
+        source = sys.stdin.buffer if binary else open(sys.stdin.fileno(), encoding=args.encoding,
+                                                      newline='', closefd=False)
+    else:
+        source = open(args.input, 'rb') if binary else open(args.input, encoding=args.encoding, newline='')
+    if args.output == '-':
+        target = sys.stdout.buffer if binary else open(sys.stdout.fileno(), 'w', encoding=args.encoding,
+                                                       newline='', closefd=False)
+    else:
+        target = open(args.output, 'wb') if binary else open(args.output, 'w', encoding=args.encoding, newline='')
+    try:
+        transform_stream(source, target, args.codec, args.action, args.key, args.chunk_size)
+    except ValueError as error:
+        parser.exit(1, f"{parser.prog}: error: {error}\n")
+    finally:
+        source.close()
+        target.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""
+Бенчмарк памяти на запись: список объектов MediaFile против колоночной MediaColumns.
+
+Для сравнения «до/после» замеряется и прежняя иерархия с __dict__ (классы
+Dict*File ниже повторяют атрибуты исходных классов без __slots__).
+
+Запуск из корня проекта:
+    python -m homework_04.benchmarks.media_memory --records 200000
+"""
+import argparse
+import gc
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Callable, Iterator, List, Tuple
+from homework_04.domain.audiofile import AudioFile
+from homework_04.domain.collection import MediaColumns
+from homework_04.domain.photofile import PhotoFile
+from homework_04.domain.videofile import VideoFile
+
+
+class DictMediaFile:
+    """MediaFile до перехода на __slots__: атрибуты в __dict__, словарь метаданных есть всегда."""
+
+    def __init__(self, name: str, size: int, owner: str, content=None, created_at: datetime = None, **metadata):
+        self.name = name
+        self.size = size
+        self.owner = owner
+        self._content = content
+        self.created_at = created_at or datetime.now()
+        self.metadata = metadata
+
+
+class DictAudioFile(DictMediaFile):
+    def __init__(self, name: str, size: int, owner: str, duration: float, bitrate: int, codec: str, **kwargs):
+        super().__init__(name, size, owner, **kwargs)
+        self.duration = duration
+        self.bitrate = bitrate
+        self.codec = codec
+
+
+class DictVideoFile(DictMediaFile):
+    def __init__(self, name: str, size: int, owner: str,
+                 duration: float, resolution: str, codec: str, fps: float, **kwargs):
+        super().__init__(name, size, owner, **kwargs)
+        self.duration = duration
+        self.resolution = resolution
+        self.codec = codec
+        self.fps = fps
+
+
+class DictPhotoFile(DictMediaFile):
+    def __init__(self, name: str, size: int, owner: str, resolution: str, camera_model: str = None, **kwargs):
+        super().__init__(name, size, owner, **kwargs)
+        self.resolution = resolution
+        self.camera_model = camera_model
+
+
+SLOTS_CLASSES = (AudioFile, VideoFile, PhotoFile)
+DICT_CLASSES = (DictAudioFile, DictVideoFile, DictPhotoFile)
+
+
+def make_records(n: int, classes: Tuple[type, type, type] = SLOTS_CLASSES) -> List[object]:
+    """Список записей, похожих на строки каталога (см. iter_records)."""
+    return list(iter_records(n, classes))
+
+
+def iter_records(n: int, classes: Tuple[type, type, type] = SLOTS_CLASSES) -> Iterator[object]:
+    """
+    Генерирует записи, похожие на строки каталога (владельцы и кодеки повторяются).
+
+    :param classes: классы аудио, видео и фото
+    """
+    audio, video, photo = classes
+    start = datetime(2024, 1, 1)
+    for i in range(n):
+        common = dict(name=f'file_{i:08d}', size=i * 1024, owner=f'user{i % 5000}',
+                      created_at=start + timedelta(seconds=i))
+        kind = i % 3
+        if kind == 0:
+            yield audio(duration=float(i % 600), bitrate=320, codec='mp3', **common)
+        elif kind == 1:
+            yield video(duration=float(i % 7200), resolution='1920x1080', codec='h264', fps=25.0, **common)
+        else:
+            yield photo(resolution='6000x4000', camera_model='X100V', **common)
+
+
+def measure(build: Callable[[], object], n: int) -> float:
+    """Средний прирост памяти (байт на запись) при построении коллекции."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    collection = build()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del collection
+    return used / n
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, default=200000)
+    args = parser.parse_args()
+    n = args.records
+
+    dicts = measure(lambda: make_records(n, DICT_CLASSES), n)
+    objects = measure(lambda: make_records(n), n)
+    # Записи создаются внутри замера: строки и даты, которые колонки сохраняют, тоже учитываются
+    columns = measure(lambda: MediaColumns(iter_records(n)), n)
+
+    print(f"{n} records")
+    print(f"list[MediaFile] (__dict__):   {dicts:8.1f} bytes/record")
+    print(f"list[MediaFile] (__slots__):  {objects:8.1f} bytes/record")
+    print(f"MediaColumns:                 {columns:8.1f} bytes/record")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Бенчмарк поиска почти дубликатов: HashIndex (multi-index hashing) против линейного перебора.
+
+Индекс заполняется случайными 64-битными хешами, часть из которых —
+искаженные копии (несколько измененных бит) других, затем для выборки
+запросов ищутся хеши на расстоянии Хэмминга <= k обоими способами;
+результаты сверяются.
+
+Запуск из корня проекта:
+    python -m homework_04.benchmarks.phash_search --hashes 1000000 --queries 200
+"""
+import argparse
+import time
+import numpy as np
+from homework_04.domain.phash import hash_images
+from homework_04.infra.similarity import HashIndex
+
+
+def make_hashes(n: int, duplicates: float, rng: np.random.Generator) -> np.ndarray:
+    """Случайные хеши, доля duplicates из которых — копии других с 1..6 измененными битами."""
+    hashes = rng.integers(0, 2 ** 63, size=n, dtype=np.int64).astype(np.uint64) << np.uint64(1)
+    hashes |= rng.integers(0, 2, size=n, dtype=np.int64).astype(np.uint64)
+    copies = rng.random(n) < duplicates
+    sources = rng.integers(0, n, size=int(copies.sum()))
+    flips = np.zeros(len(sources), dtype=np.uint64)
+    for _ in range(6):
+        bits = rng.integers(0, 64, size=len(sources)).astype(np.uint64)
+        flips ^= np.where(rng.random(len(sources)) < 0.7, np.uint64(1) << bits, np.uint64(0))
+    hashes[copies] = hashes[sources] ^ flips
+    return hashes
+
+
+def timed(func, queries) -> tuple:
+    started = time.perf_counter()
+    results = [func(int(query)) for query in queries]
+    return (time.perf_counter() - started) / len(queries), results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--hashes', type=int, default=1000000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--duplicates', type=float, default=0.2)
+    parser.add_argument('--images', type=int, default=500, help='изображений для замера хеширования')
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    images = [rng.integers(0, 256, size=(480, 640, 3), dtype=np.uint8) for _ in range(args.images)]
+    started = time.perf_counter()
+    hash_images(images)
+    print(f"hash_images: {args.images / (time.perf_counter() - started):.0f} images/s (640x480 RGB)")
+
+    hashes = make_hashes(args.hashes, args.duplicates, rng)
+    index = HashIndex()
+    started = time.perf_counter()
+    index.add_many((f'photo_{i:08d}', int(value)) for i, value in enumerate(hashes))
+    print(f"index build: {args.hashes} hashes in {time.perf_counter() - started:.2f}s")
+
+    queries = hashes[rng.integers(0, args.hashes, size=args.queries)]
+    print(f"{'k':>3} {'index ms':>9} {'linear ms':>10} {'speedup':>8} {'avg found':>10}")
+    for k in (2, 4, 8, 10):
+        indexed, found = timed(lambda value: index.search(value, k), queries)
+        linear, expected = timed(lambda value: index.search_linear(value, k), queries)
+        assert found == expected, f"index and linear scan disagree for k={k}"
+        print(f"{k:>3} {indexed * 1000:>9.3f} {linear * 1000:>10.3f} {linear / indexed:>7.1f}x "
+              f"{np.mean([len(r) for r in found]):>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
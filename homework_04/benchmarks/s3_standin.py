@@ -0,0 +1,151 @@
+"""
+Локальная замена S3 для бенчмарков.
+
+Бакет поднимается в памяти через moto, а сеть имитируется хуками botocore:
+каждый запрос платит фиксированный RTT и передает тело с ограниченной
+пропускной способностью одного соединения. FaultInjector добавляет отказы:
+троттлинг (503 SlowDown), внутренние ошибки (500) и «отстающие» запросы.
+"""
+import random
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from types import SimpleNamespace
+from typing import Any, Iterable, Iterator, Optional
+from moto import mock_aws
+from homework_04.infra.storage.resilience import wait_cancelled
+from homework_04.infra.storage.s3 import S3Storage
+
+MB = 1024 * 1024
+
+
+def _body_size(body: Any) -> int:
+    """Размер тела запроса botocore (bytes или file-like)."""
+    if body is None:
+        return 0
+    if isinstance(body, (bytes, bytearray, memoryview)):
+        return len(body)
+    if hasattr(body, 'seek') and hasattr(body, 'tell'):
+        position = body.tell()
+        size = body.seek(0, 2) - position
+        body.seek(position)
+        return size
+    return 0
+
+
+def install_network(client, rtt: float, bandwidth: float) -> None:
+    """
+    Добавляет имитацию сети клиенту boto3.
+
+    :param rtt: задержка на запрос в секундах
+    :param bandwidth: пропускная способность одного соединения, байт/с
+    """
+    def before_call(params, **kwargs):
+        time.sleep(rtt + _body_size(params.get('body')) / bandwidth)
+
+    def after_get(parsed, **kwargs):
+        time.sleep(parsed.get('ContentLength', 0) / bandwidth)
+
+    client.meta.events.register('before-call.s3', before_call)
+    client.meta.events.register('after-call.s3.GetObject', after_get)
+
+
+class FaultInjector:
+    """
+    Внедряет отказы в запросы клиента boto3.
+
+    Ошибка возвращается из хука before-call вместо ответа сервиса, поэтому
+    клиент получает настоящий ClientError с кодом и HTTP-статусом, а до
+    бакета запрос не доходит. Отстающий запрос выполняется как обычно,
+    но сначала ждет straggler_delay секунд; если за это время его отменили
+    (выиграл дублирующий запрос), он завершается ошибкой с кодом RequestCancelled.
+    """
+
+    def __init__(self,
+                 throttle_rate: float = 0.0,
+                 error_rate: float = 0.0,
+                 straggler_rate: float = 0.0,
+                 straggler_delay: float = 1.0,
+                 max_stragglers: Optional[int] = None,
+                 operations: Optional[Iterable[str]] = None,
+                 seed: Optional[int] = None):
+        """
+        :param throttle_rate: доля запросов, получающих 503 SlowDown
+        :param error_rate: доля запросов, получающих 500 InternalError
+        :param straggler_rate: доля запросов, задерживаемых на straggler_delay секунд
+        :param max_stragglers: сколько запросов задержать всего (по умолчанию без ограничения)
+        :param operations: имена операций API (например, {'GetObject'}); по умолчанию все
+        :param seed: зерно генератора для воспроизводимых прогонов
+        """
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.straggler_rate = straggler_rate
+        self.straggler_delay = straggler_delay
+        self.max_stragglers = max_stragglers
+        self.operations = set(operations) if operations is not None else None
+        self.counts: Counter = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def install(self, client) -> None:
+        client.meta.events.register('before-call.s3', self._before_call)
+
+    def _before_call(self, model, **kwargs):
+        if self.operations is not None and model.name not in self.operations:
+            return None
+        with self._lock:
+            roll = self._random.random()
+            self.counts['calls'] += 1
+            if roll < self.throttle_rate:
+                self.counts['throttled'] += 1
+                return _error_response(503, 'SlowDown', 'Please reduce your request rate.')
+            roll -= self.throttle_rate
+            if roll < self.error_rate:
+                self.counts['errors'] += 1
+                return _error_response(500, 'InternalError', 'We encountered an internal error.')
+            roll -= self.error_rate
+            straggler = roll < self.straggler_rate and (
+                self.max_stragglers is None or self.counts['stragglers'] < self.max_stragglers
+            )
+            if straggler:
+                self.counts['stragglers'] += 1
+        if straggler and wait_cancelled(self.straggler_delay):
+            with self._lock:
+                self.counts['cancelled'] += 1
+            return _error_response(499, 'RequestCancelled', 'The request was cancelled by the client.')
+        return None
+
+
+def _error_response(status: int, code: str, message: str) -> tuple:
+    """Ответ (http, parsed) для хука before-call, который botocore превратит в ClientError."""
+    http = SimpleNamespace(status_code=status, headers={}, content=b'')
+    parsed = {'Error': {'Code': code, 'Message': message}, 'ResponseMetadata': {'HTTPStatusCode': status}}
+    return http, parsed
+
+
+@contextmanager
+def s3_standin(bucket_name: str = 'bench-bucket',
+               rtt: float = 0.02,
+               bandwidth: float = 50 * MB,
+               faults: Optional[FaultInjector] = None,
+               **storage_kwargs) -> Iterator[S3Storage]:
+    """
+    Создает S3Storage поверх локального бакета с имитацией сети.
+
+    :param faults: внедрение отказов (включается после создания бакета)
+    """
+    with mock_aws():
+        storage = S3Storage(
+            endpoint_url='https://s3.amazonaws.com',
+            access_key='bench',
+            secret_key='bench',
+            bucket_name=bucket_name,
+            share_client=False,
+            **storage_kwargs
+        )
+        storage.s3.create_bucket(Bucket=bucket_name)
+        install_network(storage.s3, rtt, bandwidth)
+        if faults is not None:
+            faults.install(storage.s3)
+        yield storage
@@ -0,0 +1,86 @@
+"""
+Бенчмарк холодного старта S3Storage.
+
+Замеряет в отдельных процессах (каждый раз с холодным кэшем модулей):
+  - время импорта homework_04.infra.storage.s3 против импорта boto3;
+  - создание хранилища без обращения к S3 (инструменты, которым S3 не понадобился);
+  - первое обращение к клиенту (импорт boto3 и создание клиента);
+  - создание еще N хранилищ с тем же сервисом: общий клиент против собственного.
+
+Сеть не нужна: клиент boto3 создается без запросов к сервису.
+
+Запуск из корня проекта:
+    python -m homework_04.benchmarks.s3_startup --runs 5 --instances 20
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+IMPORT_SCRIPT = """
+import time
+started = time.perf_counter()
+import {module}
+print(time.perf_counter() - started)
+"""
+
+STARTUP_SCRIPT = """
+import json, time
+started = time.perf_counter()
+from homework_04.infra.storage.s3 import S3Storage
+imported = time.perf_counter()
+
+def make():
+    return S3Storage('https://s3.amazonaws.com', 'key', 'secret', 'bucket', share_client={share})
+
+storage = make()
+constructed = time.perf_counter()
+storage.s3
+first_client = time.perf_counter()
+for _ in range({instances}):
+    make().s3
+more = time.perf_counter()
+print(json.dumps({{
+    'import': imported - started,
+    'construct': constructed - imported,
+    'first_client': first_client - constructed,
+    'more': more - first_client,
+}}))
+"""
+
+
+def run_python(script: str) -> str:
+    return subprocess.run([sys.executable, '-c', script], check=True, capture_output=True, text=True).stdout
+
+
+def median_import(module: str, runs: int) -> float:
+    return statistics.median(float(run_python(IMPORT_SCRIPT.format(module=module))) for _ in range(runs))
+
+
+def median_startup(share: bool, instances: int, runs: int) -> dict:
+    samples = [json.loads(run_python(STARTUP_SCRIPT.format(share=share, instances=instances)))
+               for _ in range(runs)]
+    return {key: statistics.median(sample[key] for sample in samples) for key in samples[0]}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='запусков процесса на замер (берется медиана)')
+    parser.add_argument('--instances', type=int, default=20, help='сколько еще хранилищ создать')
+    args = parser.parse_args()
+
+    print(f"import boto3:                          {median_import('boto3', args.runs) * 1000:8.1f} ms")
+    print(f"import homework_04.infra.storage.s3:   "
+          f"{median_import('homework_04.infra.storage.s3', args.runs) * 1000:8.1f} ms")
+
+    for share in (True, False):
+        stats = median_startup(share, args.instances, args.runs)
+        print(f"share_client={share!s:<5}  construct {stats['construct'] * 1000:6.2f} ms  "
+              f"first client {stats['first_client'] * 1000:7.1f} ms  "
+              f"{args.instances} more storages {stats['more'] * 1000:7.1f} ms "
+              f"({stats['more'] / args.instances * 1000:.2f} ms each)")
+
+
+if __name__ == '__main__':
+    main()
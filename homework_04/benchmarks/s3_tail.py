@@ -0,0 +1,106 @@
+"""
+Бенчмарк хвостовых задержек и отказоустойчивости S3Storage на локальной замене S3.
+
+Три сценария:
+  stragglers — небольшая доля запросов зависает; сравниваются p50/p99
+               чтения без дублирования и с hedged-запросами;
+  errors     — часть запросов получает 503/500; сравнивается доля
+               успешных чтений без повторов и с повторами;
+  overload   — сервис отказывает всем; сравнивается, во сколько раз
+               повторы умножают число запросов без бюджета и с бюджетом.
+
+Запуск из корня проекта:
+    python -m homework_04.benchmarks.s3_tail --requests 2000 --concurrency 8
+"""
+import argparse
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from homework_04.domain.photofile import PhotoFile
+from homework_04.infra.storage.resilience import HedgePolicy, RetryBudget, RetryPolicy
+from homework_04.benchmarks.s3_standin import FaultInjector, s3_standin
+
+OBJECTS = 32
+OBJECT_SIZE = 64 * 1024
+
+
+def run(requests: int, concurrency: int, rtt: float, faults: FaultInjector, **storage_kwargs) -> dict:
+    """Читает requests случайных объектов и возвращает задержки, число успехов и счетчики."""
+    with s3_standin(rtt=rtt, max_concurrency=concurrency, **storage_kwargs) as storage:
+        for i in range(OBJECTS):
+            storage.save(PhotoFile(f'{i}.jpg', OBJECT_SIZE, 'bench', resolution='64x64',
+                                   content=os.urandom(OBJECT_SIZE)), f'photos/{i}.jpg')
+        faults.install(storage.s3)
+
+        def load(i: int) -> tuple:
+            started = time.perf_counter()
+            content = storage.get_content(f'photos/{i % OBJECTS}.jpg', size=OBJECT_SIZE)
+            return time.perf_counter() - started, content is not None
+
+        with ThreadPoolExecutor(concurrency) as pool:
+            results = list(pool.map(load, range(requests)))
+        latencies = sorted(latency for latency, _ in results)
+        return {
+            'p50': latencies[len(latencies) // 2],
+            'p99': latencies[int(len(latencies) * 0.99)],
+            'ok': sum(ok for _, ok in results),
+            'calls': faults.counts['calls'],
+            'stats': storage.request_stats,
+        }
+
+
+def report(name: str, result: dict, requests: int) -> None:
+    stats = result['stats']
+    print(f"  {name:<12} p50 {result['p50'] * 1000:7.1f} ms  p99 {result['p99'] * 1000:7.1f} ms  "
+          f"ok {result['ok'] / requests:6.1%}  requests x{result['calls'] / requests:4.2f}  "
+          f"retries {stats.retries:>5}  hedges {stats.hedges:>4} "
+          f"(won {stats.hedge_wins}, cancelled {stats.hedges_cancelled})  "
+          f"budget exhausted {stats.budget_exhausted}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--rtt', type=float, default=0.01, help='задержка на запрос, с')
+    parser.add_argument('--straggler-rate', type=float, default=0.02)
+    parser.add_argument('--straggler-delay', type=float, default=0.5, help='задержка отстающего запроса, с')
+    parser.add_argument('--error-rate', type=float, default=0.05, help='доля ответов 503/500 в сценарии errors')
+    args = parser.parse_args()
+    # Отказы здесь ожидаемы: не засоряем вывод предупреждениями о повторах
+    logging.getLogger('homework_04.infra.storage').setLevel(logging.CRITICAL)
+    n = args.requests
+    no_retries = RetryPolicy(max_attempts=1)
+
+    def stragglers() -> FaultInjector:
+        return FaultInjector(straggler_rate=args.straggler_rate, straggler_delay=args.straggler_delay,
+                             operations={'GetObject'}, seed=1)
+
+    print(f"stragglers: {args.straggler_rate:.0%} of GETs delayed by {args.straggler_delay * 1000:.0f} ms")
+    report('no hedging', run(n, args.concurrency, args.rtt, stragglers(), retry_policy=no_retries), n)
+    report('hedged p95', run(n, args.concurrency, args.rtt, stragglers(), retry_policy=no_retries,
+                             hedge_policy=HedgePolicy(percentile=95)), n)
+
+    def errors() -> FaultInjector:
+        return FaultInjector(throttle_rate=args.error_rate / 2, error_rate=args.error_rate / 2,
+                             operations={'GetObject'}, seed=2)
+
+    print(f"errors: {args.error_rate:.0%} of GETs fail with 503 SlowDown / 500 InternalError")
+    report('no retries', run(n, args.concurrency, args.rtt, errors(), retry_policy=no_retries), n)
+    report('retries', run(n, args.concurrency, args.rtt, errors()), n)
+
+    def overload() -> FaultInjector:
+        return FaultInjector(throttle_rate=1.0, operations={'GetObject'}, seed=3)
+
+    print("overload: every GET is throttled")
+    fast_retries = RetryPolicy(max_attempts=4, base_delay=0.001, max_delay=0.01)
+    unlimited = RetryBudget(ratio=10.0, min_per_second=1e9, capacity=1e9)
+    report('no budget', run(n, args.concurrency, args.rtt, overload(), retry_policy=fast_retries,
+                            retry_budget=unlimited), n)
+    report('budget 10%', run(n, args.concurrency, args.rtt, overload(), retry_policy=fast_retries,
+                             retry_budget=RetryBudget(ratio=0.1, min_per_second=5)), n)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Бенчмарк пропускной способности S3Storage: multipart upload и ranged GET
+против прежнего пути (один put_object / один download_fileobj).
+
+Запуск из корня проекта:
+    python -m homework_04.benchmarks.s3_transfer --size-mb 128 --concurrency 1 4 8 16
+"""
+import argparse
+import os
+import time
+from io import BytesIO
+from homework_04.domain.videofile import VideoFile
+from homework_04.benchmarks.s3_standin import s3_standin, MB
+
+
+def _measure(func) -> float:
+    started = time.perf_counter()
+    func()
+    return time.perf_counter() - started
+
+
+def run(size: int, part_size: int, concurrency: int, rtt: float, bandwidth: float) -> None:
+    data = os.urandom(size)
+    video = VideoFile('bench.mp4', size, 'bench', duration=0, resolution='1920x1080',
+                      codec='h264', fps=25, content=data)
+
+    with s3_standin(rtt=rtt, bandwidth=bandwidth, part_size=part_size,
+                    max_concurrency=concurrency) as storage:
+        s3, bucket = storage.s3, storage.bucket_name
+
+        baseline_up = _measure(lambda: s3.put_object(Bucket=bucket, Key='baseline', Body=data))
+        baseline_down = _measure(lambda: s3.download_fileobj(bucket, 'baseline', BytesIO()))
+        upload = _measure(lambda: storage.save(video, 'multipart'))
+        download = _measure(lambda: storage.get_content('multipart', size=size))
+
+    print(f"concurrency={concurrency:>3}  "
+          f"upload {size / baseline_up / MB:8.1f} -> {size / upload / MB:8.1f} MB/s "
+          f"(x{baseline_up / upload:4.1f})  "
+          f"download {size / baseline_down / MB:8.1f} -> {size / download / MB:8.1f} MB/s "
+          f"(x{baseline_down / download:4.1f})")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size-mb', type=int, default=64, help='размер объекта, МБ')
+    parser.add_argument('--part-mb', type=int, default=8, help='размер части, МБ')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 8, 16])
+    parser.add_argument('--rtt', type=float, default=0.02, help='задержка на запрос, с')
+    parser.add_argument('--bandwidth-mb', type=float, default=50,
+                        help='пропускная способность одного соединения, МБ/с')
+    args = parser.parse_args()
+
+    print(f"object {args.size_mb} MB, part {args.part_mb} MB, "
+          f"rtt {args.rtt * 1000:.0f} ms, {args.bandwidth_mb} MB/s per connection")
+    for concurrency in args.concurrency:
+        run(args.size_mb * MB, args.part_mb * MB, concurrency, args.rtt, args.bandwidth_mb * MB)
+
+
+if __name__ == '__main__':
+    main()
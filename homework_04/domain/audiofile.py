@@ -1,36 +1,57 @@
-from datetime import datetime
-from .base import MediaFile
-from typing import Dict, Any
-from homework_04.domain.base import MediaFile
-
-class AudioFile(MediaFile):
-    """Класс для работы с аудио файлами."""
-    
-    def __init__(self, name: str, size: int, owner: str, 
-                 duration: float, bitrate: int, codec: str, **kwargs):
-        """
-        :param duration: длительность аудио в секундах
-        :param bitrate: битрейт в kbps
-        :param codec: используемый кодек (mp3, wav, aac и т.д.)
-        """
-        super().__init__(name, size, owner, **kwargs)
-        self.duration = duration
-        self.bitrate = bitrate
-        self.codec = codec
-        
-    def get_specific_metadata(self) -> Dict[str, Any]:
-        return {
-            'duration': self.duration,
-            'bitrate': self.bitrate,
-            'codec': self.codec
-        }
-        
-    def process(self) -> None:
-        """Выполняет обработку аудио файла (например, нормализацию громкости)."""
-        print(f"Processing audio file {self.name}...")
-        # Реализация обработки аудио
-        
-    def extract_waveform(self) -> Any:
-        """Извлекает waveform аудио файла."""
-        print(f"Extracting waveform from {self.name}...")
-        # Реализация извлечения waveform
\ No newline at end of file
+from datetime import datetime
+from .base import MediaFile
+from typing import Dict, Any, TYPE_CHECKING
+from homework_04.domain.base import MediaFile
+
+if TYPE_CHECKING:
+    from homework_04.domain.waveform import PeakPyramid
+
+class AudioFile(MediaFile):
+    """Класс для работы с аудио файлами."""
+    
+    __slots__ = ('duration', 'bitrate', 'codec')
+    
+    def __init__(self, name: str, size: int, owner: str, 
+                 duration: float, bitrate: int, codec: str, **kwargs):
+        """
+        :param duration: длительность аудио в секундах
+        :param bitrate: битрейт в kbps
+        :param codec: используемый кодек (mp3, wav, aac и т.д.)
+        """
+        super().__init__(name, size, owner, **kwargs)
+        self.duration = duration
+        self.bitrate = bitrate
+        self.codec = codec
+        
+    def get_specific_metadata(self) -> Dict[str, Any]:
+        return {
+            'duration': self.duration,
+            'bitrate': self.bitrate,
+            'codec': self.codec
+        }
+        
+    def process(self) -> None:
+        """Выполняет обработку аудио файла (например, нормализацию громкости)."""
+        print(f"Processing audio file {self.name}...")
+        # Реализация обработки аудио
+        
+    def extract_waveform(self, base_block: int = 256, factor: int = 4,
+                         min_blocks: int = 512) -> 'PeakPyramid':
+        """
+        Извлекает waveform аудио файла в виде пирамиды пиков (min, max).
+
+        PCM обрабатывается блоками средствами NumPy (mmap-содержимое LocalStorage
+        читается без копирования), так что память не растет с длительностью.
+        Пирамиду можно сохранить рядом с файлом (PeakPyramid.save) и затем
+        читать нужный уровень по диапазону (PeakPyramid.read_level).
+
+        :param base_block: отсчетов в блоке самого детального уровня
+        :param factor: во сколько раз каждый следующий уровень грубее
+        :param min_blocks: минимальное число блоков в самом грубом уровне
+        :raises ValueError: если содержимого нет или это не PCM WAV
+        """
+        if self.content is None:
+            raise ValueError(f"Audio file {self.name} has no content")
+        # NumPy нужен только для waveform, поэтому импортируем при вызове
+        from homework_04.domain.waveform import PeakPyramid
+        return PeakPyramid.build(self.content, base_block, factor, min_blocks)
\ No newline at end of file
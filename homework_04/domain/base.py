@@ -1,74 +1,149 @@
-from datetime import datetime
-from abc import ABC, abstractmethod
-from pathlib import Path
-from typing import Dict, Any, Optional, Union, BytesIO
-
-class MediaFile(ABC):
-    """Абстрактный базовый класс для всех медиа-файлов."""
-    
-    def __init__(self, 
-                 name: str, 
-                 size: int, 
-                 owner: str, 
-                 content: Optional[Union[bytes, BytesIO]] = None,
-                 created_at: datetime = None, 
-                 **metadata):
-        """
-        Инициализация медиа-файла.
-        
-        :param name: имя файла
-        :param size: размер файла в байтах
-        :param owner: владелец файла
-        :param content: содержимое файла (байты или BytesIO)
-        :param created_at: дата создания файла
-        :param metadata: дополнительные метаданные
-        """
-        self.name = name
-        self.size = size
-        self.owner = owner
-        self._content = content
-        self.created_at = created_at or datetime.now()
-        self.metadata = metadata
-        
-    @property
-    def content(self) -> Optional[Union[bytes, BytesIO]]:
-        """Возвращает содержимое файла."""
-        return self._content
-        
-    @content.setter
-    def content(self, value: Union[bytes, BytesIO]) -> None:
-        """Устанавливает содержимое файла и обновляет размер."""
-        self._content = value
-        if isinstance(value, bytes):
-            self.size = len(value)
-        elif isinstance(value, BytesIO):
-            self.size = value.getbuffer().nbytes
-            
-    @abstractmethod
-    def get_specific_metadata(self) -> Dict[str, Any]:
-        """Возвращает специфичные для типа файла метаданные."""
-        pass
-        
-    @abstractmethod
-    def process(self) -> None:
-        """Выполняет обработку файла (конвертация, извлечение фич и т.д.)."""
-        pass
-        
-    def get_info(self) -> Dict[str, Any]:
-        """Возвращает общую информацию о файле."""
-        return {
-            'name': self.name,
-            'size': self.size,
-            'owner': self.owner,
-            'created_at': self.created_at,
-            'type': self.__class__.__name__,
-            'has_content': self.content is not None,
-            **self.get_specific_metadata()
-        }
-        
-    def clear_content(self) -> None:
-        """Очищает содержимое файла (для экономии памяти)."""
-        self._content = None
-        
-    def __str__(self) -> str:
+from datetime import datetime
+from abc import ABC, abstractmethod
+from pathlib import Path
+from io import BytesIO
+from typing import Dict, Any, Optional, Union
+
+class LazyContent:
+    """
+    Ленивый дескриптор содержимого файла.
+    
+    Загружает содержимое из хранилища (storage.get_content) при первом обращении
+    и может освободить его, сохранив возможность загрузить повторно.
+    """
+    
+    __slots__ = ('storage', 'path', '_value')
+    
+    def __init__(self, storage, path: str):
+        """
+        :param storage: хранилище с методом get_content(path)
+        :param path: путь к файлу в хранилище
+        """
+        self.storage = storage
+        self.path = path
+        self._value = None
+        
+    @property
+    def loaded(self) -> bool:
+        """Загружено ли содержимое."""
+        return self._value is not None
+        
+    def get(self) -> Any:
+        """Возвращает содержимое, загружая его при первом обращении."""
+        if self._value is None:
+            self._value = self.storage.get_content(self.path)
+        return self._value
+        
+    def release(self) -> None:
+        """Освобождает загруженное содержимое."""
+        if hasattr(self._value, 'close'):
+            self._value.close()
+        self._value = None
+        
+    def __repr__(self) -> str:
+        return f"LazyContent(path='{self.path}', loaded={self.loaded})"
+
+
+class MediaFile(ABC):
+    """Абстрактный базовый класс для всех медиа-файлов."""
+    
+    # __slots__ вместо __dict__: каталоги из миллионов файлов занимают заметно меньше памяти
+    __slots__ = ('name', 'size', 'owner', '_content', 'created_at', '_metadata')
+    
+    def __init__(self, 
+                 name: str, 
+                 size: int, 
+                 owner: str, 
+                 content: Optional[Union[bytes, BytesIO]] = None,
+                 created_at: datetime = None, 
+                 **metadata):
+        """
+        Инициализация медиа-файла.
+        
+        :param name: имя файла
+        :param size: размер файла в байтах
+        :param owner: владелец файла
+        :param content: содержимое файла (байты, BytesIO или LazyContent)
+        :param created_at: дата создания файла
+        :param metadata: дополнительные метаданные
+        """
+        self.name = name
+        self.size = size
+        self.owner = owner
+        self._content = content
+        self.created_at = created_at or datetime.now()
+        # Пустой словарь метаданных не создаем до первого обращения
+        self._metadata = metadata or None
+        
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        """Возвращает дополнительные метаданные."""
+        if self._metadata is None:
+            self._metadata = {}
+        return self._metadata
+        
+    @metadata.setter
+    def metadata(self, value: Dict[str, Any]) -> None:
+        self._metadata = value or None
+        
+    @property
+    def content(self) -> Optional[Union[bytes, BytesIO]]:
+        """Возвращает содержимое файла (ленивое содержимое загружается при первом обращении)."""
+        if isinstance(self._content, LazyContent):
+            return self._content.get()
+        return self._content
+        
+    @content.setter
+    def content(self, value: Union[bytes, BytesIO, LazyContent]) -> None:
+        """Устанавливает содержимое файла и обновляет размер."""
+        self._content = value
+        if isinstance(value, LazyContent):
+            # Размер известен из метаданных, загружать содержимое ради него не нужно
+            return
+        if isinstance(value, bytes):
+            self.size = len(value)
+        elif isinstance(value, BytesIO):
+            self.size = value.getbuffer().nbytes
+        elif value is not None:
+            # Ленивое содержимое из хранилища (например, mmap-файл) знает свой размер
+            self.size = len(value)
+            
+    @abstractmethod
+    def get_specific_metadata(self) -> Dict[str, Any]:
+        """Возвращает специфичные для типа файла метаданные."""
+        pass
+        
+    @abstractmethod
+    def process(self) -> None:
+        """Выполняет обработку файла (конвертация, извлечение фич и т.д.)."""
+        pass
+        
+    def get_info(self) -> Dict[str, Any]:
+        """Возвращает общую информацию о файле."""
+        return {
+            'name': self.name,
+            'size': self.size,
+            'owner': self.owner,
+            'created_at': self.created_at,
+            'type': self.__class__.__name__,
+            'has_content': self._content is not None,
+            **self.get_specific_metadata()
+        }
+        
+    def clear_content(self) -> None:
+        """Очищает содержимое файла (для экономии памяти)."""
+        self._content = None
+        
+    def release_content(self) -> None:
+        """
+        Освобождает загруженное содержимое.
+        
+        Ленивое содержимое можно будет загрузить повторно, обычное просто очищается.
+        """
+        if isinstance(self._content, LazyContent):
+            self._content.release()
+        else:
+            self.clear_content()
+        
+    def __str__(self) -> str:
         return f"{self.__class__.__name__}(name='{self.name}', size={self.size}, owner='{self.owner}')"
\ No newline at end of file
@@ -0,0 +1,126 @@
+from array import array
+from datetime import datetime, timezone
+from typing import Any, Dict, Generic, Iterable, Iterator, List, Optional, TypeVar
+from homework_04.domain.base import MediaFile
+from homework_04.domain.audiofile import AudioFile
+from homework_04.domain.genericfile import GenericFile
+from homework_04.domain.photofile import PhotoFile
+from homework_04.domain.videofile import VideoFile
+
+T = TypeVar('T')
+
+_TYPES = {cls.__name__: cls for cls in (AudioFile, VideoFile, PhotoFile, GenericFile)}
+
+
+class _Categorical(Generic[T]):
+    """Столбец с повторяющимися значениями: хранит коды в array, а сами значения — один раз."""
+
+    def __init__(self):
+        self.codes = array('I')
+        self.values: List[T] = []
+        self._index: Dict[T, int] = {}
+
+    def append(self, value: T) -> None:
+        code = self._index.get(value)
+        if code is None:
+            code = self._index[value] = len(self.values)
+            self.values.append(value)
+        self.codes.append(code)
+
+    def __getitem__(self, i: int) -> T:
+        return self.values[self.codes[i]]
+
+
+class MediaColumns:
+    """
+    Колоночная коллекция записей о медиа-файлах.
+
+    Вместо миллионов объектов MediaFile хранит каждое поле в отдельном
+    массиве (array): числа — упакованными, повторяющиеся строки (тип,
+    владелец, кодек, разрешение) — кодами словаря. Содержимое файлов
+    не хранится, а редкие дополнительные метаданные лежат в разреженном
+    словаре. Объект MediaFile создается только при обращении к записи.
+    """
+
+    def __init__(self, files: Iterable[MediaFile] = ()):
+        self.names: List[str] = []
+        self.sizes = array('q')
+        self.created_at = array('d')
+        self.durations = array('d')
+        self.fps = array('d')
+        self.bitrates = array('l')
+        self.types: _Categorical[str] = _Categorical()
+        self.owners: _Categorical[str] = _Categorical()
+        self.codecs: _Categorical[Optional[str]] = _Categorical()
+        self.resolutions: _Categorical[Optional[str]] = _Categorical()
+        self.camera_models: _Categorical[Optional[str]] = _Categorical()
+        # 1, если дата создания была с часовым поясом (восстанавливается в UTC)
+        self._aware = array('b')
+        self._metadata: Dict[int, Dict[str, Any]] = {}
+        self.extend(files)
+
+    def append(self, media_file: MediaFile) -> None:
+        """Добавляет запись о файле (содержимое не сохраняется)."""
+        specific = media_file.get_specific_metadata()
+        self.names.append(media_file.name)
+        self.sizes.append(media_file.size)
+        self.created_at.append(media_file.created_at.timestamp())
+        self._aware.append(media_file.created_at.tzinfo is not None)
+        self.durations.append(specific.get('duration') or 0.0)
+        self.fps.append(specific.get('fps') or 0.0)
+        self.bitrates.append(specific.get('bitrate') or 0)
+        self.types.append(media_file.__class__.__name__)
+        self.owners.append(media_file.owner)
+        self.codecs.append(specific.get('codec'))
+        self.resolutions.append(specific.get('resolution'))
+        self.camera_models.append(specific.get('camera_model'))
+        if media_file._metadata:
+            self._metadata[len(self.names) - 1] = dict(media_file._metadata)
+
+    def extend(self, files: Iterable[MediaFile]) -> None:
+        for media_file in files:
+            self.append(media_file)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __getitem__(self, i: int) -> MediaFile:
+        """Создает MediaFile для i-й записи."""
+        if i < 0:
+            i += len(self)
+        file_type = self.types[i]
+        created_at = datetime.fromtimestamp(
+            self.created_at[i], timezone.utc if self._aware[i] else None
+        )
+        kwargs: Dict[str, Any] = {'created_at': created_at, **self._metadata.get(i, {})}
+        if file_type == 'AudioFile':
+            kwargs.update(duration=self.durations[i], bitrate=self.bitrates[i], codec=self.codecs[i])
+        elif file_type == 'VideoFile':
+            kwargs.update(duration=self.durations[i], resolution=self.resolutions[i],
+                          codec=self.codecs[i], fps=self.fps[i])
+        elif file_type == 'PhotoFile':
+            kwargs.update(resolution=self.resolutions[i], camera_model=self.camera_models[i])
+        return _TYPES[file_type](self.names[i], self.sizes[i], self.owners[i], **kwargs)
+
+    def __iter__(self) -> Iterator[MediaFile]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def where(self, owner: Optional[str] = None, file_type: Optional[str] = None,
+              min_duration: Optional[float] = None) -> Iterator[int]:
+        """
+        Возвращает индексы записей, подходящих под условия.
+
+        Сравнение идет по кодам и упакованным массивам, объекты MediaFile не создаются.
+        """
+        owner_code = self.owners._index.get(owner, -1) if owner is not None else None
+        type_code = self.types._index.get(file_type, -1) if file_type is not None else None
+        owners, types, durations = self.owners.codes, self.types.codes, self.durations
+        for i in range(len(self)):
+            if owner_code is not None and owners[i] != owner_code:
+                continue
+            if type_code is not None and types[i] != type_code:
+                continue
+            if min_duration is not None and durations[i] < min_duration:
+                continue
+            yield i
@@ -0,0 +1,353 @@
+import json
+import struct
+import threading
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+
+_Y4M_MAGIC = b'YUV4MPEG2 '
+_FRAME = b'FRAME'
+_INDEX_MAGIC = b'FIDX'
+_INDEX_HEADER = struct.Struct('<4sI')  # magic, длина JSON-заголовка
+
+# Кодеки видео без заголовка: параметры кадра берутся из метаданных VideoFile
+RAW_CODECS = {'raw', 'rawvideo', 'yuv', 'i420'}
+
+# Сколько индексов кадров одного хранилища держать в памяти процесса
+INDEX_CACHE_SIZE = 256
+
+# Прореживание цветности (по x, по y) для цветовых схем Y4M; mono — только яркость
+_CHROMA = {'420': (2, 2), '422': (2, 1), '444': (1, 1), 'mono': None}
+
+
+def _colorspace(tag: str) -> str:
+    """Нормализует тег C заголовка Y4M ('420jpeg', '420paldv', '444alpha'...)."""
+    for name in _CHROMA:
+        if tag.startswith(name):
+            return name
+    raise ValueError(f"Unsupported Y4M colorspace C{tag}")
+
+
+def frame_size(width: int, height: int, colorspace: str) -> int:
+    """Размер одного кадра YUV в байтах."""
+    chroma = _CHROMA[colorspace]
+    if chroma is None:
+        return width * height
+    cw, ch = -(-width // chroma[0]), -(-height // chroma[1])
+    return width * height + 2 * cw * ch
+
+
+@dataclass
+class FrameIndex:
+    """
+    Индекс кадров видео: байтовые оффсеты данных каждого кадра и ключевых кадров.
+
+    По индексу кадр по любой временной метке читается одним ranged-запросом,
+    без чтения и декодирования предыдущих кадров. Для Y4M и raw YUV каждый
+    кадр ключевой; для форматов с межкадровым сжатием чтение начиналось бы
+    с ближайшего ключевого кадра (keyframe_for).
+
+    file_size и source_version (Storage.version: mtime, ETag...) видео, по
+    которому построен индекс, позволяют заметить, что файл перезаписали.
+    """
+    width: int
+    height: int
+    fps: float
+    colorspace: str
+    frame_size: int
+    file_size: int
+    offsets: np.ndarray
+    keyframes: np.ndarray
+    source_version: Optional[str] = None
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    @property
+    def duration(self) -> float:
+        return len(self) / self.fps if self.fps else 0.0
+
+    def frame_at(self, timestamp: float) -> int:
+        """Номер кадра, который показывается в момент timestamp (секунды)."""
+        return int(min(max(int(timestamp * self.fps + 1e-9), 0), len(self) - 1))
+
+    def keyframe_for(self, frame: int) -> int:
+        """Номер ближайшего ключевого кадра не позже frame."""
+        keys = np.flatnonzero(self.keyframes)
+        return int(keys[np.searchsorted(keys, frame, side='right') - 1])
+
+    def to_bytes(self) -> bytes:
+        """Сериализует индекс: JSON-заголовок, затем оффсеты (int64) и флаги ключевых кадров."""
+        header = json.dumps({
+            'width': self.width,
+            'height': self.height,
+            'fps': self.fps,
+            'colorspace': self.colorspace,
+            'frame_size': self.frame_size,
+            'file_size': self.file_size,
+            'source_version': self.source_version,
+            'frames': len(self),
+        }).encode('utf-8')
+        return b''.join([
+            _INDEX_HEADER.pack(_INDEX_MAGIC, len(header)), header,
+            self.offsets.astype('<i8').tobytes(),
+            np.packbits(self.keyframes).tobytes(),
+        ])
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'FrameIndex':
+        magic, size = _INDEX_HEADER.unpack_from(data)
+        if magic != _INDEX_MAGIC:
+            raise ValueError("Not a frame index")
+        start = _INDEX_HEADER.size + size
+        header = json.loads(data[_INDEX_HEADER.size:start])
+        count = header.pop('frames')
+        offsets = np.frombuffer(data, dtype='<i8', count=count, offset=start).astype(np.int64)
+        keyframes = np.unpackbits(
+            np.frombuffer(data, dtype=np.uint8, offset=start + 8 * count), count=count
+        ).astype(bool)
+        return cls(offsets=offsets, keyframes=keyframes, **header)
+
+    @classmethod
+    def for_raw(cls, file_size: int, width: int, height: int, fps: float,
+                colorspace: str = '420') -> 'FrameIndex':
+        """Индекс для raw YUV без заголовков: кадры идут подряд с шагом frame_size."""
+        size = frame_size(width, height, colorspace)
+        offsets = np.arange(file_size // size, dtype=np.int64) * size
+        return cls(width, height, fps, colorspace, size, file_size,
+                   offsets, np.ones(len(offsets), dtype=bool))
+
+    @classmethod
+    def for_y4m(cls, source: '_RangeSource') -> 'FrameIndex':
+        """
+        Строит индекс Y4M файла.
+
+        Если все заголовки кадров — просто 'FRAME' (обычный случай), оффсеты
+        вычисляются по размеру файла без его чтения. Иначе файл один раз
+        просматривается последовательно, перепрыгивая через данные кадров.
+        """
+        head = bytes(source.read(0, 4096))
+        end = head.find(b'\n')
+        if not head.startswith(_Y4M_MAGIC) or end < 0:
+            raise ValueError("Not a Y4M stream")
+        params = {token[:1]: token[1:] for token in head[len(_Y4M_MAGIC):end].decode('ascii').split()}
+        width, height = int(params['W']), int(params['H'])
+        num, _, den = params.get('F', '25:1').partition(':')
+        fps = int(num) / int(den or 1)
+        colorspace = _colorspace(params.get('C', '420'))
+        size = frame_size(width, height, colorspace)
+
+        first = end + 1
+        plain = len(_FRAME) + 1
+        if source.read(first, first + plain) == _FRAME + b'\n' \
+                and (source.size - first) % (plain + size) == 0:
+            count = (source.size - first) // (plain + size)
+            offsets = first + plain + np.arange(count, dtype=np.int64) * (plain + size)
+        else:
+            offsets = np.array(list(_scan_y4m(source, first, size)), dtype=np.int64)
+        return cls(width, height, fps, colorspace, size, source.size,
+                   offsets, np.ones(len(offsets), dtype=bool))
+
+
+def _scan_y4m(source: '_RangeSource', offset: int, size: int) -> Iterator[int]:
+    """Находит оффсеты данных кадров, читая только заголовки кадров."""
+    while offset < source.size:
+        line = bytes(source.read(offset, offset + 256))
+        end = line.find(b'\n')
+        if not line.startswith(_FRAME) or end < 0:
+            raise ValueError(f"Broken Y4M frame header at byte {offset}")
+        offset += end + 1
+        if offset + size > source.size:
+            return
+        yield offset
+        offset += size
+
+
+class _RangeSource:
+    """Источник байт видео с произвольным доступом: хранилище по пути или буфер в памяти."""
+
+    def __init__(self, size: int, read, version: Optional[str] = None):
+        self.size = size
+        self.read = read
+        # Версия файла хранилища (None для буфера в памяти или если хранилище ее не знает)
+        self.version = version
+
+    @classmethod
+    def from_storage(cls, storage, path: str) -> '_RangeSource':
+        media_file = storage.load(path, load_content=False)
+        if media_file is None:
+            raise FileNotFoundError(path)
+        return cls(media_file.size, lambda start, end: storage.load_range(path, start, end),
+                   storage.version(path))
+
+    @classmethod
+    def from_content(cls, content: Any) -> '_RangeSource':
+        view = memoryview(content) if isinstance(content, (bytes, bytearray, memoryview)) \
+            else content.getbuffer()
+        return cls(len(view), lambda start, end: view[start:end])
+
+
+class _IndexCache:
+    """
+    LRU-кэш индексов кадров в памяти процесса, отдельный для каждого хранилища.
+
+    Хранилища — слабые ключи: кэш не продлевает им жизнь, а индексы
+    удаленного хранилища не достанутся новому объекту (id объектов
+    после сборки мусора переиспользуются).
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._items: 'weakref.WeakKeyDictionary[Any, OrderedDict[str, FrameIndex]]' = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def get(self, storage, path: str, source: _RangeSource) -> Optional[FrameIndex]:
+        with self._lock:
+            items = self._items.get(storage)
+            index = items.get(path) if items is not None else None
+            if index is None or not _is_current(index, source):
+                return None
+            items.move_to_end(path)
+            return index
+
+    def put(self, storage, path: str, index: FrameIndex) -> None:
+        with self._lock:
+            items = self._items.setdefault(storage, OrderedDict())
+            items[path] = index
+            items.move_to_end(path)
+            while len(items) > self.max_size:
+                items.popitem(last=False)
+
+
+_index_cache = _IndexCache(INDEX_CACHE_SIZE)
+
+
+def _is_current(index: FrameIndex, source: _RangeSource) -> bool:
+    """Построен ли индекс по текущей версии файла."""
+    return index.file_size == source.size and index.source_version == source.version
+
+
+def index_path(path: str) -> str:
+    """Путь сохраненного индекса кадров для видео файла."""
+    return f"{path}.frames"
+
+
+def load_frame_index(storage, path: str, codec: Optional[str] = None,
+                     resolution: Optional[str] = None, fps: Optional[float] = None) -> FrameIndex:
+    """
+    Возвращает индекс кадров файла хранилища.
+
+    Индекс ищется в памяти процесса, затем рядом с файлом (<path>.frames);
+    только если его нет или файл изменился (другие размер или версия
+    Storage.version — mtime, ETag...), он строится
+    заново и сохраняется рядом с файлом, так что повторные задачи по тому
+    же файлу (даже в других процессах) его переиспользуют.
+
+    :param codec, resolution, fps: параметры raw YUV (для Y4M берутся из заголовка)
+    """
+    return _get_index(_RangeSource.from_storage(storage, path), storage, path, codec, resolution, fps)
+
+
+def _get_index(source: _RangeSource, storage=None, path: Optional[str] = None,
+               codec: Optional[str] = None, resolution: Optional[str] = None,
+               fps: Optional[float] = None) -> FrameIndex:
+    if storage is not None:
+        index = _index_cache.get(storage, path, source)
+        if index is not None:
+            return index
+        try:
+            with storage.open_reader(index_path(path)) as reader:
+                index = FrameIndex.from_bytes(reader.read())
+            if not _is_current(index, source):
+                index = None
+        except (FileNotFoundError, ValueError, struct.error):
+            index = None
+        if index is not None:
+            _index_cache.put(storage, path, index)
+            return index
+
+    if source.read(0, len(_Y4M_MAGIC)) == _Y4M_MAGIC:
+        index = FrameIndex.for_y4m(source)
+    elif codec and codec.lower() in RAW_CODECS and resolution and fps:
+        width, height = (int(value) for value in resolution.lower().split('x'))
+        index = FrameIndex.for_raw(source.size, width, height, fps)
+    else:
+        raise ValueError(f"Only Y4M and raw YUV video is supported, got codec {codec!r}")
+
+    index.source_version = source.version
+    if storage is not None:
+        with storage.open_writer(index_path(path)) as writer:
+            writer.write(index.to_bytes())
+        _index_cache.put(storage, path, index)
+    return index
+
+
+def _to_array(data: bytes, index: FrameIndex, mode: str) -> np.ndarray:
+    """Преобразует байты кадра YUV в массив: 'gray' (H, W), 'yuv' (H, W, 3) или 'rgb' (H, W, 3)."""
+    w, h = index.width, index.height
+    frame = np.frombuffer(data, dtype=np.uint8)
+    y = frame[:w * h].reshape(h, w)
+    if mode == 'gray' or index.colorspace == 'mono':
+        return y if mode == 'gray' else np.repeat(y[:, :, None], 3, axis=2)
+
+    sx, sy = _CHROMA[index.colorspace]
+    cw, ch = -(-w // sx), -(-h // sy)
+    u = frame[w * h:w * h + cw * ch].reshape(ch, cw)
+    v = frame[w * h + cw * ch:w * h + 2 * cw * ch].reshape(ch, cw)
+    # Растягиваем прореженные плоскости цветности до размера кадра
+    u = u.repeat(sy, axis=0).repeat(sx, axis=1)[:h, :w]
+    v = v.repeat(sy, axis=0).repeat(sx, axis=1)[:h, :w]
+    if mode == 'yuv':
+        return np.stack([y, u, v], axis=2)
+
+    # BT.601, диапазон 16..235
+    yf = (y.astype(np.float32) - 16) * 1.164
+    uf = u.astype(np.float32) - 128
+    vf = v.astype(np.float32) - 128
+    rgb = np.stack([yf + 1.596 * vf, yf - 0.392 * uf - 0.813 * vf, yf + 2.017 * uf], axis=2)
+    return np.clip(rgb, 0, 255).astype(np.uint8)
+
+
+def read_frames(source: _RangeSource, index: FrameIndex, timestamps: Sequence[float],
+                batch_size: int = 32, mode: str = 'rgb',
+                max_concurrency: int = 16) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Читает кадры по временным меткам пакетами.
+
+    Каждый кадр читается отдельным ranged-запросом по оффсету из индекса
+    (запросы пакета выполняются параллельно), соседние кадры читаются одним
+    запросом.
+
+    :return: пары (номера кадров, массив кадров формы (batch, H, W[, 3]))
+    """
+    frames = np.unique([index.frame_at(t) for t in timestamps]) if len(index) else np.array([], int)
+    with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+        for start in range(0, len(frames), batch_size):
+            batch = frames[start:start + batch_size]
+            runs = _coalesce(batch)
+            chunks = pool.map(
+                lambda run: source.read(int(index.offsets[run[0]]),
+                                        int(index.offsets[run[-1]]) + index.frame_size),
+                runs
+            )
+            arrays: List[np.ndarray] = []
+            for run, data in zip(runs, chunks):
+                base = int(index.offsets[run[0]])
+                for frame in run:
+                    offset = int(index.offsets[frame]) - base
+                    arrays.append(_to_array(data[offset:offset + index.frame_size], index, mode))
+            yield batch, np.stack(arrays)
+
+
+def _coalesce(frames: np.ndarray) -> List[List[int]]:
+    """Группирует подряд идущие номера кадров в серии для чтения одним запросом."""
+    runs: List[List[int]] = []
+    for frame in frames.tolist():
+        if runs and frame == runs[-1][-1] + 1:
+            runs[-1].append(frame)
+        else:
+            runs.append([frame])
+    return runs
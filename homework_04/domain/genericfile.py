@@ -0,0 +1,14 @@
+from typing import Dict, Any
+from homework_04.domain.base import MediaFile
+
+class GenericFile(MediaFile):
+    """Класс для файлов неизвестного типа (хранятся как есть, без специфичных метаданных)."""
+    
+    __slots__ = ()
+        
+    def get_specific_metadata(self) -> Dict[str, Any]:
+        return {}
+        
+    def process(self) -> None:
+        """Для файлов неизвестного типа обработка не требуется."""
+        print(f"Nothing to process in {self.name}")
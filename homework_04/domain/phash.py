@@ -0,0 +1,125 @@
+from typing import Any, Sequence, Tuple
+import numpy as np
+
+# Размер уменьшенного изображения для хешей (8x8 = 64 бита)
+HASH_SIZE = 8
+
+_NETPBM = {b'P5': 1, b'P6': 3}
+
+if hasattr(np, 'bitwise_count'):
+    def popcount(values: np.ndarray) -> np.ndarray:
+        """Число единичных бит в каждом uint64."""
+        return np.bitwise_count(values)
+else:
+    _POPCOUNT8 = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+    def popcount(values: np.ndarray) -> np.ndarray:
+        """Число единичных бит в каждом uint64."""
+        values = np.ascontiguousarray(values, dtype=np.uint64)
+        return _POPCOUNT8[values.view(np.uint8)].reshape(*values.shape, 8).sum(axis=-1)
+
+
+def hamming(a: Any, b: Any) -> np.ndarray:
+    """Расстояние Хэмминга между 64-битными хешами (поэлементно, с broadcasting)."""
+    return popcount(np.bitwise_xor(np.asarray(a, dtype=np.uint64), np.asarray(b, dtype=np.uint64)))
+
+
+def decode_image(content: Any) -> np.ndarray:
+    """
+    Декодирует бинарный PGM (P5) или PPM (P6) в массив (H, W) или (H, W, 3).
+
+    Другие форматы требуют внешнего декодера; для них передавайте в
+    хеш-функции уже готовый массив пикселей.
+
+    :raises ValueError: если это не PGM/PPM
+    """
+    data = memoryview(content) if isinstance(content, (bytes, bytearray, memoryview)) \
+        else content.getbuffer()
+    channels = _NETPBM.get(bytes(data[:2]))
+    if channels is None:
+        raise ValueError("Only binary PGM/PPM images are supported")
+
+    # Заголовок: magic, ширина, высота, maxval — через пробельные символы и комментарии
+    fields, offset = [], 2
+    while len(fields) < 3:
+        while chr(data[offset]).isspace():
+            offset += 1
+        if data[offset] == ord('#'):
+            while data[offset] != ord('\n'):
+                offset += 1
+            continue
+        start = offset
+        while not chr(data[offset]).isspace():
+            offset += 1
+        fields.append(int(bytes(data[start:offset])))
+    width, height, maxval = fields
+    offset += 1
+
+    dtype = np.uint8 if maxval < 256 else np.dtype('>u2')
+    pixels = np.frombuffer(data, dtype=dtype, count=width * height * channels, offset=offset)
+    shape = (height, width) if channels == 1 else (height, width, channels)
+    return pixels.reshape(shape)
+
+
+def to_gray(image: np.ndarray) -> np.ndarray:
+    """Переводит изображение в оттенки серого (float32, BT.601)."""
+    image = np.asarray(image)
+    if image.ndim == 2:
+        return image.astype(np.float32)
+    return image[..., :3].astype(np.float32) @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+
+def downscale(gray: np.ndarray, width: int, height: int) -> np.ndarray:
+    """Уменьшает изображение усреднением по областям (box filter)."""
+    rows = _bounds(gray.shape[0], height)
+    cols = _bounds(gray.shape[1], width)
+    sums = np.add.reduceat(np.add.reduceat(gray, rows, axis=0), cols, axis=1)
+    counts = np.outer(np.diff(np.append(rows, gray.shape[0])), np.diff(np.append(cols, gray.shape[1])))
+    return sums / counts
+
+
+def check_hashable(image: np.ndarray) -> None:
+    """Проверяет, что изображение не меньше уменьшенной копии для dHash (9×8)."""
+    height, width = image.shape[:2]
+    if width < HASH_SIZE + 1 or height < HASH_SIZE:
+        raise ValueError(f"Image is too small for hashing: {width}x{height} < {HASH_SIZE + 1}x{HASH_SIZE}")
+
+
+def _bounds(size: int, parts: int) -> np.ndarray:
+    """Начала parts областей, на которые делится отрезок длины size."""
+    if size < parts:
+        raise ValueError(f"Image is too small for hashing: {size} < {parts}")
+    return np.linspace(0, size, parts + 1).astype(np.intp)[:-1]
+
+
+def _pack(bits: np.ndarray) -> np.ndarray:
+    """Упаковывает (N, 64) булевых значений в N беззнаковых 64-битных чисел."""
+    return np.packbits(bits.reshape(len(bits), -1), axis=1).view('>u8').ravel().astype(np.uint64)
+
+
+def average_hash_batch(thumbs: np.ndarray) -> np.ndarray:
+    """aHash для пакета уменьшенных изображений (N, 8, 8): бит = пиксель ярче среднего."""
+    return _pack(thumbs > thumbs.mean(axis=(1, 2), keepdims=True))
+
+
+def difference_hash_batch(thumbs: np.ndarray) -> np.ndarray:
+    """dHash для пакета уменьшенных изображений (N, 8, 9): бит = пиксель ярче правого соседа."""
+    return _pack(thumbs[:, :, :-1] > thumbs[:, :, 1:])
+
+
+def hash_images(images: Sequence[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Считает aHash и dHash для пакета изображений.
+
+    Изображения уменьшаются по отдельности (размеры разные), а сами хеши
+    считаются одной векторной операцией над всем пакетом.
+
+    :return: (ahash, dhash) — массивы uint64 длины len(images)
+    """
+    a_thumbs = np.empty((len(images), HASH_SIZE, HASH_SIZE), dtype=np.float32)
+    d_thumbs = np.empty((len(images), HASH_SIZE, HASH_SIZE + 1), dtype=np.float32)
+    for i, image in enumerate(images):
+        gray = to_gray(image)
+        a_thumbs[i] = downscale(gray, HASH_SIZE, HASH_SIZE)
+        d_thumbs[i] = downscale(gray, HASH_SIZE + 1, HASH_SIZE)
+    return average_hash_batch(a_thumbs), difference_hash_batch(d_thumbs)
@@ -1,33 +1,60 @@
-from datetime import datetime
-from .base import MediaFile
-from typing import Dict, Any
-from homework_04.domain.base import MediaFile
-
-class PhotoFile(MediaFile):
-    """Класс для работы с фото файлами."""
-    
-    def __init__(self, name: str, size: int, owner: str, 
-                 resolution: str, camera_model: str = None, **kwargs):
-        """
-        :param resolution: разрешение фото (например, '6000x4000')
-        :param camera_model: модель камеры, если известна
-        """
-        super().__init__(name, size, owner, **kwargs)
-        self.resolution = resolution
-        self.camera_model = camera_model
-        
-    def get_specific_metadata(self) -> Dict[str, Any]:
-        return {
-            'resolution': self.resolution,
-            'camera_model': self.camera_model
-        }
-        
-    def process(self) -> None:
-        """Выполняет обработку фото (например, изменение размера или применение фильтров)."""
-        print(f"Processing photo {self.name}...")
-        # Реализация обработки фото
-        
-    def detect_faces(self) -> None:
-        """Обнаруживает лица на фото."""
-        print(f"Detecting faces in {self.name}...")
-        # Реализация обнаружения лиц
\ No newline at end of file
+from datetime import datetime
+from .base import MediaFile
+from typing import Dict, Any, Tuple
+from homework_04.domain.base import MediaFile
+
+class PhotoFile(MediaFile):
+    """Класс для работы с фото файлами."""
+    
+    __slots__ = ('resolution', 'camera_model')
+    
+    def __init__(self, name: str, size: int, owner: str, 
+                 resolution: str, camera_model: str = None, **kwargs):
+        """
+        :param resolution: разрешение фото (например, '6000x4000')
+        :param camera_model: модель камеры, если известна
+        """
+        super().__init__(name, size, owner, **kwargs)
+        self.resolution = resolution
+        self.camera_model = camera_model
+        
+    def get_specific_metadata(self) -> Dict[str, Any]:
+        return {
+            'resolution': self.resolution,
+            'camera_model': self.camera_model
+        }
+        
+    def process(self) -> None:
+        """Выполняет обработку фото (например, изменение размера или применение фильтров)."""
+        print(f"Processing photo {self.name}...")
+        # Реализация обработки фото
+        
+    def detect_faces(self) -> None:
+        """Обнаруживает лица на фото."""
+        print(f"Detecting faces in {self.name}...")
+        # Реализация обнаружения лиц
+        
+    def perceptual_hash(self) -> Tuple[int, int]:
+        """
+        Возвращает перцептивные хеши фото (aHash, dHash) — 64-битные числа.
+
+        Хеши считаются по содержимому один раз и запоминаются в метаданных
+        ('ahash', 'dhash'), поэтому сохраняются вместе с файлом в хранилище.
+
+        :raises ValueError: если содержимого нет или формат не поддерживается
+        """
+        metadata = self.metadata
+        if 'ahash' in metadata and 'dhash' in metadata:
+            return int(metadata['ahash'], 16), int(metadata['dhash'], 16)
+        if self.content is None:
+            raise ValueError(f"Photo {self.name} has no content")
+        # NumPy нужен только для хешей, поэтому импортируем при вызове
+        from homework_04.domain.phash import decode_image, hash_images
+        ahash, dhash = hash_images([decode_image(self.content)])
+        self.set_perceptual_hash(int(ahash[0]), int(dhash[0]))
+        return int(ahash[0]), int(dhash[0])
+        
+    def set_perceptual_hash(self, ahash: int, dhash: int) -> None:
+        """Запоминает посчитанные снаружи (например, пакетно) хеши в метаданных."""
+        self.metadata['ahash'] = f'{ahash:016x}'
+        self.metadata['dhash'] = f'{dhash:016x}'
\ No newline at end of file
@@ -1,39 +1,77 @@
-from datetime import datetime
-from .base import MediaFile
-from typing import Dict, Any
-from homework_04.domain.base import MediaFile
-
-class VideoFile(MediaFile):
-    """Класс для работы с видео файлами."""
-    
-    def __init__(self, name: str, size: int, owner: str, 
-                 duration: float, resolution: str, codec: str, fps: float, **kwargs):
-        """
-        :param duration: длительность видео в секундах
-        :param resolution: разрешение видео (например, '1920x1080')
-        :param codec: используемый кодек (h264, h265, av1 и т.д.)
-        :param fps: кадров в секунду
-        """
-        super().__init__(name, size, owner, **kwargs)
-        self.duration = duration
-        self.resolution = resolution
-        self.codec = codec
-        self.fps = fps
-        
-    def get_specific_metadata(self) -> Dict[str, Any]:
-        return {
-            'duration': self.duration,
-            'resolution': self.resolution,
-            'codec': self.codec,
-            'fps': self.fps
-        }
-        
-    def process(self) -> None:
-        """Выполняет обработку видео файла (например, изменение разрешения)."""
-        print(f"Processing video file {self.name}...")
-        # Реализация обработки видео
-        
-    def extract_frames(self, interval: float = 1.0) -> None:
-        """Извлекает кадры из видео с заданным интервалом."""
-        print(f"Extracting frames from {self.name} with interval {interval}s...")
-        # Реализация извлечения кадров
+import math
+from datetime import datetime
+from .base import MediaFile
+from typing import Dict, Any, Iterator, Optional, Tuple, TYPE_CHECKING
+from homework_04.domain.base import MediaFile, LazyContent
+
+if TYPE_CHECKING:
+    import numpy as np
+
+class VideoFile(MediaFile):
+    """Класс для работы с видео файлами."""
+    
+    __slots__ = ('duration', 'resolution', 'codec', 'fps')
+    
+    def __init__(self, name: str, size: int, owner: str, 
+                 duration: float, resolution: str, codec: str, fps: float, **kwargs):
+        """
+        :param duration: длительность видео в секундах
+        :param resolution: разрешение видео (например, '1920x1080')
+        :param codec: используемый кодек (h264, h265, av1 и т.д.)
+        :param fps: кадров в секунду
+        """
+        super().__init__(name, size, owner, **kwargs)
+        self.duration = duration
+        self.resolution = resolution
+        self.codec = codec
+        self.fps = fps
+        
+    def get_specific_metadata(self) -> Dict[str, Any]:
+        return {
+            'duration': self.duration,
+            'resolution': self.resolution,
+            'codec': self.codec,
+            'fps': self.fps
+        }
+        
+    def process(self) -> None:
+        """Выполняет обработку видео файла (например, изменение разрешения)."""
+        print(f"Processing video file {self.name}...")
+        # Реализация обработки видео
+        
+    def extract_frames(self, interval: float = 1.0, storage=None, path: Optional[str] = None,
+                       batch_size: int = 32, mode: str = 'rgb') -> Iterator[Tuple['np.ndarray', 'np.ndarray']]:
+        """
+        Извлекает кадры из видео с заданным интервалом.
+
+        Кадры читаются по индексу байтовых оффсетов (строится один раз и
+        кэшируется рядом с файлом и в памяти процесса) ranged-запросами к
+        хранилищу, без чтения всего файла. Поддерживаются Y4M и raw YUV
+        (codec 'raw'/'yuv', размер кадра берется из resolution).
+
+        :param interval: интервал между кадрами в секундах
+        :param storage: хранилище с файлом; если не передано, используется
+                        хранилище ленивого содержимого или само содержимое в памяти
+        :param path: путь файла в хранилище (по умолчанию — имя файла)
+        :param batch_size: кадров в одном пакете
+        :param mode: 'rgb', 'yuv' или 'gray'
+        :return: пары (номера кадров, массив кадров формы (batch, H, W[, 3]))
+        """
+        # NumPy нужен только для кадров, поэтому импортируем при вызове
+        from homework_04.domain.frames import _RangeSource, _get_index, read_frames
+
+        if storage is None and isinstance(self._content, LazyContent):
+            storage, path = self._content.storage, path or self._content.path
+        if storage is not None:
+            source = _RangeSource.from_storage(storage, path or self.name)
+        elif self.content is not None:
+            source = _RangeSource.from_content(self.content)
+        else:
+            raise ValueError(f"Video file {self.name} has no content")
+
+        index = _get_index(source, storage, path or self.name, self.codec, self.resolution, self.fps)
+        # Время последнего кадра — (len - 1) / fps, а не длительность: иначе он теряется
+        last_frame = (len(index) - 1) / index.fps if index.fps and len(index) else 0.0
+        count = math.floor(last_frame / interval + 1e-9) + 1 if len(index) else 0
+        timestamps = [i * interval for i in range(count)]
+        return read_frames(source, index, timestamps, batch_size, mode)
\ No newline at end of file
@@ -0,0 +1,266 @@
+import json
+import struct
+from dataclasses import dataclass
+from typing import Any, Iterator, List, Optional
+import numpy as np
+
+# Сколько байт PCM обрабатывается за один шаг (память не зависит от длительности)
+PCM_CHUNK_SIZE = 4 * 1024 * 1024
+
+_MAGIC = b'PEAK'
+_HEADER = struct.Struct('<4sI')  # magic, длина JSON-заголовка
+
+_DTYPES = {1: np.uint8, 2: np.int16, 4: np.int32}
+
+
+@dataclass
+class WavInfo:
+    """Параметры PCM-данных WAV файла."""
+    channels: int
+    sample_rate: int
+    sample_width: int
+    data_offset: int
+    data_size: int
+
+    @property
+    def frames(self) -> int:
+        return self.data_size // (self.channels * self.sample_width)
+
+
+def parse_wav_header(header: bytes) -> WavInfo:
+    """
+    Разбирает RIFF/WAVE заголовок и находит начало PCM-данных.
+
+    :param header: первые байты файла (достаточно нескольких килобайт)
+    :raises ValueError: если это не PCM WAV
+    """
+    if header[:4] != b'RIFF' or header[8:12] != b'WAVE':
+        raise ValueError("Only PCM WAV content is supported")
+
+    offset, fmt = 12, None
+    while offset + 8 <= len(header):
+        chunk_id, chunk_size = struct.unpack_from('<4sI', header, offset)
+        body = offset + 8
+        if chunk_id == b'fmt ':
+            fmt = struct.unpack_from('<HHIIHH', header, body)
+        elif chunk_id == b'data':
+            if fmt is None:
+                break
+            audio_format, channels, sample_rate, _, _, bits = fmt
+            if audio_format != 1 or bits // 8 not in _DTYPES:
+                raise ValueError(f"Unsupported WAV format {audio_format} with {bits} bits")
+            return WavInfo(channels, sample_rate, bits // 8, body, chunk_size)
+        offset = body + chunk_size + (chunk_size & 1)
+    raise ValueError("WAV header does not contain fmt/data chunks")
+
+
+def _content_view(content: Any) -> Optional[memoryview]:
+    """memoryview без копирования для bytes, BytesIO и mmap-содержимого; None для потоков."""
+    if isinstance(content, (bytes, bytearray, memoryview)):
+        return memoryview(content)
+    if hasattr(content, 'getbuffer'):
+        return content.getbuffer()
+    return None
+
+
+def _iter_pcm_chunks(content: Any, info: WavInfo, chunk_size: int) -> Iterator[np.ndarray]:
+    """
+    Отдает PCM-данные блоками в виде массивов (frames, channels).
+
+    Буферы (в т.ч. mmap) читаются срезами без копирования, потоки — по chunk_size байт.
+    """
+    frame_bytes = info.channels * info.sample_width
+    chunk_size -= chunk_size % frame_bytes
+    dtype = _DTYPES[info.sample_width]
+
+    view = _content_view(content)
+    if view is not None:
+        end = min(info.data_offset + info.data_size, len(view))
+        end -= (end - info.data_offset) % frame_bytes
+        for start in range(info.data_offset, end, chunk_size):
+            chunk = np.frombuffer(view[start:min(start + chunk_size, end)], dtype=dtype)
+            yield chunk.reshape(-1, info.channels)
+        return
+
+    stream = content.open() if hasattr(content, 'open') else content
+    try:
+        stream.seek(info.data_offset)
+        remaining, tail = info.data_size, b''
+        while remaining > 0:
+            data = stream.read(min(chunk_size, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            data = tail + data
+            usable = len(data) - len(data) % frame_bytes
+            tail = data[usable:]
+            yield np.frombuffer(data[:usable], dtype=dtype).reshape(-1, info.channels)
+    finally:
+        if stream is not content:
+            stream.close()
+
+
+def _to_int16(samples: np.ndarray) -> np.ndarray:
+    """Приводит отсчеты любой поддерживаемой разрядности к шкале int16."""
+    if samples.dtype == np.uint8:
+        return ((samples.astype(np.int16) - 128) << 8)
+    if samples.dtype == np.int32:
+        return (samples >> 16).astype(np.int16)
+    return samples
+
+
+class PeakPyramid:
+    """
+    Многоуровневая min/max пирамида пиков для отрисовки waveform.
+
+    Уровень 0 хранит (min, max) для каждого блока из base_block отсчетов,
+    каждый следующий уровень объединяет factor блоков предыдущего.
+    Пирамида сохраняется рядом с аудио файлом (<path>.peaks), а любой
+    диапазон любого уровня читается из хранилища отдельно, без
+    повторного декодирования аудио.
+    """
+
+    def __init__(self, levels: List[np.ndarray], sample_rate: int, channels: int,
+                 base_block: int, factor: int):
+        """
+        :param levels: массивы формы (blocks, 2) int16 с парами (min, max)
+        """
+        self.levels = levels
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.base_block = base_block
+        self.factor = factor
+
+    @classmethod
+    def build(cls, content: Any, base_block: int = 256, factor: int = 4,
+              min_blocks: int = 512, chunk_size: int = PCM_CHUNK_SIZE) -> 'PeakPyramid':
+        """
+        Строит пирамиду по содержимому PCM WAV файла потоково.
+
+        :param base_block: отсчетов в блоке нулевого уровня
+        :param factor: во сколько раз каждый уровень грубее предыдущего
+        :param min_blocks: уровни строятся, пока в них не меньше min_blocks блоков
+        :param chunk_size: сколько байт PCM обрабатывается за шаг
+        """
+        view = _content_view(content)
+        if view is not None:
+            header = bytes(view[:4096])
+        else:
+            stream = content.open() if hasattr(content, 'open') else content
+            stream.seek(0)
+            header = stream.read(4096)
+            if stream is not content:
+                stream.close()
+        info = parse_wav_header(header)
+
+        chunk_size = max(chunk_size - chunk_size % (base_block * info.channels * info.sample_width),
+                         base_block * info.channels * info.sample_width)
+        # Пики сводятся в моно: min/max блока берутся сразу по всем каналам
+        block = base_block * info.channels
+        mins, maxs = [], []
+        tail = np.empty((0,), dtype=np.int16)
+        for frames in _iter_pcm_chunks(content, info, chunk_size):
+            samples = _to_int16(frames).reshape(-1)
+            if tail.size:
+                samples = np.concatenate([tail, samples])
+            full = len(samples) - len(samples) % block
+            blocks = samples[:full].reshape(-1, block)
+            mins.append(blocks.min(axis=1))
+            maxs.append(blocks.max(axis=1))
+            tail = samples[full:].copy()
+        if tail.size:
+            mins.append(tail.min(keepdims=True))
+            maxs.append(tail.max(keepdims=True))
+
+        level0 = np.empty((sum(len(m) for m in mins), 2), dtype=np.int16)
+        if len(level0):
+            level0[:, 0] = np.concatenate(mins)
+            level0[:, 1] = np.concatenate(maxs)
+
+        levels = [level0]
+        while len(levels[-1]) >= min_blocks * factor:
+            levels.append(cls._reduce(levels[-1], factor))
+        return cls(levels, info.sample_rate, info.channels, base_block, factor)
+
+    @staticmethod
+    def _reduce(level: np.ndarray, factor: int) -> np.ndarray:
+        """Объединяет каждые factor блоков уровня в один."""
+        full = len(level) - len(level) % factor
+        blocks = level[:full].reshape(-1, factor, 2)
+        reduced = np.stack([blocks[:, :, 0].min(axis=1), blocks[:, :, 1].max(axis=1)], axis=1)
+        if full < len(level):
+            rest = level[full:]
+            reduced = np.vstack([reduced, [[rest[:, 0].min(), rest[:, 1].max()]]])
+        return reduced.astype(np.int16)
+
+    def samples_per_block(self, level: int) -> int:
+        """Сколько отсчетов покрывает один блок уровня."""
+        return self.base_block * self.factor ** level
+
+    def level_for(self, seconds: float, width: int) -> int:
+        """Самый грубый уровень, у которого на width пикселей приходится хотя бы по блоку."""
+        samples_per_pixel = seconds * self.sample_rate / max(width, 1)
+        level = 0
+        while level + 1 < len(self.levels) and self.samples_per_block(level + 1) <= samples_per_pixel:
+            level += 1
+        return level
+
+    def to_bytes(self) -> bytes:
+        """Сериализует пирамиду: заголовок с оффсетами уровней, затем пары int16 уровней подряд."""
+        offset, levels = 0, []
+        for level in self.levels:
+            levels.append({'blocks': len(level), 'offset': offset})
+            offset += level.nbytes
+        header = json.dumps({
+            'sample_rate': self.sample_rate,
+            'channels': self.channels,
+            'base_block': self.base_block,
+            'factor': self.factor,
+            'levels': levels,
+        }).encode('utf-8')
+        return b''.join([_HEADER.pack(_MAGIC, len(header)), header]
+                        + [np.ascontiguousarray(level, dtype='<i2').tobytes() for level in self.levels])
+
+    def save(self, storage, path: str) -> str:
+        """Сохраняет пирамиду рядом с аудио файлом. Возвращает путь пирамиды."""
+        with storage.open_writer(peaks_path(path)) as writer:
+            writer.write(self.to_bytes())
+        return peaks_path(path)
+
+    @staticmethod
+    def read_header(storage, path: str) -> dict:
+        """Читает заголовок сохраненной пирамиды (уровни, оффсеты, параметры)."""
+        with storage.open_reader(peaks_path(path)) as reader:
+            magic, size = _HEADER.unpack(reader.read(_HEADER.size))
+            if magic != _MAGIC:
+                raise ValueError(f"{peaks_path(path)} is not a peak pyramid")
+            header = json.loads(reader.read(size))
+        header['data_offset'] = _HEADER.size + size
+        return header
+
+    @classmethod
+    def read_level(cls, storage, path: str, level: int, start: int = 0,
+                   count: Optional[int] = None, header: Optional[dict] = None) -> np.ndarray:
+        """
+        Читает диапазон блоков одного уровня сохраненной пирамиды.
+
+        Читаются только байты запрошенного диапазона, аудио не декодируется.
+
+        :param start: первый блок
+        :param count: число блоков (по умолчанию — до конца уровня)
+        :param header: заранее прочитанный заголовок (экономит запрос)
+        :return: массив (count, 2) int16 с парами (min, max)
+        """
+        header = header or cls.read_header(storage, path)
+        info = header['levels'][level]
+        start = min(max(start, 0), info['blocks'])
+        count = info['blocks'] - start if count is None else min(count, info['blocks'] - start)
+        offset = header['data_offset'] + info['offset'] + start * 4
+        data = storage.load_range(peaks_path(path), offset, offset + count * 4)
+        return np.frombuffer(data, dtype='<i2').reshape(-1, 2)
+
+
+def peaks_path(path: str) -> str:
+    """Путь пирамиды пиков для аудио файла."""
+    return f"{path}.peaks"
+
@@ -0,0 +1,314 @@
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+from homework_04.domain.base import MediaFile
+from homework_04.infra.storage.base import (
+    Storage, BatchResult, create_media_file, media_content_type, media_metadata
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS media (
+    path         TEXT PRIMARY KEY,
+    name         TEXT NOT NULL,
+    media_type   TEXT NOT NULL,
+    content_type TEXT NOT NULL,
+    owner        TEXT NOT NULL,
+    size         INTEGER NOT NULL,
+    created_at   REAL NOT NULL,
+    codec        TEXT,
+    duration     REAL,
+    metadata     TEXT NOT NULL,
+    updated_at   REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS media_owner_type_created ON media (owner, media_type, created_at, path);
+CREATE INDEX IF NOT EXISTS media_type_created ON media (media_type, created_at, path);
+CREATE INDEX IF NOT EXISTS media_type_duration ON media (media_type, duration);
+CREATE INDEX IF NOT EXISTS media_codec_created ON media (codec, created_at, path);
+CREATE INDEX IF NOT EXISTS media_created ON media (created_at, path);
+"""
+
+_COLUMNS = 'path, name, media_type, content_type, owner, size, created_at, codec, duration, metadata'
+
+# Курсор постраничной выдачи: (created_at, path) последней записи страницы
+Cursor = Tuple[float, str]
+
+
+@dataclass
+class CatalogPage:
+    """
+    Страница результатов запроса к каталогу.
+
+    :param items: пары (путь, MediaFile без содержимого)
+    :param next_cursor: курсор следующей страницы (None, если это последняя)
+    """
+    items: List[Tuple[str, MediaFile]]
+    next_cursor: Optional[Cursor] = None
+
+
+def _timestamp(value: datetime) -> float:
+    return value.timestamp()
+
+
+class MediaCatalog:
+    """
+    Локальный каталог медиа-файлов на SQLite.
+
+    Хранит метаданные файлов с индексами по владельцу, типу, дате создания,
+    кодеку и длительности, так что выборки вида «все видео владельца X
+    длиннее 10 минут с даты Y» не требуют ни одного запроса к хранилищу.
+    Выдача постраничная, по курсору (created_at, path), без OFFSET.
+    """
+
+    def __init__(self, db_path: str = ':memory:'):
+        """
+        :param db_path: путь к файлу базы (по умолчанию — база в памяти)
+        """
+        self.db_path = db_path
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            if db_path != ':memory:':
+                self._conn.execute('PRAGMA journal_mode=WAL')
+                self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.executescript(_SCHEMA)
+            columns = {row[1] for row in self._conn.execute('PRAGMA table_info(media)')}
+            if 'updated_at' not in columns:
+                # База, созданная до появления колонки: старые записи считаются давними
+                self._conn.execute('ALTER TABLE media ADD COLUMN updated_at REAL NOT NULL DEFAULT 0')
+
+    def add(self, path: str, media_file: MediaFile) -> None:
+        """Добавляет или обновляет запись о файле."""
+        self.add_many([(path, media_file)])
+
+    def add_many(self, files: Iterable[Tuple[str, MediaFile]]) -> int:
+        """Добавляет или обновляет записи одной транзакцией. Возвращает число записей."""
+        rows = [self._to_row(path, media_file) for path, media_file in files]
+        with self._lock:
+            # Время ставится под блокировкой, чтобы rebuild мог отличить записи, обновленные после его начала
+            updated_at = time.time()
+            self._conn.execute('BEGIN')
+            try:
+                self._conn.executemany(
+                    f'INSERT OR REPLACE INTO media ({_COLUMNS}, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    [(*row, updated_at) for row in rows]
+                )
+                self._conn.execute('COMMIT')
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+        return len(rows)
+
+    def remove(self, path: str) -> bool:
+        """Удаляет запись о файле."""
+        with self._lock:
+            return self._conn.execute('DELETE FROM media WHERE path = ?', (path,)).rowcount > 0
+
+    def get(self, path: str) -> Optional[MediaFile]:
+        """Возвращает файл по пути (без содержимого)."""
+        with self._lock:
+            row = self._conn.execute(f'SELECT {_COLUMNS} FROM media WHERE path = ?', (path,)).fetchone()
+        return self._from_row(row)[1] if row else None
+
+    def query(self,
+              owner: Optional[str] = None,
+              media_type: Optional[str] = None,
+              codec: Optional[str] = None,
+              min_duration: Optional[float] = None,
+              max_duration: Optional[float] = None,
+              created_after: Optional[datetime] = None,
+              created_before: Optional[datetime] = None,
+              limit: int = 100,
+              cursor: Optional[Cursor] = None) -> CatalogPage:
+        """
+        Ищет файлы по условиям (все условия объединяются через AND).
+
+        :param media_type: имя класса файла: 'AudioFile', 'VideoFile', 'PhotoFile'...
+        :param min_duration: минимальная длительность в секундах
+        :param created_after: файлы, созданные не раньше этой даты
+        :param limit: размер страницы
+        :param cursor: next_cursor предыдущей страницы
+        """
+        conditions, params = [], []
+        for column, value in (('owner', owner), ('media_type', media_type), ('codec', codec)):
+            if value is not None:
+                conditions.append(f'{column} = ?')
+                params.append(value)
+        if min_duration is not None:
+            conditions.append('duration >= ?')
+            params.append(min_duration)
+        if max_duration is not None:
+            conditions.append('duration <= ?')
+            params.append(max_duration)
+        if created_after is not None:
+            conditions.append('created_at >= ?')
+            params.append(_timestamp(created_after))
+        if created_before is not None:
+            conditions.append('created_at < ?')
+            params.append(_timestamp(created_before))
+        if cursor is not None:
+            conditions.append('(created_at, path) > (?, ?)')
+            params.extend(cursor)
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        sql = f'SELECT {_COLUMNS} FROM media {where} ORDER BY created_at, path LIMIT ?'
+        with self._lock:
+            rows = self._conn.execute(sql, (*params, limit + 1)).fetchall()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = (rows[-1][6], rows[-1][0])
+        return CatalogPage([self._from_row(row) for row in rows], next_cursor)
+
+    def iter_query(self, page_size: int = 1000, **filters) -> Iterator[Tuple[str, MediaFile]]:
+        """Перебирает все результаты запроса постранично."""
+        cursor = None
+        while True:
+            page = self.query(limit=page_size, cursor=cursor, **filters)
+            yield from page.items
+            if page.next_cursor is None:
+                return
+            cursor = page.next_cursor
+
+    def count(self) -> int:
+        """Количество файлов в каталоге."""
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM media').fetchone()[0]
+
+    def rebuild(self, storage: Storage, prefix: str = '', batch_size: int = 1000) -> int:
+        """
+        Перестраивает каталог по листингу хранилища (например, бакета S3).
+
+        Ключи перечисляются постранично, метаданные загружаются пакетами
+        через storage.stat_many (параллельные HEAD), а записи вставляются
+        или обновляются одной транзакцией на пакет. Записи с префиксом,
+        которых нет в листинге, удаляются в конце одной транзакцией, поэтому
+        запросы во время перестройки не видят частичного каталога. Если
+        метаданные файла загрузить не удалось, его прежняя запись остается.
+        Удаляются только записи, обновленные до начала перестройки: файлы,
+        сохраненные параллельно с ней, могли не попасть в листинг.
+
+        :return: количество проиндексированных файлов
+        """
+        indexed = 0
+        seen = set()
+        with self._lock:
+            started_at = time.time()
+        paths = storage.list_paths(prefix)
+        while True:
+            batch = list(islice(paths, batch_size))
+            if not batch:
+                break
+            results = storage.stat_many(batch)
+            found = [(path, result.value) for path, result in results.items()
+                     if result.ok and result.value is not None]
+            indexed += self.add_many(found)
+            seen.update(path for path, result in results.items() if not result.ok)
+            seen.update(path for path, _ in found)
+
+        with self._lock:
+            self._conn.execute('BEGIN')
+            try:
+                stale = [
+                    row for row in self._conn.execute(
+                        "SELECT path FROM media WHERE substr(path, 1, ?) = ? AND updated_at < ?",
+                        (len(prefix), prefix, started_at)
+                    ).fetchall()
+                    if row[0] not in seen
+                ]
+                self._conn.executemany('DELETE FROM media WHERE path = ?', stale)
+                self._conn.execute('COMMIT')
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+        return indexed
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _to_row(self, path: str, media_file: MediaFile) -> tuple:
+        specific = media_file.get_specific_metadata()
+        return (
+            path,
+            media_file.name,
+            media_file.__class__.__name__,
+            media_content_type(media_file),
+            media_file.owner,
+            media_file.size,
+            _timestamp(media_file.created_at),
+            specific.get('codec'),
+            specific.get('duration'),
+            json.dumps(media_metadata(media_file), ensure_ascii=False),
+        )
+
+    def _from_row(self, row: tuple) -> Tuple[str, MediaFile]:
+        path, name, _, content_type, owner, size, created_at, _, _, metadata = row
+        return path, create_media_file(
+            name=name,
+            size=size,
+            owner=owner,
+            created_at=datetime.fromtimestamp(created_at, timezone.utc),
+            content_type=content_type,
+            metadata=json.loads(metadata)
+        )
+
+
+class CatalogedStorage(Storage):
+    """Хранилище, которое поддерживает MediaCatalog в актуальном состоянии при save/delete."""
+
+    def __init__(self, backend: Storage, catalog: MediaCatalog):
+        self.backend = backend
+        self.catalog = catalog
+
+    def save(self, media_file: MediaFile, path: str) -> bool:
+        if not self.backend.save(media_file, path):
+            return False
+        self.catalog.add(path, media_file)
+        return True
+
+    def load(self, path: str, load_content: bool = True) -> Optional[MediaFile]:
+        if not load_content:
+            # Метаданные уже есть в каталоге — к хранилищу не обращаемся
+            media_file = self.catalog.get(path)
+            if media_file is not None:
+                return media_file
+        return self.backend.load(path, load_content=load_content)
+
+    def delete(self, path: str) -> bool:
+        deleted = self.backend.delete(path)
+        if deleted:
+            self.catalog.remove(path)
+        return deleted
+
+    def delete_many(self, paths: Iterable[str]) -> Dict[str, BatchResult]:
+        results = self.backend.delete_many(paths)
+        for path, result in results.items():
+            # Файлы, которые не удалось удалить, остаются в каталоге
+            if result.ok:
+                self.catalog.remove(path)
+        return results
+
+    def exists(self, path: str) -> bool:
+        return self.backend.exists(path)
+
+    def version(self, path: str) -> Optional[str]:
+        return self.backend.version(path)
+
+    def list_paths(self, prefix: str = '') -> Iterator[str]:
+        return self.backend.list_paths(prefix)
+
+    def open_reader(self, path: str) -> BinaryIO:
+        return self.backend.open_reader(path)
+
+    def load_range(self, path: str, start: int, end: int) -> bytes:
+        return self.backend.load_range(path, start, end)
+
+    def open_writer(self, path: str) -> BinaryIO:
+        # Метаданные потоковой записи неизвестны — запись появится в каталоге после rebuild
+        return self.backend.open_writer(path)
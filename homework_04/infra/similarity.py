@@ -0,0 +1,296 @@
+import logging
+import threading
+from itertools import combinations, islice
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+import numpy as np
+from homework_04.domain.base import MediaFile
+from homework_04.domain.phash import check_hashable, decode_image, hamming, hash_images
+from homework_04.domain.photofile import PhotoFile
+from homework_04.infra.storage.base import Storage, BatchResult
+
+logger = logging.getLogger(__name__)
+
+# Хеш делится на CHUNKS подстрок по CHUNK_BITS бит (multi-index hashing)
+CHUNKS = 4
+CHUNK_BITS = 64 // CHUNKS
+_CHUNK_MASK = np.uint64((1 << CHUNK_BITS) - 1)
+
+
+def _flip_masks(radius: int) -> np.ndarray:
+    """Все маски подстроки с не более чем radius единичными битами."""
+    masks = [0]
+    for r in range(1, radius + 1):
+        for bits in combinations(range(CHUNK_BITS), r):
+            masks.append(sum(1 << bit for bit in bits))
+    return np.array(masks, dtype=np.uint64)
+
+
+class HashIndex:
+    """
+    Индекс 64-битных перцептивных хешей для поиска по расстоянию Хэмминга.
+
+    Multi-index hashing: хеш делится на 4 подстроки по 16 бит, и для каждой
+    подстроки хранится отсортированная таблица. Если расстояние между
+    хешами не больше k, то хотя бы одна подстрока отличается не больше чем
+    на k // 4 бит, поэтому кандидаты находятся бинарным поиском по
+    нескольким соседним значениям подстрок, а точное расстояние
+    проверяется только для них — без перебора всего индекса.
+
+    Новые хеши сначала попадают в небольшой несортированный хвост, который
+    просматривается линейно и периодически вливается в таблицы.
+    """
+
+    def __init__(self, merge_threshold: int = 4096):
+        """
+        :param merge_threshold: размер хвоста, после которого таблицы перестраиваются
+                                (но не реже, чем при росте индекса на 1/8)
+        """
+        self.merge_threshold = merge_threshold
+        self.paths: List[str] = []
+        self._hashes = np.empty(1024, dtype=np.uint64)
+        self._alive = np.empty(1024, dtype=bool)
+        self._rows: Dict[str, int] = {}
+        # Отсортированные значения подстрок по таблицам и номера строк всех таблиц подряд
+        self._tables: List[np.ndarray] = []
+        self._orders = np.empty(0, dtype=np.intp)
+        self._indexed = 0
+        self._masks: Dict[int, np.ndarray] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def add(self, path: str, value: int) -> None:
+        """Добавляет или обновляет хеш файла."""
+        self.add_many([(path, value)])
+
+    def add_many(self, items: Iterable[Tuple[str, int]]) -> int:
+        """Добавляет или обновляет хеши файлов. Возвращает число добавленных."""
+        items = list(items)
+        with self._lock:
+            for path, _ in items:
+                row = self._rows.pop(path, None)
+                if row is not None:
+                    self._alive[row] = False
+            start = len(self.paths)
+            self._reserve(start + len(items))
+            self._hashes[start:start + len(items)] = [value for _, value in items]
+            self._alive[start:start + len(items)] = True
+            for i, (path, _) in enumerate(items):
+                self.paths.append(path)
+                self._rows[path] = start + i
+            pending = len(self.paths) - self._indexed
+            if pending > max(self.merge_threshold, self._indexed // 8):
+                self._build_tables()
+        return len(items)
+
+    def remove(self, path: str) -> bool:
+        """Удаляет хеш файла из индекса."""
+        with self._lock:
+            row = self._rows.pop(path, None)
+            if row is None:
+                return False
+            self._alive[row] = False
+            return True
+
+    def get(self, path: str) -> Optional[int]:
+        """Хеш файла (None, если его нет в индексе)."""
+        with self._lock:
+            row = self._rows.get(path)
+            return int(self._hashes[row]) if row is not None else None
+
+    def search(self, value: int, k: int) -> List[Tuple[str, int]]:
+        """
+        Ищет хеши на расстоянии Хэмминга не больше k.
+
+        :return: пары (путь, расстояние), от ближайших к дальним
+        """
+        query = np.uint64(value)
+        with self._lock:
+            rows = np.concatenate([self._table_candidates(query, k // CHUNKS),
+                                   np.arange(self._indexed, len(self.paths))])
+            # Сначала отсекаем далекие кандидаты, дубликаты убираем уже среди найденных
+            rows = rows[(hamming(self._hashes[rows], query) <= k) & self._alive[rows]]
+            rows = np.unique(rows)
+            distances = hamming(self._hashes[rows], query)
+            order = np.lexsort((rows, distances))
+            return [(self.paths[row], int(distance)) for row, distance in zip(rows[order], distances[order])]
+
+    def search_linear(self, value: int, k: int) -> List[Tuple[str, int]]:
+        """Тот же поиск полным перебором (для проверки и сравнения скорости)."""
+        with self._lock:
+            distances = hamming(self._hashes[:len(self.paths)], np.uint64(value))
+            rows = np.flatnonzero((distances <= k) & self._alive[:len(self.paths)])
+            order = np.lexsort((rows, distances[rows]))
+            return [(self.paths[row], int(distances[row])) for row in rows[order]]
+
+    def rebuild(self, storage: Storage, prefix: str = '', kind: str = 'dhash',
+                batch_size: int = 1000) -> int:
+        """
+        Заполняет индекс по хешам, сохраненным в метаданных файлов хранилища.
+
+        :param kind: 'ahash' или 'dhash'
+        :return: количество проиндексированных файлов
+        """
+        indexed = 0
+        paths = storage.list_paths(prefix)
+        while True:
+            batch = list(islice(paths, batch_size))
+            if not batch:
+                return indexed
+            results = storage.stat_many(batch)
+            indexed += self.add_many(
+                (path, int(result.value.metadata[kind], 16)) for path, result in results.items()
+                if result.ok and result.value is not None and kind in result.value.metadata
+            )
+
+    def _reserve(self, size: int) -> None:
+        if size <= len(self._hashes):
+            return
+        capacity = max(size, 2 * len(self._hashes))
+        self._hashes = np.resize(self._hashes, capacity)
+        self._alive = np.resize(self._alive, capacity)
+
+    def _build_tables(self) -> None:
+        """Перестраивает отсортированные таблицы подстрок по всем живым строкам."""
+        live = np.flatnonzero(self._alive[:len(self.paths)])
+        if len(live) < len(self.paths):
+            # Уплотняем: удаленные и замененные строки больше не нужны
+            self.paths = [self.paths[row] for row in live]
+            self._hashes[:len(live)] = self._hashes[live]
+            self._alive[:len(live)] = True
+            self._rows = {path: row for row, path in enumerate(self.paths)}
+        hashes = self._hashes[:len(self.paths)]
+        self._tables, orders = [], []
+        for chunk in range(CHUNKS):
+            values = (hashes >> np.uint64(chunk * CHUNK_BITS)) & _CHUNK_MASK
+            order = np.argsort(values, kind='stable')
+            self._tables.append(values[order])
+            orders.append(order)
+        self._orders = np.concatenate(orders)
+        self._indexed = len(self.paths)
+
+    def _table_candidates(self, query: np.uint64, radius: int) -> np.ndarray:
+        """Строки таблиц, у которых хотя бы одна подстрока в пределах radius бит от запроса."""
+        if not self._indexed:
+            return np.empty(0, dtype=np.intp)
+        masks = self._masks.get(radius)
+        if masks is None:
+            masks = self._masks[radius] = _flip_masks(radius)
+        starts, ends = [], []
+        for chunk, values in enumerate(self._tables):
+            probes = ((query >> np.uint64(chunk * CHUNK_BITS)) & _CHUNK_MASK) ^ masks
+            starts.append(np.searchsorted(values, probes, side='left') + chunk * self._indexed)
+            ends.append(np.searchsorted(values, probes, side='right') + chunk * self._indexed)
+        # Склеиваем диапазоны [start, end) всех таблиц одним gather без цикла по пробам
+        starts, ends = np.concatenate(starts), np.concatenate(ends)
+        lengths = ends - starts
+        positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        return self._orders[positions]
+
+
+class HashingStorage(Storage):
+    """
+    Хранилище, которое при сохранении фото считает их перцептивные хеши
+    и поддерживает HashIndex для поиска похожих (почти дубликатов).
+
+    Хеши записываются в метаданные фото, поэтому индекс можно восстановить
+    по хранилищу через HashIndex.rebuild.
+    """
+
+    def __init__(self, backend: Storage, index: HashIndex, kind: str = 'dhash'):
+        """
+        :param kind: какой хеш индексировать: 'ahash' или 'dhash'
+        """
+        self.backend = backend
+        self.index = index
+        self.kind = kind
+
+    def save(self, media_file: MediaFile, path: str) -> bool:
+        if isinstance(media_file, PhotoFile):
+            self._hash_photos([media_file])
+        if not self.backend.save(media_file, path):
+            return False
+        self._index(path, media_file)
+        return True
+
+    def save_many(self, files: Mapping[str, MediaFile]) -> Dict[str, BatchResult]:
+        """Сохраняет файлы, посчитав хеши всех фото пакета одной векторной операцией."""
+        self._hash_photos([media_file for media_file in files.values() if isinstance(media_file, PhotoFile)])
+        results = self.backend.save_many(files)
+        for path, result in results.items():
+            if result.ok:
+                self._index(path, files[path])
+        return results
+
+    def find_similar(self, photo: PhotoFile, k: int = 8) -> List[Tuple[str, int]]:
+        """
+        Ищет в индексе фото на расстоянии Хэмминга не больше k от данного.
+
+        :return: пары (путь, расстояние), от ближайших к дальним
+        """
+        ahash, dhash = photo.perceptual_hash()
+        return self.index.search(dhash if self.kind == 'dhash' else ahash, k)
+
+    def load(self, path: str, load_content: bool = True) -> Optional[MediaFile]:
+        return self.backend.load(path, load_content=load_content)
+
+    def delete(self, path: str) -> bool:
+        deleted = self.backend.delete(path)
+        if deleted:
+            self.index.remove(path)
+        return deleted
+
+    def exists(self, path: str) -> bool:
+        return self.backend.exists(path)
+
+    def version(self, path: str) -> Optional[str]:
+        return self.backend.version(path)
+
+    def list_paths(self, prefix: str = '') -> Iterator[str]:
+        return self.backend.list_paths(prefix)
+
+    def open_reader(self, path: str) -> BinaryIO:
+        return self.backend.open_reader(path)
+
+    def load_range(self, path: str, start: int, end: int) -> bytes:
+        return self.backend.load_range(path, start, end)
+
+    def open_writer(self, path: str) -> BinaryIO:
+        # Потоковая запись не дает MediaFile — такие фото попадут в индекс после rebuild
+        return self.backend.open_writer(path)
+
+    def _hash_photos(self, photos: List[PhotoFile]) -> None:
+        """
+        Считает хеши фото, у которых их еще нет, одним пакетом.
+
+        Фото, которые не удалось разобрать или которые слишком малы, пропускаются:
+        ошибка хеширования не должна срывать сохранение.
+        """
+        images, pending = [], []
+        for photo in photos:
+            if 'ahash' in photo.metadata and 'dhash' in photo.metadata or photo.content is None:
+                continue
+            try:
+                image = decode_image(photo.content)
+                check_hashable(image)
+            except ValueError as e:
+                logger.warning("Skipping perceptual hash for %s: %s", photo.name, e,
+                               extra={'operation': 'perceptual_hash', 'file_name': photo.name})
+                continue
+            images.append(image)
+            pending.append(photo)
+        if not images:
+            return
+        try:
+            ahashes, dhashes = hash_images(images)
+        except Exception as e:
+            logger.warning("Perceptual hashing failed for %d photo(s): %s", len(images), e,
+                           extra={'operation': 'perceptual_hash'})
+            return
+        for photo, ahash, dhash in zip(pending, ahashes.tolist(), dhashes.tolist()):
+            photo.set_perceptual_hash(ahash, dhash)
+
+    def _index(self, path: str, media_file: MediaFile) -> None:
+        if isinstance(media_file, PhotoFile) and self.kind in media_file.metadata:
+            self.index.add(path, int(media_file.metadata[self.kind], 16))
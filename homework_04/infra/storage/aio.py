@@ -0,0 +1,184 @@
+import asyncio
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, AsyncIterator, BinaryIO, Callable, Optional
+from homework_04.domain.base import MediaFile
+from homework_04.infra.storage.base import Storage, CHUNK_SIZE
+from homework_04.infra.storage.local import LocalStorage
+
+
+class AsyncStorage(ABC):
+    """Абстрактный базовый класс для асинхронных хранилищ (asyncio)."""
+
+    @abstractmethod
+    async def save(self, media_file: MediaFile, path: str) -> bool:
+        """Сохраняет файл в хранилище."""
+        pass
+
+    @abstractmethod
+    async def load(self, path: str, load_content: bool = True) -> Optional[MediaFile]:
+        """Загружает файл из хранилища."""
+        pass
+
+    @abstractmethod
+    async def delete(self, path: str) -> bool:
+        """Удаляет файл из хранилища."""
+        pass
+
+    @abstractmethod
+    async def exists(self, path: str) -> bool:
+        """Проверяет существование файла в хранилище."""
+        pass
+
+    @abstractmethod
+    def iter_chunks(self, path: str, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+        """Асинхронно читает файл из хранилища блоками фиксированного размера."""
+        pass
+
+    @abstractmethod
+    async def open_writer(self, path: str) -> 'AsyncWriter':
+        """Открывает файл в хранилище для потоковой записи."""
+        pass
+
+    async def aclose(self) -> None:
+        """Освобождает ресурсы хранилища."""
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
+
+
+class AsyncWriter:
+    """Асинхронная обертка над синхронным writer'ом хранилища."""
+
+    def __init__(self, storage: 'ThreadedAsyncStorage', writer: BinaryIO):
+        self._storage = storage
+        self._writer = writer
+
+    async def write(self, data) -> int:
+        return await self._storage._run(self._writer.write, data)
+
+    async def close(self) -> None:
+        await self._storage._run(self._writer.close)
+
+    async def discard(self) -> None:
+        """Отменяет запись."""
+        await self._storage._run(self._writer.discard)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            await self.discard()
+        else:
+            await self.close()
+
+
+class ThreadedAsyncStorage(AsyncStorage):
+    """
+    Асинхронный адаптер над синхронным Storage.
+
+    Блокирующие вызовы (boto3, файловый ввод-вывод) выполняются в собственном
+    пуле потоков хранилища и не блокируют event loop. Число одновременных
+    операций ограничено семафором, а пул потоков переиспользуется, поэтому
+    сетевые соединения клиента тоже не пересоздаются.
+    """
+
+    def __init__(self, storage: Storage, max_concurrency: int = 64):
+        """
+        :param storage: синхронное хранилище
+        :param max_concurrency: максимальное число одновременных операций
+        """
+        self.storage = storage
+        self.max_concurrency = max_concurrency
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='async-storage')
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def save(self, media_file: MediaFile, path: str) -> bool:
+        return await self._run(self.storage.save, media_file, path)
+
+    async def load(self, path: str, load_content: bool = True) -> Optional[MediaFile]:
+        return await self._run(self.storage.load, path, load_content=load_content)
+
+    async def delete(self, path: str) -> bool:
+        return await self._run(self.storage.delete, path)
+
+    async def exists(self, path: str) -> bool:
+        return await self._run(self.storage.exists, path)
+
+    async def iter_chunks(self, path: str, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+        reader = await self._run(self.storage.open_reader, path)
+        try:
+            while True:
+                chunk = await self._run(reader.read, chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            await self._run(reader.close)
+
+    async def load_range(self, path: str, start: int, end: int) -> bytes:
+        return await self._run(self.storage.load_range, path, start, end)
+
+    async def open_writer(self, path: str, **kwargs) -> AsyncWriter:
+        writer = await self._run(self.storage.open_writer, path, **kwargs)
+        return AsyncWriter(self, writer)
+
+    async def aclose(self) -> None:
+        self._executor.shutdown(wait=False)
+
+    async def _run(self, func: Callable, *args, **kwargs) -> Any:
+        """Выполняет блокирующий вызов в пуле потоков с ограничением параллелизма."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+
+class AsyncLocalStorage(ThreadedAsyncStorage):
+    """Асинхронное локальное хранилище файлов."""
+
+    def __init__(self, base_path: str = '.', chunk_size: int = CHUNK_SIZE, max_concurrency: int = 64):
+        super().__init__(LocalStorage(base_path, chunk_size), max_concurrency)
+
+
+class AsyncS3Storage(ThreadedAsyncStorage):
+    """
+    Асинхронное S3 хранилище.
+
+    Клиент boto3 потокобезопасен, поэтому все операции идут через один клиент,
+    пул соединений которого рассчитан на max_concurrency одновременных запросов.
+    """
+
+    def __init__(self,
+                 endpoint_url: str,
+                 access_key: str,
+                 secret_key: str,
+                 bucket_name: str,
+                 max_concurrency: int = 256,
+                 **s3_kwargs):
+        """
+        :param max_concurrency: максимальное число одновременных операций
+        :param s3_kwargs: остальные параметры S3Storage (region, part_size, metadata_cache...)
+        """
+        # Импорт здесь, чтобы локальное хранилище не тянуло boto3
+        from homework_04.infra.storage.s3 import S3Storage
+        s3_kwargs.setdefault('max_pool_connections', max_concurrency)
+        super().__init__(
+            S3Storage(endpoint_url, access_key, secret_key, bucket_name, **s3_kwargs),
+            max_concurrency
+        )
+
+    async def get_content(self, path: str, size: Optional[int] = None):
+        """Получает содержимое файла из S3."""
+        return await self._run(self.storage.get_content, path, size)
+
+    def generate_presigned_url(self, path: str, expires_in: int = 3600) -> Optional[str]:
+        """Генерирует временную ссылку (без сетевых запросов, поэтому синхронно)."""
+        return self.storage.generate_presigned_url(path, expires_in)
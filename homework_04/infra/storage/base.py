@@ -1,27 +1,395 @@
-from abc import ABC, abstractmethod
-from pathlib import Path
-from typing import Optional
-from homework_04.domain.base import MediaFile
-
-class Storage(ABC):
-    """Абстрактный базовый класс для всех типов хранилищ."""
-    
-    @abstractmethod
-    def save(self, media_file: MediaFile, path: str) -> bool:
-        """Сохраняет файл в хранилище."""
-        pass
-        
-    @abstractmethod
-    def load(self, path: str) -> Optional[MediaFile]:
-        """Загружает файл из хранилища."""
-        pass
-        
-    @abstractmethod
-    def delete(self, path: str) -> bool:
-        """Удаляет файл из хранилища."""
-        pass
-        
-    @abstractmethod
-    def exists(self, path: str) -> bool:
-        """Проверяет существование файла в хранилище."""
-        pass
\ No newline at end of file
+import errno
+import mimetypes
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from io import BytesIO
+from pathlib import Path
+from typing import Optional, Any, BinaryIO, Callable, Dict, Iterable, Iterator, Mapping
+from homework_04.domain.base import MediaFile, LazyContent
+from homework_04.domain.audiofile import AudioFile
+from homework_04.domain.genericfile import GenericFile
+from homework_04.domain.photofile import PhotoFile
+from homework_04.domain.videofile import VideoFile
+from homework_04.infra.storage.ranged import RangeReader, BLOCK_SIZE
+
+# Размер блока для потокового чтения/записи (1 МБ)
+CHUNK_SIZE = 1024 * 1024
+
+# Ключи метаданных, которые передаются в конструкторы явно
+RESERVED_METADATA_KEYS = {
+    'owner', 'created_at', 'duration', 'bitrate', 'codec',
+    'resolution', 'fps', 'camera_model',
+}
+
+
+def iter_content_chunks(content: Any, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Отдает содержимое MediaFile блоками фиксированного размера без полного копирования.
+
+    :param content: bytes, BytesIO, ленивое содержимое хранилища или любой file-like объект
+    :param chunk_size: размер блока в байтах
+    """
+    if isinstance(content, (bytes, bytearray, memoryview)):
+        view = memoryview(content)
+        for offset in range(0, len(view), chunk_size):
+            yield view[offset:offset + chunk_size]
+        return
+
+    if isinstance(content, BytesIO):
+        content.seek(0)
+
+    stream = content.open() if hasattr(content, 'open') else content
+    try:
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        if stream is not content:
+            stream.close()
+
+
+def error_code(error: BaseException) -> str:
+    """
+    Короткий код ошибки для логов и метрик: код ответа S3 ('NoSuchKey',
+    'SlowDown'...), имя errno ('ENOENT', 'ENOSPC'...) или имя исключения.
+    """
+    response = getattr(error, 'response', None)
+    if isinstance(response, dict) and response.get('Error', {}).get('Code'):
+        return str(response['Error']['Code'])
+    if isinstance(error, OSError) and error.errno in errno.errorcode:
+        return errno.errorcode[error.errno]
+    return type(error).__name__
+
+
+def open_content(content: Any) -> BinaryIO:
+    """Возвращает file-like объект для чтения содержимого MediaFile с начала."""
+    if isinstance(content, (bytes, bytearray, memoryview)):
+        return BytesIO(content)
+    if hasattr(content, 'open'):
+        return content.open()
+    content.seek(0)
+    return content
+
+
+def media_metadata(media_file: MediaFile) -> Dict[str, str]:
+    """Собирает метаданные файла в виде строк (для заголовков и сайдкаров)."""
+    specific = {
+        k: str(v) for k, v in media_file.get_specific_metadata().items()
+        if v is not None
+    }
+    return {
+        'owner': media_file.owner,
+        'created_at': media_file.created_at.isoformat(),
+        **specific,
+        **{k: str(v) for k, v in media_file.metadata.items()}
+    }
+
+
+def media_content_type(media_file: MediaFile) -> str:
+    """Определяет MIME-тип файла по классу MediaFile."""
+    if isinstance(media_file, AudioFile):
+        return f'audio/{media_file.codec}'
+    elif isinstance(media_file, VideoFile):
+        return f'video/{media_file.codec}'
+    elif isinstance(media_file, PhotoFile):
+        return 'image/jpeg'  # или другой формат
+    return mimetypes.guess_type(media_file.name)[0] or 'application/octet-stream'
+
+
+def create_media_file(name: str,
+                      size: int,
+                      owner: str,
+                      created_at: datetime,
+                      content_type: str,
+                      metadata: Dict[str, str]) -> MediaFile:
+    """Создает соответствующий объект MediaFile на основе метаданных."""
+
+    # Парсим дополнительные метаданные
+    file_metadata = {
+        k: v for k, v in metadata.items()
+        if not k.startswith('x-amz-') and k not in RESERVED_METADATA_KEYS
+    }
+
+    if content_type.startswith('audio/'):
+        codec = content_type.split('/')[-1]
+        return AudioFile(
+            name=name,
+            size=size,
+            owner=owner,
+            content=None,
+            created_at=created_at,
+            duration=float(metadata.get('duration', 0)),
+            bitrate=int(metadata.get('bitrate', 0)),
+            codec=codec,
+            **file_metadata
+        )
+    elif content_type.startswith('video/'):
+        codec = content_type.split('/')[-1]
+        return VideoFile(
+            name=name,
+            size=size,
+            owner=owner,
+            content=None,
+            created_at=created_at,
+            duration=float(metadata.get('duration', 0)),
+            resolution=metadata.get('resolution', 'unknown'),
+            codec=codec,
+            fps=float(metadata.get('fps', 0)),
+            **file_metadata
+        )
+    elif content_type.startswith('image/'):
+        return PhotoFile(
+            name=name,
+            size=size,
+            owner=owner,
+            content=None,
+            created_at=created_at,
+            resolution=metadata.get('resolution', 'unknown'),
+            camera_model=metadata.get('camera_model'),
+            **file_metadata
+        )
+    else:
+        # Для неизвестных типов возвращаем файл без специфичных метаданных
+        return GenericFile(
+            name=name,
+            size=size,
+            owner=owner,
+            content=None,
+            created_at=created_at,
+            **file_metadata
+        )
+
+
+@dataclass
+class BatchResult:
+    """
+    Результат операции над одним ключом в пакетном вызове.
+
+    :param path: ключ (путь) в хранилище
+    :param ok: операция выполнена успешно
+    :param value: результат операции (MediaFile для load_many, bool для exists_many)
+    :param error: исключение, если операция упала
+    """
+    path: str
+    ok: bool
+    value: Any = None
+    error: Optional[Exception] = None
+
+
+class Storage(ABC):
+    """Абстрактный базовый класс для всех типов хранилищ."""
+
+    # Сколько операций пакетного вызова выполняется параллельно
+    batch_concurrency = 16
+
+    @abstractmethod
+    def save(self, media_file: MediaFile, path: str) -> bool:
+        """Сохраняет файл в хранилище."""
+        pass
+
+    @abstractmethod
+    def load(self, path: str, load_content: bool = True) -> Optional[MediaFile]:
+        """
+        Загружает файл из хранилища.
+
+        :param load_content: загружать ли содержимое (иначе только метаданные)
+        """
+        pass
+
+    @abstractmethod
+    def delete(self, path: str) -> bool:
+        """Удаляет файл из хранилища."""
+        pass
+
+    @abstractmethod
+    def exists(self, path: str) -> bool:
+        """Проверяет существование файла в хранилище."""
+        pass
+
+    @abstractmethod
+    def open_reader(self, path: str) -> BinaryIO:
+        """
+        Открывает файл в хранилище для потокового чтения.
+
+        :return: file-like объект (поддерживает read/close и контекстный менеджер)
+        :raises FileNotFoundError: если файла нет в хранилище
+        """
+        pass
+
+    @abstractmethod
+    def open_writer(self, path: str) -> BinaryIO:
+        """
+        Открывает файл в хранилище для потоковой записи.
+
+        Данные становятся видны в хранилище только после закрытия объекта;
+        при выходе из контекстного менеджера по исключению запись отменяется.
+        """
+        pass
+
+    def version(self, path: str) -> Optional[str]:
+        """
+        Токен версии файла, который меняется при перезаписи (время изменения,
+        ETag, хеш содержимого...). None, если файла нет или хранилище версий не знает.
+        """
+        return None
+
+    def get_content(self, path: str) -> Optional[Any]:
+        """Получает содержимое файла (None, если файла нет)."""
+        media_file = self.load(path)
+        return media_file.content if media_file is not None else None
+
+    def load_lazy(self, path: str) -> Optional[MediaFile]:
+        """
+        Загружает только метаданные файла; содержимое подгрузится из хранилища
+        при первом обращении к media_file.content и может быть освобождено
+        через media_file.release_content().
+        """
+        media_file = self.load(path, load_content=False)
+        if media_file is not None:
+            media_file.content = LazyContent(self, path)
+        return media_file
+
+    def iter_chunks(self, path: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        """Читает файл из хранилища блоками фиксированного размера."""
+        with self.open_reader(path) as reader:
+            while True:
+                chunk = reader.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def load_range(self, path: str, start: int, end: int) -> bytes:
+        """
+        Читает байты [start, end) файла (меньше, если файл короче).
+
+        Реализация по умолчанию пропускает начало потока; хранилища
+        с произвольным доступом переопределяют ее одним запросом.
+
+        :raises FileNotFoundError: если файла нет в хранилище
+        """
+        if end <= start:
+            return b''
+        with self.open_reader(path) as reader:
+            if getattr(reader, 'seekable', lambda: False)():
+                reader.seek(start)
+            else:
+                skip = start
+                while skip > 0:
+                    skipped = len(reader.read(min(skip, CHUNK_SIZE)))
+                    if not skipped:
+                        return b''
+                    skip -= skipped
+            return reader.read(end - start)
+
+    def open_seekable(self,
+                      path: str,
+                      size: Optional[int] = None,
+                      block_size: int = BLOCK_SIZE,
+                      cache_blocks: int = 32,
+                      max_read_ahead: int = 8 * 1024 * 1024) -> RangeReader:
+        """
+        Открывает файл для произвольного доступа (seek/read) через load_range.
+
+        Читаются только нужные блоки (с кэшем и адаптивным упреждающим
+        чтением), а не весь файл — для перемотки видео и аудио.
+
+        :param size: размер файла, если уже известен (экономит запрос метаданных)
+        :raises FileNotFoundError: если файла нет в хранилище
+        """
+        if size is None:
+            media_file = self.load(path, load_content=False)
+            if media_file is None:
+                raise FileNotFoundError(path)
+            size = media_file.size
+        return RangeReader(self, path, size, block_size, cache_blocks, max_read_ahead)
+
+    def save_many(self, files: Mapping[str, MediaFile]) -> Dict[str, BatchResult]:
+        """
+        Сохраняет несколько файлов.
+
+        :param files: словарь путь -> MediaFile
+        :return: результат по каждому пути; ошибка одного файла не прерывает пакет
+        """
+        return self._run_batch(
+            lambda path: self.save(files[path], path),
+            files,
+            ok=bool
+        )
+
+    def load_many(self, paths: Iterable[str]) -> Dict[str, BatchResult]:
+        """Загружает несколько файлов (value = None, если файла нет)."""
+        return self._run_batch(self.load, paths)
+
+    def delete_many(self, paths: Iterable[str]) -> Dict[str, BatchResult]:
+        """Удаляет несколько файлов (ok = False, если файл не удален)."""
+        return self._run_batch(self.delete, paths, ok=bool)
+
+    def exists_many(self, paths: Iterable[str]) -> Dict[str, BatchResult]:
+        """Проверяет существование нескольких файлов."""
+        return self._run_batch(self.exists, paths)
+
+    def stat_many(self, paths: Iterable[str]) -> Dict[str, BatchResult]:
+        """Загружает метаданные нескольких файлов без содержимого."""
+        return self._run_batch(lambda path: self.load(path, load_content=False), paths)
+
+    def list_paths(self, prefix: str = '') -> Iterator[str]:
+        """Перечисляет пути файлов в хранилище с заданным префиксом."""
+        raise NotImplementedError(f"{self.__class__.__name__} does not support listing")
+
+    def _run_batch(self,
+                   operation: Callable[[str], Any],
+                   paths: Iterable[str],
+                   ok: Callable[[Any], bool] = lambda value: True) -> Dict[str, BatchResult]:
+        """
+        Выполняет операцию для каждого пути в пуле потоков.
+
+        :param operation: одиночная операция хранилища
+        :param ok: по результату операции определяет, считается ли она успешной
+        :return: результаты в порядке входных путей
+        """
+        paths = list(dict.fromkeys(paths))
+        if not paths:
+            return {}
+
+        def run(path: str) -> BatchResult:
+            try:
+                value = operation(path)
+                return BatchResult(path, ok(value), value)
+            except Exception as e:
+                return BatchResult(path, False, error=e)
+
+        pool = self._get_batch_pool()
+        if pool is not None:
+            return {result.path: result for result in pool.map(run, paths)}
+        with ThreadPoolExecutor(max_workers=min(self.batch_concurrency, len(paths))) as pool:
+            return {result.path: result for result in pool.map(run, paths)}
+
+    def _get_batch_pool(self) -> Optional[ThreadPoolExecutor]:
+        """
+        Постоянный пул потоков для пакетных вызовов.
+
+        По умолчанию None: на каждый пакетный вызов создается свой пул.
+        """
+        return None
+
+    def _get_metadata(self, media_file: MediaFile) -> Dict[str, str]:
+        """Собирает метаданные файла в виде строк (для заголовков и сайдкаров)."""
+        return media_metadata(media_file)
+
+    def _get_content_type(self, media_file: MediaFile) -> str:
+        """Определяет MIME-тип файла по классу MediaFile."""
+        return media_content_type(media_file)
+
+    def _create_media_file(self,
+                         name: str,
+                         size: int,
+                         owner: str,
+                         created_at: datetime,
+                         content_type: str,
+                         metadata: Dict[str, str]) -> MediaFile:
+        """Создает соответствующий объект MediaFile на основе метаданных."""
+        return create_media_file(name, size, owner, created_at, content_type, metadata)
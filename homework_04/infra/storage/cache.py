@@ -0,0 +1,119 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Tuple, Union
+from homework_04.domain.base import MediaFile
+
+
+@dataclass
+class CacheStats:
+    """Счетчики кэша метаданных."""
+    hits: int = 0
+    negative_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        """Доля запросов, обслуженных кэшем (включая известные отсутствующие ключи)."""
+        total = self.hits + self.negative_hits + self.misses
+        return (self.hits + self.negative_hits) / total if total else 0.0
+
+
+class _Missing:
+    """Маркер ключа, которого заведомо нет в хранилище."""
+
+    def __repr__(self) -> str:
+        return 'MISSING'
+
+
+MISSING = _Missing()
+
+
+class MetadataCache:
+    """
+    Потокобезопасный in-process кэш метаданных хранилища.
+
+    Хранит результаты _create_media_file (без содержимого) и известные
+    отсутствующие ключи. Записи живут ttl секунд (отсутствующие — negative_ttl),
+    при превышении max_size вытесняются давно не использованные (LRU).
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 60.0, negative_ttl: Optional[float] = None):
+        """
+        :param max_size: максимальное количество записей
+        :param ttl: время жизни записи в секундах
+        :param negative_ttl: время жизни записи об отсутствующем ключе (по умолчанию = ttl)
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = ttl if negative_ttl is None else negative_ttl
+        self.stats = CacheStats()
+        self._entries: 'OrderedDict[str, Tuple[float, Union[MediaFile, _Missing]]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path: str) -> Union[MediaFile, _Missing, None]:
+        """
+        Ищет ключ в кэше.
+
+        :return: копия MediaFile, MISSING для известного отсутствующего ключа
+                 или None, если в кэше ничего нет
+        """
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None:
+                self.stats.misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[path]
+                self.stats.expirations += 1
+                self.stats.misses += 1
+                return None
+
+            self._entries.move_to_end(path)
+            if value is MISSING:
+                self.stats.negative_hits += 1
+                return MISSING
+            self.stats.hits += 1
+
+        # Отдаем копию, чтобы вызывающий код не испортил закэшированный объект
+        media_file = copy.copy(value)
+        media_file.metadata = dict(value.metadata)
+        return media_file
+
+    def put(self, path: str, media_file: MediaFile) -> None:
+        """Кэширует метаданные файла (содержимое не кэшируется)."""
+        cached = copy.copy(media_file)
+        cached.clear_content()
+        cached.metadata = dict(media_file.metadata)
+        self._store(path, cached, self.ttl)
+
+    def put_missing(self, path: str) -> None:
+        """Запоминает, что ключа нет в хранилище."""
+        self._store(path, MISSING, self.negative_ttl)
+
+    def invalidate(self, path: str) -> None:
+        """Удаляет ключ из кэша."""
+        with self._lock:
+            self._entries.pop(path, None)
+
+    def clear(self) -> None:
+        """Очищает кэш."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _store(self, path: str, value: Union[MediaFile, _Missing], ttl: float) -> None:
+        with self._lock:
+            self._entries[path] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
@@ -0,0 +1,308 @@
+import hashlib
+import json
+import logging
+import shutil
+import tempfile
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, BinaryIO, Dict, Iterator, Optional
+from homework_04.domain.base import MediaFile
+from homework_04.infra.storage.base import Storage, CHUNK_SIZE, error_code, iter_content_chunks
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DedupStats:
+    """Счетчики дедупликации."""
+    uploads: int = 0
+    uploads_skipped: int = 0
+    bytes_uploaded: int = 0
+    bytes_skipped: int = 0
+
+
+class _DedupWriter:
+    """
+    Потоковая запись в дедуплицирующее хранилище.
+
+    Данные хешируются по мере записи и копятся во временном файле;
+    при закрытии блоб загружается в основное хранилище, только если
+    такого содержимого там еще нет.
+    """
+
+    def __init__(self,
+                 storage: 'DedupStorage',
+                 path: str,
+                 ref: Optional[Dict[str, Any]] = None,
+                 spool_size: int = 8 * CHUNK_SIZE):
+        """
+        :param storage: дедуплицирующее хранилище
+        :param path: имя файла
+        :param ref: поля ссылки (тип содержимого и метаданные MediaFile)
+        :param spool_size: сколько байт держать в памяти до сброса на диск
+        """
+        self.storage = storage
+        self.path = path
+        self.ref = ref or {}
+        self.closed = False
+        self._hash = storage._new_hash()
+        self._size = 0
+        self._buffer = tempfile.SpooledTemporaryFile(max_size=spool_size)
+
+    def write(self, data) -> int:
+        self._hash.update(data)
+        self._size += len(data)
+        return self._buffer.write(data)
+
+    def writable(self) -> bool:
+        return True
+
+    def discard(self) -> None:
+        """Отменяет запись."""
+        self.closed = True
+        self._buffer.close()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            def upload(writer: BinaryIO) -> None:
+                self._buffer.seek(0)
+                shutil.copyfileobj(self._buffer, writer, CHUNK_SIZE)
+
+            self.storage._commit(self.path, self._hash.hexdigest(), self._size, upload, self.ref)
+        finally:
+            self._buffer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.discard()
+        else:
+            self.close()
+
+
+class DedupStorage(Storage):
+    """
+    Дедуплицирующее (content-addressed) хранилище поверх любого Storage.
+
+    Каждое уникальное содержимое хранится один раз как блоб под своим хешем
+    (blobs/<hh>/<digest>), а для каждого имени хранится небольшая ссылка
+    (refs/<path>) с хешем и метаданными MediaFile. Число ссылок на блоб
+    хранится рядом с ним (blobs/<hh>/<digest>.refs); блоб удаляется, когда
+    на него не остается ссылок. Если блоб с таким хешем уже есть, содержимое
+    повторно не загружается.
+
+    Писать в одно основное хранилище (один бакет/префикс) может только один
+    процесс с одним экземпляром DedupStorage. Счетчики ссылок и ссылки
+    обновляются read-modify-write под блокировкой этого процесса, без условной
+    записи в основном хранилище. Если несколько процессов пишут одновременно,
+    обновления счетчиков теряются, и блоб может быть удален, пока на него
+    еще есть ссылки. Читать из любого числа процессов можно.
+    """
+
+    def __init__(self,
+                 backend: Storage,
+                 algorithm: str = 'sha256',
+                 blob_prefix: str = 'blobs/',
+                 ref_prefix: str = 'refs/'):
+        """
+        :param backend: хранилище для блобов и ссылок
+        :param algorithm: алгоритм хеширования из hashlib
+        :param blob_prefix: префикс ключей блобов
+        :param ref_prefix: префикс ключей ссылок
+        """
+        self.backend = backend
+        self.algorithm = algorithm
+        self.blob_prefix = blob_prefix
+        self.ref_prefix = ref_prefix
+        self.stats = DedupStats()
+        # Счетчики ссылок меняются read-modify-write, поэтому сериализуем их
+        # (только внутри процесса — см. ограничение в описании класса);
+        # загрузка блобов идет вне блокировки
+        self._lock = threading.Lock()
+        # Хеши блобов, которые сейчас загружаются: их нельзя удалять при обнулении ссылок
+        self._uploading: Dict[str, int] = {}
+
+    def save(self, media_file: MediaFile, path: str) -> bool:
+        """
+        Сохраняет файл; содержимое загружается, только если его еще нет в хранилище.
+
+        Содержимое читается один раз: оно хешируется по мере копирования во
+        временный файл, а блоб загружается уже из него. Поэтому подходят и
+        потоки, которые нельзя перемотать (открытый файл, тело ответа S3).
+        """
+        if media_file.content is None:
+            return False
+
+        ref = {
+            'content_type': self._get_content_type(media_file),
+            'metadata': self._get_metadata(media_file),
+        }
+        try:
+            with _DedupWriter(self, path, ref) as writer:
+                for chunk in iter_content_chunks(media_file.content):
+                    writer.write(chunk)
+            return True
+        except Exception as e:
+            logger.error("Failed to save %s to dedup storage: %s", path, e,
+                         extra={'storage': 'dedup', 'operation': 'save', 'path': path, 'error_code': error_code(e)})
+            return False
+
+    def load(self, path: str, load_content: bool = True) -> Optional[MediaFile]:
+        """Загружает файл по ссылке."""
+        ref = self._read_json(self._ref_key(path))
+        if ref is None:
+            return None
+
+        metadata = ref.get('metadata', {})
+        created_at = metadata.get('created_at')
+        media_file = self._create_media_file(
+            name=path.split('/')[-1],
+            size=ref['size'],
+            owner=metadata.get('owner', 'unknown'),
+            created_at=datetime.fromisoformat(created_at) if created_at else None,
+            content_type=ref.get('content_type') or 'application/octet-stream',
+            metadata=metadata
+        )
+
+        if load_content:
+            blob = self.backend.load(self._blob_key(ref['digest']))
+            if blob is None:
+                return None
+            media_file.content = blob.content
+
+        return media_file
+
+    def delete(self, path: str) -> bool:
+        """Удаляет ссылку, а блоб — когда на него не осталось ссылок."""
+        with self._lock:
+            ref = self._read_json(self._ref_key(path))
+            if ref is None:
+                return False
+            if not self.backend.delete(self._ref_key(path)):
+                return False
+            self._decref(ref['digest'])
+            return True
+
+    def version(self, path: str) -> Optional[str]:
+        """Версия файла — хеш его содержимого."""
+        return self.digest_of(path)
+
+    def exists(self, path: str) -> bool:
+        """Проверяет существование ссылки."""
+        return self.backend.exists(self._ref_key(path))
+
+    def list_paths(self, prefix: str = '') -> Iterator[str]:
+        """Перечисляет имена файлов (по ссылкам)."""
+        for key in self.backend.list_paths(self._ref_key(prefix)):
+            yield key[len(self.ref_prefix):]
+
+    def open_reader(self, path: str) -> BinaryIO:
+        """Открывает на чтение блоб, на который указывает ссылка."""
+        ref = self._read_json(self._ref_key(path))
+        if ref is None:
+            raise FileNotFoundError(path)
+        return self.backend.open_reader(self._blob_key(ref['digest']))
+
+    def load_range(self, path: str, start: int, end: int) -> bytes:
+        """Читает диапазон байт блоба, на который указывает ссылка."""
+        ref = self._read_json(self._ref_key(path))
+        if ref is None:
+            raise FileNotFoundError(path)
+        return self.backend.load_range(self._blob_key(ref['digest']), start, end)
+
+    def open_writer(self, path: str) -> BinaryIO:
+        """Открывает файл на запись; содержимое хешируется по мере записи."""
+        return _DedupWriter(self, path)
+
+    def digest_of(self, path: str) -> Optional[str]:
+        """Возвращает хеш содержимого файла (или None, если файла нет)."""
+        ref = self._read_json(self._ref_key(path))
+        return ref['digest'] if ref else None
+
+    def _new_hash(self):
+        return hashlib.new(self.algorithm)
+
+    def _blob_key(self, digest: str) -> str:
+        return f"{self.blob_prefix}{digest[:2]}/{digest}"
+
+    def _ref_key(self, path: str) -> str:
+        return f"{self.ref_prefix}{path}"
+
+    def _commit(self, path: str, digest: str, size: int, upload, ref: Dict[str, Any]) -> None:
+        """
+        Фиксирует запись: загружает блоб (если его нет), пишет ссылку и обновляет счетчики.
+
+        Блоб загружается без блокировки; под self._lock выполняются только
+        чтение и запись ссылки и счетчиков. Пока блоб загружается, его хеш
+        отмечен в self._uploading, и параллельное удаление последней ссылки
+        на то же содержимое не удаляет блоб. Если запись не удалась, а ссылок
+        на загруженный блоб так и не появилось, он удаляется.
+
+        :param upload: функция, записывающая содержимое в переданный writer
+        """
+        with self._lock:
+            self._uploading[digest] = self._uploading.get(digest, 0) + 1
+        try:
+            if not self.backend.exists(self._blob_key(digest)):
+                with self.backend.open_writer(self._blob_key(digest)) as writer:
+                    upload(writer)
+                uploaded = True
+            else:
+                uploaded = False
+
+            with self._lock:
+                if uploaded:
+                    self.stats.uploads += 1
+                    self.stats.bytes_uploaded += size
+                else:
+                    self.stats.uploads_skipped += 1
+                    self.stats.bytes_skipped += size
+
+                previous = self._read_json(self._ref_key(path))
+                self._write_json(self._ref_key(path), {**ref, 'digest': digest, 'size': size})
+                if previous is None or previous['digest'] != digest:
+                    self._write_refcount(digest, self._read_refcount(digest) + 1)
+                    if previous is not None:
+                        self._decref(previous['digest'])
+        finally:
+            with self._lock:
+                self._uploading[digest] -= 1
+                if not self._uploading[digest]:
+                    del self._uploading[digest]
+                    if self._read_refcount(digest) == 0:
+                        self.backend.delete(self._blob_key(digest))
+
+    def _decref(self, digest: str) -> None:
+        """Уменьшает число ссылок на блоб и удаляет его при обнулении (вызывать под self._lock)."""
+        refs = self._read_refcount(digest) - 1
+        if refs > 0:
+            self._write_refcount(digest, refs)
+            return
+        self.backend.delete(self._blob_key(digest) + '.refs')
+        # Блоб, который сейчас загружается для новой ссылки, удалит _commit, если она не появится
+        if digest not in self._uploading:
+            self.backend.delete(self._blob_key(digest))
+
+    def _read_refcount(self, digest: str) -> int:
+        data = self._read_json(self._blob_key(digest) + '.refs')
+        return data['refs'] if data else 0
+
+    def _write_refcount(self, digest: str, refs: int) -> None:
+        self._write_json(self._blob_key(digest) + '.refs', {'refs': refs})
+
+    def _read_json(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with self.backend.open_reader(key) as reader:
+                return json.loads(reader.read())
+        except FileNotFoundError:
+            return None
+
+    def _write_json(self, key: str, data: Dict[str, Any]) -> None:
+        with self.backend.open_writer(key) as writer:
+            writer.write(json.dumps(data, ensure_ascii=False).encode('utf-8'))
@@ -1,46 +1,341 @@
-import shutil
-from pathlib import Path
-from typing import Optional
-from domain.base import MediaFile
-from homework_04.infra.base import Storage
-
-class LocalStorage(Storage):
-    """Класс для работы с локальным хранилищем файлов."""
-    
-    def __init__(self, base_path: str = '.'):
-        self.base_path = Path(base_path).resolve()
-        
-    def save(self, media_file: MediaFile, path: str) -> bool:
-        """Сохраняет файл в локальное хранилище."""
-        full_path = self.base_path / path
-        full_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        # Здесь должна быть реализация сохранения файла
-        print(f"Saving {media_file.name} to local storage at {full_path}")
-        return True
-        
-    def load(self, path: str) -> Optional[MediaFile]:
-        """Загружает файл из локального хранилища."""
-        full_path = self.base_path / path
-        if not full_path.exists():
-            return None
-            
-        # Здесь должна быть реализация загрузки файла
-        print(f"Loading file from local storage at {full_path}")
-        return None  # В реальности возвращаем экземпляр MediaFile
-        
-    def delete(self, path: str) -> bool:
-        """Удаляет файл из локального хранилища."""
-        full_path = self.base_path / path
-        if not full_path.exists():
-            return False
-            
-        try:
-            full_path.unlink()
-            return True
-        except OSError:
-            return False
-            
-    def exists(self, path: str) -> bool:
-        """Проверяет существование файла в локальном хранилище."""
-        return (self.base_path / path).exists()
\ No newline at end of file
+import io
+import json
+import logging
+import mimetypes
+import mmap
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Optional, BinaryIO, Iterator
+from homework_04.domain.base import MediaFile
+from homework_04.infra.storage.base import Storage, CHUNK_SIZE, error_code, iter_content_chunks
+
+logger = logging.getLogger(__name__)
+
+
+class _PreadReader(io.RawIOBase):
+    """Поток чтения поверх общего открытого файла: своя позиция, чтение через pread."""
+
+    def __init__(self, fd: int):
+        self._fd = fd
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = os.pread(self._fd, len(buffer), self._position)
+        buffer[:len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        if whence == os.SEEK_CUR:
+            offset += self._position
+        elif whence == os.SEEK_END:
+            offset += os.fstat(self._fd).st_size
+        self._position = max(offset, 0)
+        return self._position
+
+    def tell(self) -> int:
+        return self._position
+
+
+class MappedContent:
+    """
+    Ленивое содержимое файла на локальном диске.
+
+    Файл отображается в память (mmap) только при первом обращении к буферу,
+    поэтому загрузка даже многогигабайтного видео не копирует данные в память Python.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._mmap: Optional[mmap.mmap] = None
+        self._file: Optional[BinaryIO] = None
+
+    def __len__(self) -> int:
+        if self._mmap is not None:
+            return len(self._mmap)
+        if self._file is not None:
+            return os.fstat(self._file.fileno()).st_size
+        return self.path.stat().st_size
+
+    def keep_open(self) -> 'MappedContent':
+        """
+        Открывает файл сразу и держит его открытым до close().
+
+        Дальше содержимое читается через открытый дескриптор, поэтому оно
+        остается доступным, даже если файл удалят или заменят (например,
+        при вытеснении из дискового кэша).
+        """
+        if self._file is None:
+            self._file = open(self.path, 'rb')
+        return self
+
+    def getbuffer(self) -> memoryview:
+        """Возвращает memoryview поверх отображенного в память файла."""
+        if self._mmap is None:
+            if self._file is not None:
+                self._mmap = self._map(self._file)
+            else:
+                with open(self.path, 'rb') as f:
+                    self._mmap = self._map(f)
+            if self._mmap is None:
+                return memoryview(b'')
+        return memoryview(self._mmap)
+
+    def open(self) -> BinaryIO:
+        """Открывает файл для потокового чтения."""
+        if self._file is not None:
+            return io.BufferedReader(_PreadReader(self._file.fileno()), CHUNK_SIZE)
+        return open(self.path, 'rb')
+
+    def close(self) -> None:
+        """Освобождает отображение файла в память (и открытый файл после keep_open)."""
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    @staticmethod
+    def _map(f: BinaryIO) -> Optional[mmap.mmap]:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class _AtomicFileWriter(io.FileIO):
+    """Пишет во временный файл рядом с целевым и атомарно подменяет его при закрытии."""
+
+    def __init__(self, target: Path, on_commit: Optional[Callable[[], None]] = None):
+        """
+        :param target: итоговый путь файла
+        :param on_commit: вызывается после подмены файла (например, чтобы записать сайдкар)
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=target.parent, prefix=f'.{target.name}.', suffix='.part')
+        super().__init__(fd, 'wb', closefd=True)
+        self.target = target
+        self._tmp_path = tmp_path
+        self._discarded = False
+        self._on_commit = on_commit
+
+    def write(self, data) -> int:
+        # FileIO.write может записать только часть буфера — дописываем остаток
+        view = memoryview(data).cast('B')
+        written = 0
+        while written < len(view):
+            written += super().write(view[written:])
+        return written
+
+    def discard(self) -> None:
+        """Отменяет запись и удаляет временный файл."""
+        self._discarded = True
+        self.close()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        super().close()
+        if self._discarded:
+            os.unlink(self._tmp_path)
+        else:
+            os.replace(self._tmp_path, self.target)
+            if self._on_commit is not None:
+                self._on_commit()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.discard()
+        else:
+            self.close()
+
+
+def _copy_fd(src_fd: int, dst_fd: int, count: int) -> None:
+    """
+    Копирует данные между файлами на стороне ядра.
+
+    Пробует copy_file_range (в т.ч. reflink на CoW ФС), затем sendfile,
+    и только если оба недоступны — обычное копирование через буфер.
+    Если способ вернул 0 раньше времени (так бывает на некоторых ФС),
+    остаток копируется следующим способом.
+    """
+    offset = 0
+    for copy in (getattr(os, 'copy_file_range', None), getattr(os, 'sendfile', None)):
+        if copy is None:
+            continue
+        try:
+            # sendfile пишет с текущей позиции dst, а copy_file_range ее не сдвигает
+            os.lseek(dst_fd, offset, os.SEEK_SET)
+            while offset < count:
+                if copy is os.sendfile:
+                    copied = os.sendfile(dst_fd, src_fd, offset, count - offset)
+                else:
+                    copied = copy(src_fd, dst_fd, count - offset, offset, offset)
+                if copied == 0:
+                    break
+                offset += copied
+        except OSError:
+            if offset:
+                raise
+        if offset >= count:
+            return
+    os.lseek(src_fd, offset, os.SEEK_SET)
+    os.lseek(dst_fd, offset, os.SEEK_SET)
+    with open(src_fd, 'rb', closefd=False) as src, open(dst_fd, 'wb', closefd=False) as dst:
+        shutil.copyfileobj(src, dst, CHUNK_SIZE)
+
+
+class LocalStorage(Storage):
+    """Класс для работы с локальным хранилищем файлов."""
+
+    def __init__(self, base_path: str = '.', chunk_size: int = CHUNK_SIZE):
+        """
+        :param base_path: корневая директория хранилища
+        :param chunk_size: размер блока для потокового чтения/записи
+        """
+        self.base_path = Path(base_path).resolve()
+        self.chunk_size = chunk_size
+
+    def save(self, media_file: MediaFile, path: str) -> bool:
+        """Сохраняет файл в локальное хранилище."""
+        if media_file.content is None:
+            return False
+
+        full_path = self.base_path / path
+        full_path.parent.mkdir(parents=True, exist_ok=True)
+
+        try:
+            if isinstance(media_file.content, MappedContent):
+                self.copy_from(media_file.content.path, path)
+            else:
+                with self.open_writer(path) as writer:
+                    for chunk in iter_content_chunks(media_file.content, self.chunk_size):
+                        writer.write(chunk)
+            self._write_meta(media_file, full_path)
+            return True
+        except OSError as e:
+            logger.error("Failed to save %s to local storage: %s", path, e,
+                         extra={'storage': 'local', 'operation': 'save', 'path': path, 'error_code': error_code(e)})
+            return False
+
+    def load(self, path: str, load_content: bool = True) -> Optional[MediaFile]:
+        """Загружает файл из локального хранилища (содержимое подключается лениво через mmap)."""
+        full_path = self.base_path / path
+        if not full_path.is_file():
+            return None
+
+        stat = full_path.stat()
+        meta = self._read_meta(full_path)
+        metadata = meta.get('metadata', {})
+        created_at = metadata.get('created_at')
+
+        media_file = self._create_media_file(
+            name=full_path.name,
+            size=stat.st_size,
+            owner=metadata.get('owner', 'unknown'),
+            created_at=datetime.fromisoformat(created_at) if created_at else datetime.fromtimestamp(stat.st_mtime),
+            content_type=meta.get('content_type') or mimetypes.guess_type(full_path.name)[0] or 'application/octet-stream',
+            metadata=metadata
+        )
+
+        if load_content:
+            media_file.content = MappedContent(full_path)
+
+        return media_file
+
+    def get_content(self, path: str) -> Optional[MappedContent]:
+        """Возвращает ленивое (mmap) содержимое файла."""
+        full_path = self.base_path / path
+        return MappedContent(full_path) if full_path.is_file() else None
+
+    def delete(self, path: str) -> bool:
+        """Удаляет файл из локального хранилища."""
+        full_path = self.base_path / path
+        if not full_path.exists():
+            return False
+
+        try:
+            full_path.unlink()
+            self._meta_path(full_path).unlink(missing_ok=True)
+            return True
+        except OSError:
+            return False
+
+    def version(self, path: str) -> Optional[str]:
+        """Версия файла: время последнего изменения (нс) и размер."""
+        try:
+            stat = (self.base_path / path).stat()
+        except FileNotFoundError:
+            return None
+        return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+    def exists(self, path: str) -> bool:
+        """Проверяет существование файла в локальном хранилище."""
+        return (self.base_path / path).exists()
+
+    def list_paths(self, prefix: str = '') -> Iterator[str]:
+        """Перечисляет файлы хранилища с заданным префиксом (без служебных файлов)."""
+        for full_path in sorted(self.base_path.rglob('*')):
+            if not full_path.is_file() or full_path.name.startswith('.'):
+                continue
+            path = full_path.relative_to(self.base_path).as_posix()
+            if path.startswith(prefix):
+                yield path
+
+    def open_reader(self, path: str) -> BinaryIO:
+        """Открывает файл для потокового чтения."""
+        return open(self.base_path / path, 'rb', buffering=self.chunk_size)
+
+    def load_range(self, path: str, start: int, end: int) -> bytes:
+        """Читает байты [start, end) файла одним pread."""
+        if end <= start:
+            return b''
+        fd = os.open(self.base_path / path, os.O_RDONLY)
+        try:
+            return os.pread(fd, end - start, start)
+        finally:
+            os.close(fd)
+
+    def open_writer(self, path: str, media_file: Optional[MediaFile] = None) -> BinaryIO:
+        """
+        Открывает файл для потоковой записи; файл атомарно появляется при закрытии.
+
+        :param media_file: если передан, его метаданные сохраняются в сайдкар вместе с файлом
+        """
+        full_path = self.base_path / path
+        full_path.parent.mkdir(parents=True, exist_ok=True)
+        on_commit = (lambda: self._write_meta(media_file, full_path)) if media_file is not None else None
+        return _AtomicFileWriter(full_path, on_commit)
+
+    def copy_from(self, source: Path, path: str) -> None:
+        """Копирует локальный файл в хранилище без прохода данных через память Python."""
+        with open(source, 'rb') as src, self.open_writer(path) as dst:
+            _copy_fd(src.fileno(), dst.fileno(), os.fstat(src.fileno()).st_size)
+
+    def _meta_path(self, full_path: Path) -> Path:
+        """Путь к сайдкару с метаданными файла."""
+        return full_path.with_name(f'.{full_path.name}.meta.json')
+
+    def _write_meta(self, media_file: MediaFile, full_path: Path) -> None:
+        """Сохраняет метаданные файла в сайдкар рядом с ним (атомарно, как и сами данные)."""
+        meta = {
+            'content_type': self._get_content_type(media_file),
+            'metadata': self._get_metadata(media_file),
+        }
+        with _AtomicFileWriter(self._meta_path(full_path)) as writer:
+            writer.write(json.dumps(meta, ensure_ascii=False).encode('utf-8'))
+
+    def _read_meta(self, full_path: Path) -> dict:
+        """Читает метаданные файла из сайдкара (если он есть)."""
+        meta_path = self._meta_path(full_path)
+        if not meta_path.exists():
+            return {}
+        return json.loads(meta_path.read_text(encoding='utf-8'))
\ No newline at end of file
@@ -0,0 +1,327 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from io import BytesIO
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Mapping, Optional
+from homework_04.domain.base import MediaFile
+from homework_04.infra.storage.base import Storage, BatchResult, error_code
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограммы задержек: 100 мкс * 2^i, до ~105 с
+LATENCY_BUCKETS = tuple(0.0001 * 2 ** i for i in range(21))
+
+
+class LatencyHistogram:
+    """Гистограмма задержек с фиксированными экспоненциальными корзинами."""
+
+    def __init__(self, bounds: tuple = LATENCY_BUCKETS):
+        self.bounds = bounds
+        # Последняя корзина — все, что дольше последней границы
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, p: float) -> float:
+        """Оценка перцентиля (0..100) с линейной интерполяцией внутри корзины."""
+        if not self.count:
+            return 0.0
+        rank = p / 100 * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                low = self.bounds[i - 1] if i > 0 else 0.0
+                high = self.bounds[i] if i < len(self.bounds) else self.max
+                return min(low + (high - low) * (rank - seen) / count, self.max)
+            seen += count
+        return self.max
+
+
+class OperationMetrics:
+    """Метрики одной операции хранилища."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.latency = LatencyHistogram()
+        self.calls = 0
+        self.bytes = 0
+        self.in_flight = 0
+        self.errors: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def begin(self) -> None:
+        with self._lock:
+            self.in_flight += 1
+
+    def end(self, seconds: float, nbytes: int = 0, error: Optional[str] = None) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            self.calls += 1
+            self.bytes += nbytes
+            self.latency.observe(seconds)
+            if error is not None:
+                self.errors[error] += 1
+
+    def add_bytes(self, nbytes: int) -> None:
+        with self._lock:
+            self.bytes += nbytes
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            busy = self.latency.total
+            return {
+                'calls': self.calls,
+                'in_flight': self.in_flight,
+                'errors': dict(self.errors),
+                'bytes': self.bytes,
+                'bytes_per_sec': self.bytes / busy if busy else 0.0,
+                'mean': self.latency.mean,
+                'p50': self.latency.percentile(50),
+                'p95': self.latency.percentile(95),
+                'p99': self.latency.percentile(99),
+                'max': self.latency.max,
+            }
+
+
+class StorageMetrics:
+    """
+    Набор метрик хранилища по операциям.
+
+    Выключенный набор (enabled=False) ничего не считает: InstrumentedStorage
+    в этом случае просто вызывает основное хранилище.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._operations: Dict[str, OperationMetrics] = {}
+        self._lock = threading.Lock()
+        self._exporter: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def operation(self, name: str) -> OperationMetrics:
+        operation = self._operations.get(name)
+        if operation is None:
+            with self._lock:
+                operation = self._operations.setdefault(name, OperationMetrics(name))
+        return operation
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Текущие значения всех метрик: операция -> показатели."""
+        with self._lock:
+            operations = list(self._operations.values())
+        return {operation.name: operation.snapshot() for operation in operations}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._operations = {}
+
+    def report(self) -> str:
+        """Текстовый отчет по операциям."""
+        lines = [f"{'operation':<14} {'calls':>8} {'errors':>6} {'in fl':>5} {'MB':>9} {'MB/s':>8} "
+                 f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}"]
+        for name, stats in sorted(self.snapshot().items()):
+            lines.append(
+                f"{name:<14} {stats['calls']:>8} {sum(stats['errors'].values()):>6} {stats['in_flight']:>5} "
+                f"{stats['bytes'] / 2 ** 20:>9.1f} {stats['bytes_per_sec'] / 2 ** 20:>8.1f} "
+                f"{stats['p50'] * 1000:>8.2f} {stats['p95'] * 1000:>8.2f} "
+                f"{stats['p99'] * 1000:>8.2f} {stats['max'] * 1000:>8.2f}"
+            )
+        return '\n'.join(lines)
+
+    def start_exporter(self, interval: float = 60.0,
+                       export: Optional[Callable[[Dict[str, Dict[str, Any]]], None]] = None) -> None:
+        """
+        Запускает фоновую выгрузку снимка метрик раз в interval секунд.
+
+        :param export: получатель снимка (по умолчанию — запись в лог с полем metrics)
+        """
+        if self._exporter is not None:
+            return
+        export = export or (lambda snapshot: logger.info("storage metrics", extra={'metrics': snapshot}))
+        self._stop.clear()
+
+        def run() -> None:
+            while not self._stop.wait(interval):
+                try:
+                    export(self.snapshot())
+                except Exception:
+                    logger.exception("Storage metrics export failed")
+
+        self._exporter = threading.Thread(target=run, name='storage-metrics', daemon=True)
+        self._exporter.start()
+
+    def stop_exporter(self) -> None:
+        self._stop.set()
+        if self._exporter is not None:
+            self._exporter.join()
+            self._exporter = None
+
+
+def _content_size(content: Any) -> int:
+    """Размер содержимого без копирования и без чтения."""
+    if content is None:
+        return 0
+    if hasattr(content, '__len__'):
+        return len(content)
+    if isinstance(content, BytesIO):
+        return content.getbuffer().nbytes
+    return 0
+
+
+class _CountingStream:
+    """Обертка над потоком хранилища, считающая прочитанные/записанные байты."""
+
+    def __init__(self, stream: BinaryIO, operation: OperationMetrics):
+        self._stream = stream
+        self._operation = operation
+
+    def read(self, *args) -> bytes:
+        data = self._stream.read(*args)
+        self._operation.add_bytes(len(data))
+        return data
+
+    def readinto(self, buffer) -> int:
+        count = self._stream.readinto(buffer)
+        self._operation.add_bytes(count or 0)
+        return count
+
+    def write(self, data) -> int:
+        written = self._stream.write(data)
+        self._operation.add_bytes(len(data))
+        return written
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._stream, name)
+
+    def __enter__(self):
+        self._stream.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return self._stream.__exit__(exc_type, exc_value, traceback)
+
+
+class InstrumentedStorage(Storage):
+    """
+    Обертка над любым Storage, собирающая метрики операций.
+
+    Для каждой операции (save, load, delete, exists, get_content, load_range,
+    пакетных операций, потоковых чтения/записи) считаются гистограмма
+    задержек, переданные байты, число выполняющихся вызовов и ошибки по
+    кодам (код ответа S3, errno или имя исключения; неуспешный результат
+    без исключения учитывается как 'failed' или 'not_found').
+    """
+
+    def __init__(self, backend: Storage, metrics: Optional[StorageMetrics] = None):
+        """
+        :param metrics: набор метрик (можно разделять между хранилищами);
+                        StorageMetrics(enabled=False) — режим без накладных расходов
+        """
+        self.backend = backend
+        self.metrics = metrics if metrics is not None else StorageMetrics()
+
+    def save(self, media_file: MediaFile, path: str) -> bool:
+        return self._call('save', self.backend.save, media_file, path,
+                          nbytes=lambda ok: media_file.size if ok else 0,
+                          outcome=lambda ok: None if ok else 'failed')
+
+    def load(self, path: str, load_content: bool = True) -> Optional[MediaFile]:
+        return self._call('load', self.backend.load, path, load_content=load_content,
+                          nbytes=lambda media_file: _content_size(media_file._content) if media_file else 0,
+                          outcome=lambda media_file: None if media_file is not None else 'not_found')
+
+    def get_content(self, path: str) -> Optional[Any]:
+        return self._call('get_content', self.backend.get_content, path,
+                          nbytes=_content_size,
+                          outcome=lambda content: None if content is not None else 'not_found')
+
+    def delete(self, path: str) -> bool:
+        return self._call('delete', self.backend.delete, path,
+                          outcome=lambda ok: None if ok else 'not_found')
+
+    def exists(self, path: str) -> bool:
+        return self._call('exists', self.backend.exists, path)
+
+    def version(self, path: str) -> Optional[str]:
+        return self._call('version', self.backend.version, path)
+
+    def load_range(self, path: str, start: int, end: int) -> bytes:
+        return self._call('load_range', self.backend.load_range, path, start, end, nbytes=len)
+
+    def save_many(self, files: Mapping[str, MediaFile]) -> Dict[str, BatchResult]:
+        return self._call('save_many', self.backend.save_many, files, nbytes=lambda results: sum(
+            files[path].size for path, result in results.items() if result.ok
+        ), outcome=self._batch_outcome)
+
+    def load_many(self, paths: Iterable[str]) -> Dict[str, BatchResult]:
+        return self._call('load_many', self.backend.load_many, paths, nbytes=lambda results: sum(
+            _content_size(result.value._content) for result in results.values() if result.value is not None
+        ), outcome=self._batch_outcome)
+
+    def delete_many(self, paths: Iterable[str]) -> Dict[str, BatchResult]:
+        return self._call('delete_many', self.backend.delete_many, paths, outcome=self._batch_outcome)
+
+    def exists_many(self, paths: Iterable[str]) -> Dict[str, BatchResult]:
+        return self._call('exists_many', self.backend.exists_many, paths, outcome=self._batch_outcome)
+
+    def stat_many(self, paths: Iterable[str]) -> Dict[str, BatchResult]:
+        return self._call('stat_many', self.backend.stat_many, paths, outcome=self._batch_outcome)
+
+    def list_paths(self, prefix: str = '') -> Iterator[str]:
+        return self.backend.list_paths(prefix)
+
+    def open_reader(self, path: str) -> BinaryIO:
+        reader = self._call('open_reader', self.backend.open_reader, path)
+        if not self.metrics.enabled:
+            return reader
+        return _CountingStream(reader, self.metrics.operation('read_stream'))
+
+    def open_writer(self, path: str) -> BinaryIO:
+        writer = self._call('open_writer', self.backend.open_writer, path)
+        if not self.metrics.enabled:
+            return writer
+        return _CountingStream(writer, self.metrics.operation('write_stream'))
+
+    def _call(self, name: str, func: Callable, *args,
+              nbytes: Optional[Callable[[Any], int]] = None,
+              outcome: Optional[Callable[[Any], Optional[str]]] = None, **kwargs) -> Any:
+        """Вызывает операцию основного хранилища, учитывая задержку, байты и ошибки."""
+        if not self.metrics.enabled:
+            return func(*args, **kwargs)
+
+        operation = self.metrics.operation(name)
+        operation.begin()
+        started = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            operation.end(time.perf_counter() - started, error=error_code(e))
+            raise
+        operation.end(
+            time.perf_counter() - started,
+            nbytes=nbytes(result) if nbytes else 0,
+            error=outcome(result) if outcome else None
+        )
+        return result
+
+    @staticmethod
+    def _batch_outcome(results: Dict[str, BatchResult]) -> Optional[str]:
+        """Код первой ошибки пакета (ошибки отдельных файлов видны в самих результатах)."""
+        for result in results.values():
+            if result.error is not None:
+                return error_code(result.error)
+        return None
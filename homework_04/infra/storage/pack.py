@@ -0,0 +1,576 @@
+import json
+import logging
+import os
+import shutil
+import struct
+import tempfile
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from io import BytesIO
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Set, Tuple
+from homework_04.domain.base import MediaFile
+from homework_04.infra.storage.base import Storage, CHUNK_SIZE, error_code, iter_content_chunks
+
+logger = logging.getLogger(__name__)
+
+# Заголовок записи в pack-файле: magic, длина пути, длина данных
+_RECORD = struct.Struct('<4sIQ')
+_RECORD_MAGIC = b'NDL1'
+
+
+def _content_length(content: Any) -> int:
+    """Фактический размер содержимого (без чтения; media_file.size может быть устаревшим)."""
+    if isinstance(content, BytesIO):
+        return content.getbuffer().nbytes
+    return len(content)
+
+
+@dataclass
+class PackEntry:
+    """Положение содержимого файла в pack-файле."""
+    pack: int
+    offset: int
+    size: int
+    ref: Dict[str, Any]
+
+
+@dataclass
+class PackInfo:
+    """Размер pack-файла и объем живых (не удаленных и не перезаписанных) данных в нем."""
+    size: int
+    live_bytes: int = 0
+
+    @property
+    def garbage_ratio(self) -> float:
+        return 1 - self.live_bytes / self.size if self.size else 0.0
+
+
+class _PackWriter:
+    """
+    Потоковая запись в PackStorage.
+
+    Данные копятся в памяти; если файл оказывается больше max_object_size,
+    запись переключается на отдельный объект основного хранилища.
+    """
+
+    def __init__(self, storage: 'PackStorage', path: str):
+        self.storage = storage
+        self.path = path
+        self.closed = False
+        self._buffer = BytesIO()
+        self._direct: Optional[BinaryIO] = None
+
+    def write(self, data) -> int:
+        if self._direct is not None:
+            return self._direct.write(data)
+        written = self._buffer.write(data)
+        if self._buffer.tell() > self.storage.max_object_size:
+            self._direct = self.storage.backend.open_writer(self.path)
+            self._direct.write(self._buffer.getbuffer())
+            self._buffer = BytesIO()
+        return written
+
+    def writable(self) -> bool:
+        return True
+
+    def discard(self) -> None:
+        """Отменяет запись."""
+        self.closed = True
+        if self._direct is not None:
+            self._direct.discard()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        if self._direct is not None:
+            self._direct.close()
+            self.storage._forget(self.path)
+        else:
+            self.storage._append(self.path, self._buffer.getbuffer(), {})
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.discard()
+        else:
+            self.close()
+
+
+class PackStorage(Storage):
+    """
+    Хранилище мелких файлов в больших pack-файлах (по мотивам Haystack).
+
+    Мелкие файлы (миниатюры, короткие аудио) дописываются подряд в текущий
+    pack-файл, а индекс путь -> (pack, оффсет, размер, метаданные) хранится
+    в памяти, поэтому чтение — это один pread или один ranged GET к
+    основному хранилищу (LocalStorage или S3Storage) без запросов
+    метаданных и без отдельного объекта/inode на файл.
+
+    Текущий pack-файл накапливается локально и попадает в основное
+    хранилище при заполнении или flush() вместе со своим индексом
+    (packs/<id>.idx). Без journal_dir это буфер записи во временном файле:
+    save() возвращает True сразу, но данные переживут сбой процесса только
+    после flush() или close(). С journal_dir текущий pack-файл и журнал его
+    записей лежат в этом каталоге и синхронизируются на диск (fsync) до
+    возврата из save() и delete(); pack-файлы, не успевшие попасть в основное
+    хранилище, восстанавливаются из журнала при следующем запуске и
+    загружаются при ближайшем flush(). Удаление и перезапись помечают старую запись
+    надгробием (packs/<id>.del); место освобождает компактизация,
+    переписывающая живые записи pack-файлов с большой долей мусора
+    (можно запускать в фоне через start_compaction).
+
+    Файлы больше max_object_size хранятся в основном хранилище как есть.
+    """
+
+    def __init__(self,
+                 backend: Storage,
+                 pack_prefix: str = 'packs/',
+                 max_pack_size: int = 256 * 1024 * 1024,
+                 max_object_size: int = 1024 * 1024,
+                 compaction_threshold: float = 0.5,
+                 journal_dir: Optional[str] = None):
+        """
+        :param backend: хранилище pack-файлов (LocalStorage, S3Storage...)
+        :param pack_prefix: префикс ключей pack-файлов и их индексов
+        :param max_pack_size: размер, при котором текущий pack-файл закрывается
+        :param max_object_size: файлы больше этого размера не упаковываются
+        :param compaction_threshold: доля мусора, начиная с которой pack-файл компактизируется
+        :param journal_dir: локальный каталог для текущего pack-файла и его журнала;
+                            если не задан, несброшенные (до flush()) записи теряются при сбое
+        """
+        self.backend = backend
+        self.pack_prefix = pack_prefix
+        self.max_pack_size = max_pack_size
+        self.max_object_size = max_object_size
+        self.compaction_threshold = compaction_threshold
+        self.journal_dir = journal_dir
+
+        self._lock = threading.RLock()
+        # Компактизация и закрытие pack-файла не должны пересекаться
+        self._seal_lock = threading.Lock()
+        self._index: Dict[str, PackEntry] = {}
+        self._packs: Dict[int, PackInfo] = {}
+        self._tombstones: Dict[int, Set[str]] = {}
+        self._pending_tombstones: Dict[int, Set[str]] = {}
+        # Закрытые pack-файлы, еще не загруженные в основное хранилище: временный файл и индекс
+        self._sealing: Dict[int, Tuple[BinaryIO, Dict[str, PackEntry]]] = {}
+        self._compactor: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+        self._load_index()
+        if journal_dir is not None:
+            os.makedirs(journal_dir, exist_ok=True)
+            self._recover_journal()
+        self._active_id = max([*self._packs, *self._sealing], default=0) + 1
+        self._journal: Optional[BinaryIO] = None
+        self._active = self._open_active()
+        self._active_size = 0
+        self._active_index: Dict[str, PackEntry] = {}
+
+    def save(self, media_file: MediaFile, path: str) -> bool:
+        """
+        Дописывает файл в текущий pack-файл (большие файлы — в основное хранилище).
+
+        Без journal_dir файл надежно сохранен только после flush() или close().
+        """
+        content = media_file.content
+        if content is None:
+            return False
+        if _content_length(content) > self.max_object_size:
+            if not self.backend.save(media_file, path):
+                return False
+            self._forget(path)
+            return True
+
+        ref = {
+            'content_type': self._get_content_type(media_file),
+            'metadata': self._get_metadata(media_file),
+        }
+        try:
+            data = b''.join(bytes(chunk) for chunk in iter_content_chunks(content))
+            self._append(path, data, ref)
+            return True
+        except OSError as e:
+            logger.error("Failed to save %s to pack storage: %s", path, e,
+                         extra={'storage': 'pack', 'operation': 'save', 'path': path, 'error_code': error_code(e)})
+            return False
+
+    def load(self, path: str, load_content: bool = True) -> Optional[MediaFile]:
+        """Загружает файл: метаданные из индекса, содержимое — одним чтением диапазона."""
+        entry = self._entry(path)
+        if entry is None:
+            return self.backend.load(path, load_content=load_content)
+
+        metadata = entry.ref.get('metadata', {})
+        created_at = metadata.get('created_at')
+        media_file = self._create_media_file(
+            name=path.split('/')[-1],
+            size=entry.size,
+            owner=metadata.get('owner', 'unknown'),
+            created_at=datetime.fromisoformat(created_at) if created_at else None,
+            content_type=entry.ref.get('content_type') or 'application/octet-stream',
+            metadata=metadata
+        )
+        if load_content:
+            media_file.content = self._read(entry, 0, entry.size)
+        return media_file
+
+    def delete(self, path: str) -> bool:
+        """Удаляет файл; в pack-файле запись помечается надгробием."""
+        with self._lock:
+            entry = self._active_index.pop(path, None) or self._index.pop(path, None)
+            if entry is not None:
+                self._kill(path, entry)
+                # Удаление должно пережить перезапуск, поэтому надгробия пишутся сразу
+                self._write_tombstones()
+                self._sync_journal()
+                return True
+        return self.backend.delete(path)
+
+    def version(self, path: str) -> Optional[str]:
+        """Версия упакованного файла — положение записи (перезапись дописывает новую)."""
+        entry = self._entry(path)
+        if entry is None:
+            return self.backend.version(path)
+        return f"{entry.pack}:{entry.offset}"
+
+    def exists(self, path: str) -> bool:
+        return self._entry(path) is not None or self.backend.exists(path)
+
+    def list_paths(self, prefix: str = '') -> Iterator[str]:
+        """Перечисляет упакованные файлы и большие файлы основного хранилища."""
+        with self._lock:
+            packed = sorted(p for p in {**self._index, **self._active_index} if p.startswith(prefix))
+        yield from packed
+        for path in self.backend.list_paths(prefix):
+            if not path.startswith(self.pack_prefix):
+                yield path
+
+    def open_reader(self, path: str) -> BinaryIO:
+        entry = self._entry(path)
+        if entry is None:
+            return self.backend.open_reader(path)
+        return BytesIO(self._read(entry, 0, entry.size))
+
+    def load_range(self, path: str, start: int, end: int) -> bytes:
+        """Читает диапазон байт файла одним чтением из pack-файла."""
+        entry = self._entry(path)
+        if entry is None:
+            return self.backend.load_range(path, start, end)
+        start, end = min(max(start, 0), entry.size), min(end, entry.size)
+        return self._read(entry, start, end) if end > start else b''
+
+    def open_writer(self, path: str) -> BinaryIO:
+        return _PackWriter(self, path)
+
+    def flush(self) -> None:
+        """Закрывает текущий pack-файл: записывает его, его индекс и надгробия в основное хранилище."""
+        with self._seal_lock:
+            self._seal()
+
+    def compact(self) -> int:
+        """
+        Переписывает живые записи pack-файлов с долей мусора не меньше
+        compaction_threshold в новый pack-файл и удаляет старые.
+
+        :return: сколько pack-файлов удалено
+        """
+        with self._lock:
+            victims = [pack for pack, info in self._packs.items()
+                       if info.garbage_ratio >= self.compaction_threshold and pack not in self._sealing]
+        removed = 0
+        for pack in victims:
+            with self._lock:
+                live = [(path, entry) for path, entry in self._index.items() if entry.pack == pack]
+            for path, entry in live:
+                self._append(path, self._read(entry, 0, entry.size), entry.ref, replace=entry)
+            # Новые копии должны оказаться в хранилище раньше, чем исчезнут старые
+            with self._seal_lock:
+                self._seal()
+                self._drop_pack(pack)
+            removed += 1
+        return removed
+
+    def start_compaction(self, interval: float = 60.0) -> None:
+        """Запускает фоновую компактизацию раз в interval секунд."""
+        if self._compactor is not None:
+            return
+        self._stop.clear()
+
+        def run() -> None:
+            while not self._stop.wait(interval):
+                try:
+                    self.compact()
+                except Exception as e:
+                    logger.exception("Pack compaction failed",
+                                     extra={'storage': 'pack', 'operation': 'compact', 'error_code': error_code(e)})
+
+        self._compactor = threading.Thread(target=run, name='pack-compaction', daemon=True)
+        self._compactor.start()
+
+    def close(self) -> None:
+        """Останавливает фоновую компактизацию и закрывает текущий pack-файл."""
+        self._stop.set()
+        if self._compactor is not None:
+            self._compactor.join()
+            self._compactor = None
+        self.flush()
+        with self._lock:
+            self._active.close()
+            if self._journal is not None:
+                # Текущий pack-файл после flush() пуст
+                self._journal.close()
+                self._remove_journal(self._active_id)
+
+    def _pack_key(self, pack: int, suffix: str = 'pack') -> str:
+        return f"{self.pack_prefix}{pack:08d}.{suffix}"
+
+    def _entry(self, path: str) -> Optional[PackEntry]:
+        with self._lock:
+            return self._active_index.get(path) or self._index.get(path)
+
+    def _read(self, entry: PackEntry, start: int, end: int) -> bytes:
+        """Читает байты [start, end) записи: pread из еще не загруженного pack-файла или ranged GET."""
+        with self._lock:
+            if entry.pack == self._active_id:
+                local = self._active
+            else:
+                local = self._sealing.get(entry.pack, (None,))[0]
+            if local is not None:
+                return os.pread(local.fileno(), end - start, entry.offset + start)
+        return self.backend.load_range(self._pack_key(entry.pack), entry.offset + start, entry.offset + end)
+
+    def _append(self, path: str, data, ref: Dict[str, Any], replace: Optional[PackEntry] = None) -> None:
+        """
+        Дописывает запись в текущий pack-файл.
+
+        :param replace: дописать, только если текущая запись файла — эта
+                        (компактизация не должна воскрешать удаленные файлы)
+        """
+        name = path.encode('utf-8')
+        with self._lock:
+            if replace is not None and self._index.get(path) is not replace:
+                return
+            header = _RECORD.pack(_RECORD_MAGIC, len(name), len(data))
+            self._active.seek(self._active_size)
+            self._active.write(header)
+            self._active.write(name)
+            self._active.write(data)
+            # Чтения идут через pread мимо буфера файла
+            self._active.flush()
+            entry = PackEntry(self._active_id, self._active_size + len(header) + len(name), len(data), ref)
+            self._active_size = entry.offset + len(data)
+
+            previous = self._active_index.pop(path, None) or self._index.pop(path, None)
+            if previous is not None:
+                self._kill(path, previous)
+            self._active_index[path] = entry
+            self._write_journal([path, entry.offset, entry.size, ref])
+            self._sync_journal()
+            seal = self._active_size >= self.max_pack_size
+        if seal:
+            # Запись уже сохранена: сбой загрузки pack-файла не отменяет ее, закрытый
+            # pack-файл останется локально и будет загружен при следующем flush()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error("Failed to upload sealed pack file: %s", e,
+                             extra={'storage': 'pack', 'operation': 'seal', 'path': path,
+                                    'error_code': error_code(e)})
+
+    def _forget(self, path: str) -> None:
+        """Убирает из индекса упакованную версию файла, замененную большим объектом."""
+        with self._lock:
+            entry = self._active_index.pop(path, None) or self._index.pop(path, None)
+            if entry is not None:
+                self._kill(path, entry)
+                self._sync_journal()
+
+    def _kill(self, path: str, entry: PackEntry) -> None:
+        """Учитывает запись как мусор и ставит надгробие (вызывать под self._lock)."""
+        info = self._packs.get(entry.pack)
+        if info is not None:
+            info.live_bytes -= entry.size
+            self._pending_tombstones.setdefault(entry.pack, set()).add(path)
+            if entry.pack in self._sealing:
+                # Пока pack-файл не загружен, надгробие хранится в его журнале
+                self._write_journal([path], entry.pack)
+        elif entry.pack == self._active_id:
+            self._write_journal([path])
+
+    def _seal(self) -> None:
+        """Закрывает текущий pack-файл и загружает закрытые в основное хранилище (вызывать под self._seal_lock)."""
+        with self._lock:
+            if self._active_index:
+                # Записи сразу переходят в общий индекс, а читаются из временного файла до конца загрузки
+                pack, index = self._active_id, self._active_index
+                self._sealing[pack] = (self._active, index)
+                self._packs[pack] = PackInfo(self._active_size, sum(entry.size for entry in index.values()))
+                self._index.update(index)
+                self._active_id = pack + 1
+                if self._journal is not None:
+                    self._journal.close()
+                self._active = self._open_active()
+                self._active_size = 0
+                self._active_index = {}
+            # Если прошлая загрузка упала, pack-файл остался здесь и загружается повторно
+            sealing = sorted(self._sealing.items())
+
+        for pack, (local, index) in sealing:
+            local.flush()
+            local.seek(0)
+            with self.backend.open_writer(self._pack_key(pack)) as writer:
+                shutil.copyfileobj(local, writer, CHUNK_SIZE)
+            # Индекс пишется после данных: pack-файл без .idx при загрузке игнорируется
+            self._write_json(self._pack_key(pack, 'idx'), {
+                path: [entry.offset, entry.size, entry.ref] for path, entry in index.items()
+            })
+            with self._lock:
+                del self._sealing[pack]
+            local.close()
+            self._remove_journal(pack)
+
+        with self._lock:
+            self._write_tombstones()
+
+    def _journal_path(self, pack: int, suffix: str = 'pack') -> str:
+        return os.path.join(self.journal_dir, f"{pack:08d}.{suffix}")
+
+    def _open_active(self) -> BinaryIO:
+        """Открывает новый текущий pack-файл (и его журнал, если задан journal_dir)."""
+        if self.journal_dir is None:
+            return tempfile.TemporaryFile()
+        self._journal = open(self._journal_path(self._active_id, 'journal'), 'wb')
+        return open(self._journal_path(self._active_id), 'w+b')
+
+    def _write_journal(self, record: list, pack: Optional[int] = None) -> None:
+        """
+        Дописывает в журнал запись [path, offset, size, ref] или надгробие [path].
+
+        :param pack: закрытый, но еще не загруженный pack-файл (его журнал
+                     синхронизируется сразу); по умолчанию — текущий
+        """
+        if self.journal_dir is None:
+            return
+        line = json.dumps(record, ensure_ascii=False).encode('utf-8') + b'\n'
+        if pack is None:
+            self._journal.write(line)
+            return
+        with open(self._journal_path(pack, 'journal'), 'ab') as journal:
+            journal.write(line)
+            journal.flush()
+            os.fsync(journal.fileno())
+
+    def _sync_journal(self) -> None:
+        """Синхронизирует текущий pack-файл и журнал на диск: данные раньше журнала (вызывать под self._lock)."""
+        if self._journal is not None:
+            os.fsync(self._active.fileno())
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+
+    def _remove_journal(self, pack: int) -> None:
+        if self.journal_dir is not None:
+            for suffix in ('pack', 'journal'):
+                try:
+                    os.remove(self._journal_path(pack, suffix))
+                except FileNotFoundError:
+                    pass
+
+    def _recover_journal(self) -> None:
+        """
+        Восстанавливает pack-файлы из journal_dir, не загруженные в основное хранилище.
+
+        Их записи попадают в индекс, а сами pack-файлы — в очередь загрузки
+        ближайшего flush(). Оборванная последняя строка журнала пропускается.
+        """
+        packs = sorted(int(name.split('.')[0]) for name in os.listdir(self.journal_dir) if name.endswith('.journal'))
+        for pack in packs:
+            if pack in self._packs:
+                # Pack-файл успел загрузиться до сбоя
+                self._remove_journal(pack)
+                continue
+            index: Dict[str, PackEntry] = {}
+            with open(self._journal_path(pack, 'journal'), 'rb') as journal:
+                for line in journal:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                    if len(record) == 1:
+                        index.pop(record[0], None)
+                    else:
+                        path, offset, size, ref = record
+                        index[path] = PackEntry(pack, offset, size, ref)
+            if not index:
+                self._remove_journal(pack)
+                continue
+
+            local = open(self._journal_path(pack), 'rb')
+            self._sealing[pack] = (local, index)
+            self._packs[pack] = PackInfo(os.fstat(local.fileno()).st_size,
+                                         sum(entry.size for entry in index.values()))
+            for path, entry in index.items():
+                previous = self._index.get(path)
+                if previous is not None:
+                    self._kill(path, previous)
+                self._index[path] = entry
+            logger.info("Recovered pack %d with %d files from journal", pack, len(index),
+                        extra={'storage': 'pack', 'operation': 'recover'})
+
+    def _write_tombstones(self) -> None:
+        """Дописывает накопленные надгробия в packs/<id>.del (вызывать под self._lock)."""
+        for pack, paths in list(self._pending_tombstones.items()):
+            if pack not in self._packs or pack in self._sealing:
+                # Надгробия еще не загруженного pack-файла пишутся после его индекса
+                continue
+            tombstones = self._tombstones.setdefault(pack, set())
+            tombstones.update(paths)
+            self._write_json(self._pack_key(pack, 'del'), sorted(tombstones))
+            del self._pending_tombstones[pack]
+
+    def _drop_pack(self, pack: int) -> None:
+        """Удаляет pack-файл, в котором не осталось живых записей."""
+        with self._lock:
+            if any(entry.pack == pack for entry in self._index.values()):
+                return
+            self._packs.pop(pack, None)
+            self._tombstones.pop(pack, None)
+            self._pending_tombstones.pop(pack, None)
+        for suffix in ('idx', 'del', 'pack'):
+            self.backend.delete(self._pack_key(pack, suffix))
+
+    def _load_index(self) -> None:
+        """Восстанавливает индекс по индексам и надгробиям pack-файлов основного хранилища."""
+        packs: List[int] = sorted({
+            int(key[len(self.pack_prefix):].split('.')[0])
+            for key in self.backend.list_paths(self.pack_prefix) if key.endswith('.idx')
+        })
+        for pack in packs:
+            index = self._read_json(self._pack_key(pack, 'idx')) or {}
+            tombstones = set(self._read_json(self._pack_key(pack, 'del')) or [])
+            size = max((offset + entry_size for offset, entry_size, _ in index.values()), default=0)
+            info = self._packs[pack] = PackInfo(size)
+            self._tombstones[pack] = tombstones
+            for path, (offset, entry_size, ref) in index.items():
+                if path in tombstones:
+                    continue
+                previous = self._index.get(path)
+                if previous is not None:
+                    self._packs[previous.pack].live_bytes -= previous.size
+                self._index[path] = PackEntry(pack, offset, entry_size, ref)
+                info.live_bytes += entry_size
+
+    def _read_json(self, key: str) -> Optional[Any]:
+        try:
+            with self.backend.open_reader(key) as reader:
+                return json.loads(reader.read())
+        except FileNotFoundError:
+            return None
+
+    def _write_json(self, key: str, data: Any) -> None:
+        with self.backend.open_writer(key) as writer:
+            writer.write(json.dumps(data, ensure_ascii=False).encode('utf-8'))
@@ -0,0 +1,139 @@
+import io
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+# Размер блока кэша и минимальный размер запроса диапазона
+BLOCK_SIZE = 256 * 1024
+
+
+@dataclass
+class RangeStats:
+    """Счетчики чтения через RangeReader."""
+    requests: int = 0
+    bytes_fetched: int = 0
+    block_hits: int = 0
+    block_misses: int = 0
+
+
+class RangeReader(io.RawIOBase):
+    """
+    Файл хранилища с произвольным доступом (seek/read) поверх load_range.
+
+    Данные читаются блоками по block_size и держатся в небольшом LRU-кэше
+    блоков, поэтому перемотка по 4 ГБ видео стоит килобайты, а не весь файл.
+    Пока чтение идет последовательно, окно упреждающего чтения удваивается
+    (до max_read_ahead), и следующие блоки приходят одним запросом вместе
+    с запрошенным; после случайного seek окно сбрасывается до одного блока.
+    """
+
+    def __init__(self,
+                 storage,
+                 path: str,
+                 size: int,
+                 block_size: int = BLOCK_SIZE,
+                 cache_blocks: int = 32,
+                 max_read_ahead: int = 8 * 1024 * 1024):
+        """
+        :param storage: хранилище с методом load_range
+        :param size: размер файла в байтах
+        :param block_size: размер блока кэша
+        :param cache_blocks: сколько блоков держать в кэше
+        :param max_read_ahead: максимальное окно упреждающего чтения в байтах
+        """
+        super().__init__()
+        self.storage = storage
+        self.path = path
+        self.size = size
+        self.block_size = block_size
+        self.cache_blocks = max(cache_blocks, 1)
+        self.max_read_ahead_blocks = max(max_read_ahead // block_size, 1)
+        self.stats = RangeStats()
+        self._position = 0
+        self._blocks: 'OrderedDict[int, bytes]' = OrderedDict()
+        self._window = 1
+        self._last_block: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            position = self.size + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        if position < 0:
+            raise ValueError(f"Negative seek position {position}")
+        self._position = position
+        return position
+
+    def readinto(self, buffer) -> int:
+        view = memoryview(buffer).cast('B')
+        end = min(self._position + len(view), self.size)
+        written = 0
+        while self._position < end:
+            block_no, offset = divmod(self._position, self.block_size)
+            block = self._block(block_no)
+            count = min(len(block) - offset, end - self._position)
+            if count <= 0:
+                break
+            view[written:written + count] = block[offset:offset + count]
+            written += count
+            self._position += count
+        return written
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = max(self.size - self._position, 0)
+        buffer = bytearray(min(size, max(self.size - self._position, 0)))
+        return bytes(buffer[:self.readinto(buffer)])
+
+    def readall(self) -> bytes:
+        return self.read()
+
+    def _block(self, block_no: int) -> bytes:
+        """Возвращает блок из кэша или загружает его вместе с окном упреждающего чтения."""
+        with self._lock:
+            sequential = self._last_block is not None and block_no in (self._last_block, self._last_block + 1)
+            if block_no != self._last_block:
+                self._window = min(self._window * 2, self.max_read_ahead_blocks) if sequential else 1
+            self._last_block = block_no
+
+            block = self._blocks.get(block_no)
+            if block is not None:
+                self._blocks.move_to_end(block_no)
+                self.stats.block_hits += 1
+                return block
+            self.stats.block_misses += 1
+
+            # Одним запросом берем запрошенный блок и следующие за ним отсутствующие в кэше
+            last = min(block_no + self._window, -(-self.size // self.block_size), block_no + self.cache_blocks)
+            stop = block_no + 1
+            while stop < last and stop not in self._blocks:
+                stop += 1
+
+        start = block_no * self.block_size
+        data = self.storage.load_range(self.path, start, min(stop * self.block_size, self.size))
+
+        with self._lock:
+            self.stats.requests += 1
+            self.stats.bytes_fetched += len(data)
+            for i in range(block_no, stop):
+                offset = (i - block_no) * self.block_size
+                self._blocks[i] = data[offset:offset + self.block_size]
+                self._blocks.move_to_end(i)
+            while len(self._blocks) > self.cache_blocks:
+                self._blocks.popitem(last=False)
+            return data[:self.block_size]
@@ -0,0 +1,306 @@
+import logging
+import random
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+from homework_04.infra.storage.base import error_code
+
+logger = logging.getLogger(__name__)
+
+# Событие отмены запроса, выполняемого в текущем потоке (см. ResilientExecutor._hedged)
+_current = threading.local()
+
+
+def cancelled() -> bool:
+    """Отменен ли запрос текущего потока: дублирующий запрос уже получил ответ."""
+    event = getattr(_current, 'cancel', None)
+    return event is not None and event.is_set()
+
+
+def wait_cancelled(timeout: float) -> bool:
+    """
+    Ждет timeout секунд или отмены запроса текущего потока, если она наступит раньше.
+
+    Подходит для долгих ожиданий внутри запроса (хуки клиента, паузы между
+    частями), чтобы проигравший hedged-запрос не занимал поток зря.
+
+    :return: True, если запрос отменен
+    """
+    event = getattr(_current, 'cancel', None)
+    if event is None:
+        time.sleep(timeout)
+        return False
+    return event.wait(timeout)
+
+
+@dataclass
+class RetryPolicy:
+    """
+    Политика повторов с экспоненциальной задержкой и полным джиттером.
+
+    Задержка перед попыткой n (с нуля) выбирается случайно из
+    [0, min(max_delay, base_delay * 2^n)], чтобы клиенты, получившие
+    ошибку одновременно, не повторяли запросы синхронно.
+    """
+    max_attempts: int = 4
+    base_delay: float = 0.05
+    max_delay: float = 2.0
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+class RetryBudget:
+    """
+    Бюджет повторов (token bucket), общий для всех запросов хранилища.
+
+    Каждый исходный запрос добавляет ratio токена, каждый повтор или
+    дублирующий (hedged) запрос тратит целый токен; кроме того, бюджет
+    пополняется на min_per_second токенов в секунду, чтобы повторы были
+    возможны и при малом трафике. Когда сервис перегружен и отказывает
+    всем, дополнительных запросов получается не больше ratio от основного
+    потока, и повторы не умножают нагрузку.
+    """
+
+    def __init__(self, ratio: float = 0.1, min_per_second: float = 5.0, capacity: float = 50.0):
+        """
+        :param ratio: доля повторов относительно числа запросов
+        :param min_per_second: сколько повторов в секунду разрешено независимо от трафика
+        :param capacity: максимальный запас токенов
+        """
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.capacity = capacity
+        self._tokens = min(min_per_second, capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def deposit(self) -> None:
+        """Учитывает исходный запрос."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens + self.ratio, self.capacity)
+
+    def withdraw(self) -> bool:
+        """Пытается потратить токен на повтор; False — бюджет исчерпан."""
+        with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    @property
+    def tokens(self) -> float:
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self._tokens + (now - self._updated) * self.min_per_second, self.capacity)
+        self._updated = now
+
+
+@dataclass
+class HedgePolicy:
+    """
+    Политика дублирующих (hedged) запросов.
+
+    Если запрос не завершился за время, равное percentile-му перцентилю
+    задержек последних window запросов этой операции (но не меньше
+    min_delay и не больше max_delay), отправляется второй такой же запрос
+    и берется ответ, пришедший первым. Пока набрано меньше warmup замеров,
+    запросы не дублируются.
+    """
+    percentile: float = 95.0
+    min_delay: float = 0.01
+    max_delay: float = 2.0
+    window: int = 1000
+    warmup: int = 20
+
+
+class LatencyWindow:
+    """Скользящее окно задержек последних запросов с расчетом перцентиля."""
+
+    def __init__(self, size: int):
+        self._samples: deque = deque(maxlen=size)
+        self._sorted: list = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            if len(self._samples) == self._samples.maxlen:
+                oldest = self._samples[0]
+                del self._sorted[bisect_left(self._sorted, oldest)]
+            self._samples.append(seconds)
+            insort(self._sorted, seconds)
+
+    def percentile(self, p: float) -> Optional[float]:
+        with self._lock:
+            if not self._sorted:
+                return None
+            return self._sorted[min(int(p / 100 * len(self._sorted)), len(self._sorted) - 1)]
+
+
+@dataclass
+class RequestStats:
+    """Счетчики ResilientExecutor."""
+    requests: int = 0
+    retries: int = 0
+    hedges: int = 0
+    hedge_wins: int = 0
+    hedges_cancelled: int = 0
+    budget_exhausted: int = 0
+
+
+class ResilientExecutor:
+    """
+    Выполняет запросы к хранилищу с повторами и дублированием.
+
+    Повторяются только ошибки, для которых is_retryable возвращает True
+    (троттлинг, 5xx, обрывы соединения), не более retry_policy.max_attempts
+    попыток и пока есть токены в retry_budget. Дублирующие запросы (если
+    задана hedge_policy) выполняются в отдельном пуле потоков и тоже
+    тратят токены бюджета. Когда один из пары запросов получил ответ,
+    второй отменяется: если он еще не начался, он не выполняется, а если
+    выполняется — получает сигнал отмены (см. cancelled и wait_cancelled).
+    """
+
+    def __init__(self,
+                 is_retryable: Callable[[BaseException], bool],
+                 retry_policy: Optional[RetryPolicy] = None,
+                 retry_budget: Optional[RetryBudget] = None,
+                 hedge_policy: Optional[HedgePolicy] = None,
+                 max_workers: int = 16,
+                 log_extra: Optional[Dict[str, Any]] = None):
+        """
+        :param is_retryable: можно ли повторить запрос после этой ошибки
+        :param retry_policy: политика повторов (по умолчанию RetryPolicy())
+        :param retry_budget: бюджет повторов (можно разделять между хранилищами)
+        :param hedge_policy: политика дублирования; None — запросы не дублируются
+        :param max_workers: размер пула потоков для дублируемых запросов
+        :param log_extra: поля, добавляемые к записям лога (storage, bucket)
+        """
+        self.is_retryable = is_retryable
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.retry_budget = retry_budget if retry_budget is not None else RetryBudget()
+        self.hedge_policy = hedge_policy
+        self.max_workers = max_workers
+        self.log_extra = log_extra or {}
+        self.stats = RequestStats()
+        self._latencies: Dict[str, LatencyWindow] = {}
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def call(self, operation: str, func: Callable[[], Any], path: str = '', hedge: bool = False) -> Any:
+        """
+        Выполняет func() с повторами (и дублированием, если hedge и задана hedge_policy).
+
+        :param operation: имя операции (для лога и отдельного окна задержек)
+        :param func: запрос целиком, включая чтение тела ответа
+        """
+        self.retry_budget.deposit()
+        with self._lock:
+            self.stats.requests += 1
+        attempt = 0
+        while True:
+            try:
+                if hedge and self.hedge_policy is not None:
+                    return self._hedged(operation, func)
+                return func()
+            except Exception as e:
+                attempt += 1
+                if not self.is_retryable(e) or attempt >= self.retry_policy.max_attempts:
+                    raise
+                if not self.retry_budget.withdraw():
+                    with self._lock:
+                        self.stats.budget_exhausted += 1
+                    logger.warning("Retry budget exhausted, giving up %s %s: %s", operation, path, e,
+                                   extra=self._extra(operation, path, e))
+                    raise
+                delay = self.retry_policy.backoff(attempt - 1)
+                with self._lock:
+                    self.stats.retries += 1
+                logger.warning("Retrying %s %s in %.3fs (attempt %d): %s", operation, path, delay, attempt + 1, e,
+                               extra=self._extra(operation, path, e))
+                time.sleep(delay)
+
+    def hedge_delay(self, operation: str) -> Optional[float]:
+        """Через сколько секунд дублировать запрос операции (None — пока не дублировать)."""
+        policy = self.hedge_policy
+        window = self._latencies.get(operation)
+        if policy is None or window is None or len(window) < policy.warmup:
+            return None
+        return min(max(window.percentile(policy.percentile), policy.min_delay), policy.max_delay)
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+    def _hedged(self, operation: str, func: Callable[[], Any]) -> Any:
+        """Отправляет запрос и, если он задерживается, его дубликат; возвращает первый успешный ответ."""
+        window = self._latencies.get(operation)
+        if window is None:
+            with self._lock:
+                window = self._latencies.setdefault(operation, LatencyWindow(self.hedge_policy.window))
+
+        def timed(cancel: threading.Event) -> Any:
+            # Замеряется каждая попытка отдельно, чтобы дублирование не занижало
+            # перцентиль, по которому оно и включается; отмененные не замеряются
+            _current.cancel = cancel
+            try:
+                started = time.perf_counter()
+                result = func()
+                if not cancel.is_set():
+                    window.observe(time.perf_counter() - started)
+                return result
+            finally:
+                _current.cancel = None
+
+        delay = self.hedge_delay(operation)
+        pool = self._get_pool()
+        primary_cancel, hedge_cancel = threading.Event(), threading.Event()
+        primary = pool.submit(timed, primary_cancel)
+        if delay is None or wait([primary], timeout=delay).done or not self.retry_budget.withdraw():
+            return primary.result()
+
+        hedge = pool.submit(timed, hedge_cancel)
+        with self._lock:
+            self.stats.hedges += 1
+        pending = {primary, hedge}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    loser = primary if future is hedge else hedge
+                    if loser in pending:
+                        # Не начавшийся запрос снимается с очереди, выполняющийся получает сигнал
+                        loser.cancel()
+                        (primary_cancel if loser is primary else hedge_cancel).set()
+                    with self._lock:
+                        self.stats.hedge_wins += future is hedge
+                        self.stats.hedges_cancelled += loser in pending
+                    return future.result()
+                error = error or future.exception()
+        raise error
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='hedged')
+        return self._pool
+
+    def _extra(self, operation: str, path: str, error: BaseException) -> Dict[str, Any]:
+        return {**self.log_extra, 'operation': operation, 'path': path, 'error_code': error_code(error)}
+
@@ -1,230 +1,679 @@
-import boto3
-from botocore.exceptions import ClientError
-from io import BytesIO
-from typing import Optional, Union, Dict, Any
-from urllib.parse import urlparse
-from homework_04.domain.base import MediaFile
-from homework_04.domain.audiofile import AudioFile
-from homework_04.domain.photofile imoprt PhotoFile
-from homework_04.domain.videofile import VideoFile
-from homework_04.infra.base import Storage
-
-class S3Storage(Storage):
-    """Класс для работы с S3-совместимыми хранилищами."""
-    
-    def __init__(self, 
-                 endpoint_url: str,
-                 access_key: str,
-                 secret_key: str,
-                 bucket_name: str,
-                 region: str = 'us-east-1',
-                 secure: bool = True):
-        """
-        Инициализация S3 хранилища.
-        
-        :param endpoint_url: URL S3-совместимого сервиса (например, 'https://s3.amazonaws.com')
-        :param access_key: ключ доступа
-        :param secret_key: секретный ключ
-        :param bucket_name: имя бакета
-        :param region: регион (по умолчанию 'us-east-1')
-        :param secure: использовать HTTPS (по умолчанию True)
-        """
-        self.endpoint_url = endpoint_url
-        self.bucket_name = bucket_name
-        self.region = region
-        
-        # Инициализация S3 клиента
-        self.s3 = boto3.client(
-            's3',
-            endpoint_url=endpoint_url,
-            aws_access_key_id=access_key,
-            aws_secret_access_key=secret_key,
-            region_name=region,
-            use_ssl=secure
-        )
-        
-    def save(self, media_file: MediaFile, path: str) -> bool:
-        """Сохраняет файл в S3 хранилище."""
-        if media_file.content is None:
-            return False
-            
-        try:
-            extra_args = self._get_upload_args(media_file)
-            
-            if isinstance(media_file.content, BytesIO):
-                self.s3.upload_fileobj(
-                    media_file.content,
-                    self.bucket_name,
-                    path,
-                    ExtraArgs=extra_args
-                )
-            else:
-                self.s3.put_object(
-                    Bucket=self.bucket_name,
-                    Key=path,
-                    Body=media_file.content,
-                    **extra_args
-                )
-            return True
-        except ClientError as e:
-            print(f"Error uploading file to S3: {e}")
-            return False
-            
-    def load(self, path: str, load_content: bool = True) -> Optional[MediaFile]:
-        """Загружает файл из S3 хранилища."""
-        try:
-            # Получаем метаданные
-            head = self.s3.head_object(Bucket=self.bucket_name, Key=path)
-            metadata = head.get('Metadata', {})
-            
-            # Определяем тип файла по content-type
-            content_type = head.get('ContentType', 'application/octet-stream')
-            
-            # Создаем объект MediaFile
-            media_file = self._create_media_file(
-                name=path.split('/')[-1],
-                size=head['ContentLength'],
-                owner=head.get('Owner', {}).get('DisplayName', 'unknown'),
-                created_at=head['LastModified'],
-                content_type=content_type,
-                metadata=metadata
-            )
-            
-            if load_content:
-                content = self.get_content(path)
-                if content:
-                    media_file.content = content
-                    
-            return media_file
-        except ClientError as e:
-            if e.response['Error']['Code'] == '404':
-                return None
-            print(f"Error loading file from S3: {e}")
-            return None
-            
-    def get_content(self, path: str) -> Optional[Union[bytes, BytesIO]]:
-        """Получает содержимое файла из S3."""
-        try:
-            buffer = BytesIO()
-            self.s3.download_fileobj(self.bucket_name, path, buffer)
-            buffer.seek(0)
-            return buffer
-        except ClientError as e:
-            print(f"Error downloading file from S3: {e}")
-            return None
-            
-    def delete(self, path: str) -> bool:
-        """Удаляет файл из S3 хранилища."""
-        try:
-            self.s3.delete_object(Bucket=self.bucket_name, Key=path)
-            return True
-        except ClientError as e:
-            print(f"Error deleting file from S3: {e}")
-            return False
-            
-    def exists(self, path: str) -> bool:
-        """Проверяет существование файла в S3."""
-        try:
-            self.s3.head_object(Bucket=self.bucket_name, Key=path)
-            return True
-        except ClientError as e:
-            if e.response['Error']['Code'] == '404':
-                return False
-            raise
-            
-    def _get_upload_args(self, media_file: MediaFile) -> Dict[str, Any]:
-        """Генерирует дополнительные аргументы для загрузки."""
-        args = {
-            'Metadata': {
-                'owner': media_file.owner,
-                'created_at': media_file.created_at.isoformat(),
-                **media_file.metadata
-            }
-        }
-        
-        # Устанавливаем ContentType в зависимости от типа файла
-        if isinstance(media_file, AudioFile):
-            args['ContentType'] = f'audio/{media_file.codec}'
-        elif isinstance(media_file, VideoFile):
-            args['ContentType'] = f'video/{media_file.codec}'
-        elif isinstance(media_file, PhotoFile):
-            args['ContentType'] = 'image/jpeg'  # или другой формат
-            
-        return args
-        
-    def _create_media_file(self, 
-                         name: str,
-                         size: int,
-                         owner: str,
-                         created_at,
-                         content_type: str,
-                         metadata: Dict[str, str]) -> MediaFile:
-        """Создает соответствующий объект MediaFile на основе метаданных."""
-        
-        # Парсим дополнительные метаданные
-        file_metadata = {
-            k: v for k, v in metadata.items() 
-            if not k.startswith('x-amz-')
-        }
-        
-        if content_type.startswith('audio/'):
-            codec = content_type.split('/')[-1]
-            return AudioFile(
-                name=name,
-                size=size,
-                owner=owner,
-                content=None,
-                created_at=created_at,
-                duration=float(metadata.get('duration', 0)),
-                bitrate=int(metadata.get('bitrate', 0)),
-                codec=codec,
-                **file_metadata
-            )
-        elif content_type.startswith('video/'):
-            codec = content_type.split('/')[-1]
-            return VideoFile(
-                name=name,
-                size=size,
-                owner=owner,
-                content=None,
-                created_at=created_at,
-                duration=float(metadata.get('duration', 0)),
-                resolution=metadata.get('resolution', 'unknown'),
-                codec=codec,
-                fps=float(metadata.get('fps', 0)),
-                **file_metadata
-            )
-        elif content_type.startswith('image/'):
-            return PhotoFile(
-                name=name,
-                size=size,
-                owner=owner,
-                content=None,
-                created_at=created_at,
-                resolution=metadata.get('resolution', 'unknown'),
-                camera_model=metadata.get('camera_model'),
-                **file_metadata
-            )
-        else:
-            # Для неизвестных типов возвращаем базовый MediaFile
-            return MediaFile(
-                name=name,
-                size=size,
-                owner=owner,
-                content=None,
-                created_at=created_at,
-                **file_metadata
-            )
-            
-    def generate_presigned_url(self, path: str, expires_in: int = 3600) -> Optional[str]:
-        """Генерирует временную ссылку для доступа к файлу."""
-        try:
-            url = self.s3.generate_presigned_url(
-                'get_object',
-                Params={'Bucket': self.bucket_name, 'Key': path},
-                ExpiresIn=expires_in
-            )
-            return url
-        except ClientError as e:
-            print(f"Error generating presigned URL: {e}")
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from botocore.exceptions import ClientError, ConnectionError as BotoConnectionError, HTTPClientError, IncompleteReadError
+from io import BytesIO
+from typing import Optional, Union, Dict, Any, BinaryIO, Iterable, Iterator, List, Tuple
+from urllib.parse import urlparse
+from homework_04.domain.base import MediaFile
+from homework_04.infra.storage.base import Storage, BatchResult, CHUNK_SIZE, error_code, open_content
+from homework_04.infra.storage.cache import MetadataCache, MISSING
+from homework_04.infra.storage.resilience import HedgePolicy, RequestStats, ResilientExecutor, RetryBudget, RetryPolicy
+
+logger = logging.getLogger(__name__)
+
+# Максимум ключей в одном запросе delete_objects
+DELETE_BATCH_SIZE = 1000
+
+# Минимальный размер части multipart-загрузки в S3 (кроме последней)
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+# Сколько раз загрузка начинается заново, если объект перезаписали во время докачки частей
+VERSION_RESTARTS = 3
+
+# Коды ошибок S3, после которых запрос имеет смысл повторить
+RETRYABLE_CODES = frozenset({
+    'SlowDown', 'Throttling', 'ThrottlingException', 'RequestLimitExceeded', 'TooManyRequests',
+    'RequestThrottled', 'RequestTimeout', 'InternalError', 'ServiceUnavailable',
+})
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Можно ли повторить запрос к S3 после этой ошибки: троттлинг, 5xx или обрыв соединения."""
+    if isinstance(error, ClientError):
+        status = error.response.get('ResponseMetadata', {}).get('HTTPStatusCode', 0)
+        return error.response['Error'].get('Code') in RETRYABLE_CODES or status == 429 or status >= 500
+    return isinstance(error, (BotoConnectionError, HTTPClientError, IncompleteReadError))
+
+# Клиенты boto3, общие для хранилищ с одинаковыми адресом, учетными данными и размером пула
+_clients: Dict[Tuple, Any] = {}
+_clients_lock = threading.Lock()
+
+
+def _create_client(endpoint_url: str, access_key: str, secret_key: str,
+                   region: str, secure: bool, max_pool_connections: int) -> Any:
+    """Создает клиент S3; boto3 импортируется только здесь, при первом обращении к S3."""
+    import boto3
+    from botocore.config import Config
+    return boto3.client(
+        's3',
+        endpoint_url=endpoint_url,
+        aws_access_key_id=access_key,
+        aws_secret_access_key=secret_key,
+        region_name=region,
+        use_ssl=secure,
+        config=Config(
+            max_pool_connections=max_pool_connections,
+            retries={'total_max_attempts': 1}
+        )
+    )
+
+
+def shared_client(*client_args) -> Any:
+    """
+    Возвращает общий клиент S3 для этих параметров (создает при первом вызове).
+
+    Клиенты boto3 потокобезопасны, поэтому хранилища одного сервиса делят
+    и клиент, и его пул HTTP-соединений.
+    """
+    client = _clients.get(client_args)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(client_args)
+            if client is None:
+                client = _clients[client_args] = _create_client(*client_args)
+    return client
+
+
+class _S3Writer:
+    """
+    Потоковая запись объекта в S3.
+
+    Пока данных меньше одной части, они копятся в памяти и при закрытии
+    отправляются одним put_object. Как только набирается part_size байт,
+    запись переключается на multipart upload: части отправляются параллельно
+    в пуле потоков хранилища, а объем данных «в полете» ограничен
+    max_in_flight_bytes — общим лимитом на все записи хранилища (write
+    блокируется, пока не освободится место).
+    """
+
+    def __init__(self, storage: 'S3Storage', path: str, extra_args: Optional[Dict[str, Any]] = None):
+        self.storage = storage
+        self.path = path
+        self.extra_args = extra_args or {}
+        self.closed = False
+        self._buffer = bytearray()
+        self._upload_id: Optional[str] = None
+        self._futures: List[Future] = []
+
+    def write(self, data) -> int:
+        self._buffer += data
+        while len(self._buffer) >= self.storage.part_size:
+            part = bytes(self._buffer[:self.storage.part_size])
+            del self._buffer[:self.storage.part_size]
+            self._submit_part(part)
+        return len(data)
+
+    def writable(self) -> bool:
+        return True
+
+    def discard(self) -> None:
+        """Отменяет запись (и незавершенную multipart-загрузку)."""
+        self.closed = True
+        self._buffer = bytearray()
+        if self._upload_id is not None:
+            wait(self._futures)
+            self._request('abort_multipart_upload', lambda: self.storage.s3.abort_multipart_upload(
+                Bucket=self.storage.bucket_name, Key=self.path, UploadId=self._upload_id
+            ))
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        if self._upload_id is None:
+            self.closed = True
+            body = bytes(self._buffer)
+            self._request('put_object', lambda: self.storage.s3.put_object(
+                Bucket=self.storage.bucket_name,
+                Key=self.path,
+                Body=body,
+                **self.extra_args
+            ))
+            self._invalidate()
+            return
+
+        try:
+            if self._buffer:
+                self._submit_part(bytes(self._buffer))
+            parts = [future.result() for future in self._futures]
+            self._request('complete_multipart_upload', lambda: self.storage.s3.complete_multipart_upload(
+                Bucket=self.storage.bucket_name,
+                Key=self.path,
+                UploadId=self._upload_id,
+                MultipartUpload={'Parts': parts}
+            ))
+            self.closed = True
+            self._invalidate()
+        except Exception:
+            self.discard()
+            raise
+
+    def _request(self, operation: str, func) -> Any:
+        """Выполняет запрос с повторами хранилища."""
+        return self.storage._requests.call(operation, func, self.path)
+
+    def _invalidate(self) -> None:
+        """Сбрасывает закэшированные метаданные перезаписанного объекта."""
+        if self.storage.metadata_cache is not None:
+            self.storage.metadata_cache.invalidate(self.path)
+
+    def _submit_part(self, part: bytes) -> None:
+        """Отправляет часть в пул потоков, дожидаясь свободного места в лимите памяти."""
+        if self._upload_id is None:
+            response = self._request('create_multipart_upload', lambda: self.storage.s3.create_multipart_upload(
+                Bucket=self.storage.bucket_name, Key=self.path, **self.extra_args
+            ))
+            self._upload_id = response['UploadId']
+
+        self.storage._upload_slots.acquire()
+        try:
+            future = self.storage._get_pool().submit(
+                self._upload_part, len(self._futures) + 1, part
+            )
+        except BaseException:
+            self.storage._upload_slots.release()
+            raise
+        self._futures.append(future)
+
+    def _upload_part(self, part_number: int, part: bytes) -> Dict[str, Any]:
+        try:
+            response = self._request('upload_part', lambda: self.storage.s3.upload_part(
+                Bucket=self.storage.bucket_name,
+                Key=self.path,
+                UploadId=self._upload_id,
+                PartNumber=part_number,
+                Body=part
+            ))
+            return {'PartNumber': part_number, 'ETag': response['ETag']}
+        finally:
+            self.storage._upload_slots.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.discard()
+        else:
+            self.close()
+
+
+class S3Storage(Storage):
+    """Класс для работы с S3-совместимыми хранилищами."""
+    
+    def __init__(self, 
+                 endpoint_url: str,
+                 access_key: str,
+                 secret_key: str,
+                 bucket_name: str,
+                 region: str = 'us-east-1',
+                 secure: bool = True,
+                 part_size: int = 8 * 1024 * 1024,
+                 max_concurrency: int = 8,
+                 max_in_flight_bytes: Optional[int] = None,
+                 metadata_cache: Optional[MetadataCache] = None,
+                 max_pool_connections: int = 10,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 retry_budget: Optional[RetryBudget] = None,
+                 hedge_policy: Optional[HedgePolicy] = None,
+                 share_client: bool = True):
+        """
+        Инициализация S3 хранилища.
+        
+        :param endpoint_url: URL S3-совместимого сервиса (например, 'https://s3.amazonaws.com')
+        :param access_key: ключ доступа
+        :param secret_key: секретный ключ
+        :param bucket_name: имя бакета
+        :param region: регион (по умолчанию 'us-east-1')
+        :param secure: использовать HTTPS (по умолчанию True)
+        :param part_size: размер части для multipart upload и ranged GET (не меньше 5 МБ)
+        :param max_concurrency: сколько частей передается параллельно
+        :param max_in_flight_bytes: сколько байт загружаемых частей может одновременно
+                                    находиться в памяти — суммарно по всем открытым записям
+                                    (по умолчанию part_size * max_concurrency)
+        :param metadata_cache: кэш метаданных и отсутствующих ключей (по умолчанию выключен);
+                               сбрасывается при save/delete через это хранилище
+        :param max_pool_connections: размер пула HTTP-соединений клиента (не меньше max_concurrency)
+        :param retry_policy: повторы при троттлинге, 5xx и обрывах соединения
+                             (по умолчанию RetryPolicy(); собственные повторы botocore отключены)
+        :param retry_budget: бюджет повторов и дублирующих запросов (можно разделять
+                             между хранилищами, чтобы повторы не умножали перегрузку)
+        :param hedge_policy: дублирующие запросы на чтение (по умолчанию выключены)
+        :param share_client: использовать общий клиент (и пул соединений) с другими
+                             хранилищами с теми же адресом, учетными данными и размером пула;
+                             False — собственный клиент, например чтобы вешать на него хуки
+        """
+        self.endpoint_url = endpoint_url
+        self.bucket_name = bucket_name
+        self.region = region
+        self.part_size = max(part_size, MIN_PART_SIZE)
+        self.max_concurrency = max_concurrency
+        self.max_in_flight_bytes = max_in_flight_bytes or self.part_size * max_concurrency
+        # Лимит частей «в полете» общий для всех _S3Writer этого хранилища
+        self._upload_slots = threading.BoundedSemaphore(max(1, self.max_in_flight_bytes // self.part_size))
+        self.metadata_cache = metadata_cache
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._batch_pool: Optional[ThreadPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self._client: Any = None
+        self._client_args = (endpoint_url, access_key, secret_key, region, secure,
+                             max(max_pool_connections, max_concurrency))
+        self._share_client = share_client
+        self._requests = ResilientExecutor(
+            is_retryable,
+            retry_policy=retry_policy,
+            retry_budget=retry_budget,
+            hedge_policy=hedge_policy,
+            max_workers=2 * max(max_pool_connections, max_concurrency),
+            log_extra={'storage': 's3', 'bucket': bucket_name}
+        )
+        
+    @property
+    def s3(self) -> Any:
+        """Клиент boto3; создается (или берется общий) при первом обращении."""
+        if self._client is None:
+            self._client = shared_client(*self._client_args) if self._share_client \
+                else _create_client(*self._client_args)
+        return self._client
+        
+    @property
+    def request_stats(self) -> RequestStats:
+        """Счетчики запросов, повторов и дублирующих запросов."""
+        return self._requests.stats
+        
+    def save(self, media_file: MediaFile, path: str) -> bool:
+        """Сохраняет файл в S3 хранилище."""
+        if media_file.content is None:
+            return False
+            
+        try:
+            extra_args = self._get_upload_args(media_file)
+            stream = open_content(media_file.content)
+            try:
+                self._upload_stream(stream, path, extra_args)
+            finally:
+                if stream is not media_file.content:
+                    stream.close()
+            return True
+        except ClientError as e:
+            self._log_error('save', path, e, 'Failed to upload %s to S3: %s')
+            return False
+            
+    def load(self, path: str, load_content: bool = True) -> Optional[MediaFile]:
+        """Загружает файл из S3 хранилища."""
+        try:
+            # Получаем метаданные (из кэша, если он включен)
+            media_file = self._head(path)
+            if media_file is None:
+                return None
+            
+            if load_content:
+                content = self.get_content(path, size=media_file.size)
+                if content:
+                    media_file.content = content
+                    
+            return media_file
+        except ClientError as e:
+            self._log_error('load', path, e, 'Failed to load %s from S3: %s')
+            return None
+            
+    def get_content(self, path: str, size: Optional[int] = None) -> Optional[Union[bytes, BytesIO]]:
+        """
+        Получает содержимое файла из S3.
+        
+        Большие объекты скачиваются параллельными ranged GET прямо в итоговый буфер;
+        все части читаются из одной версии объекта (см. _load_with_get).
+        
+        :param size: размер объекта, если уже известен (экономит head_object)
+        """
+        try:
+            if size is None:
+                head = self._head(path)
+                if head is None:
+                    return None
+                size = head.size
+            if size > self.part_size:
+                media_file = self._load_with_get(path)
+                return media_file.content if media_file is not None else None
+            buffer = BytesIO(self._requests.call(
+                'get_object', lambda: self.s3.get_object(Bucket=self.bucket_name, Key=path)['Body'].read(),
+                path, hedge=True
+            ))
+            buffer.seek(0)
+            return buffer
+        except ClientError as e:
+            self._log_error('get_content', path, e, 'Failed to download %s from S3: %s')
+            return None
+            
+    def delete(self, path: str) -> bool:
+        """Удаляет файл из S3 хранилища."""
+        try:
+            self._requests.call('delete_object', lambda: self.s3.delete_object(Bucket=self.bucket_name, Key=path), path)
+            if self.metadata_cache is not None:
+                self.metadata_cache.put_missing(path)
+            return True
+        except ClientError as e:
+            self._log_error('delete', path, e, 'Failed to delete %s from S3: %s')
+            return False
+            
+    def load_many(self, paths: Iterable[str]) -> Dict[str, BatchResult]:
+        """
+        Загружает несколько файлов из S3.
+        
+        Вместо head_object + download каждый файл читается одним GET первой
+        части (в ответе есть и метаданные, и полный размер объекта), а
+        остаток больших объектов докачивается параллельными ranged GET.
+        """
+        return self._run_batch(self._load_with_get, paths)
+        
+    def delete_many(self, paths: Iterable[str]) -> Dict[str, BatchResult]:
+        """Удаляет несколько файлов из S3 запросами delete_objects (до 1000 ключей в запросе)."""
+        paths = list(dict.fromkeys(paths))
+        results = {}
+        for start in range(0, len(paths), DELETE_BATCH_SIZE):
+            batch = paths[start:start + DELETE_BATCH_SIZE]
+            try:
+                response = self._requests.call('delete_objects', lambda: self.s3.delete_objects(
+                    Bucket=self.bucket_name,
+                    Delete={'Objects': [{'Key': path} for path in batch], 'Quiet': False}
+                ))
+            except ClientError as e:
+                results.update((path, BatchResult(path, False, error=e)) for path in batch)
+                continue
+            for deleted in response.get('Deleted', []):
+                results[deleted['Key']] = BatchResult(deleted['Key'], True, True)
+                if self.metadata_cache is not None:
+                    self.metadata_cache.put_missing(deleted['Key'])
+            for error in response.get('Errors', []):
+                results[error['Key']] = BatchResult(
+                    error['Key'], False, False,
+                    ClientError({'Error': error}, 'DeleteObjects')
+                )
+        return {path: results.get(path, BatchResult(path, False, False)) for path in paths}
+            
+    def version(self, path: str) -> Optional[str]:
+        """Версия объекта: ETag из head_object (мимо кэша метаданных)."""
+        try:
+            head = self._requests.call(
+                'head_object', lambda: self.s3.head_object(Bucket=self.bucket_name, Key=path), path, hedge=True
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] == '404':
+                return None
+            raise
+        return head.get('ETag')
+            
+    def exists(self, path: str) -> bool:
+        """Проверяет существование файла в S3."""
+        return self._head(path) is not None
+            
+    def list_paths(self, prefix: str = '') -> Iterator[str]:
+        """Перечисляет ключи бакета с заданным префиксом (постранично, по 1000 ключей)."""
+        kwargs = {'Bucket': self.bucket_name, 'Prefix': prefix}
+        while True:
+            page = self._requests.call('list_objects', lambda: self.s3.list_objects_v2(**kwargs), prefix)
+            for obj in page.get('Contents', []):
+                yield obj['Key']
+            if not page.get('IsTruncated'):
+                return
+            kwargs['ContinuationToken'] = page['NextContinuationToken']
+            
+    def stat_many(self, paths: Iterable[str]) -> Dict[str, BatchResult]:
+        """Загружает метаданные нескольких объектов параллельными head_object (через кэш, если он есть)."""
+        return self._run_batch(self._head, paths)
+            
+    def open_reader(self, path: str) -> BinaryIO:
+        """Открывает объект S3 для потокового чтения."""
+        try:
+            return self._requests.call(
+                'open_reader', lambda: self.s3.get_object(Bucket=self.bucket_name, Key=path)['Body'], path
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('404', 'NoSuchKey'):
+                raise FileNotFoundError(path) from e
+            raise
+            
+    def load_range(self, path: str, start: int, end: int) -> bytes:
+        """Читает байты [start, end) объекта одним ranged GET."""
+        if end <= start:
+            return b''
+        try:
+            return self._requests.call('load_range', lambda: self._get_range(path, start, end), path, hedge=True)
+        except ClientError as e:
+            code = e.response['Error']['Code']
+            if code in ('404', 'NoSuchKey'):
+                raise FileNotFoundError(path) from e
+            if code == 'InvalidRange':
+                return b''
+            raise
+
+    def open_writer(self, path: str, media_file: Optional[MediaFile] = None) -> BinaryIO:
+        """
+        Открывает объект S3 для потоковой записи.
+        
+        :param media_file: если передан, его метаданные сохраняются вместе с объектом
+        """
+        extra_args = self._get_upload_args(media_file) if media_file is not None else None
+        return _S3Writer(self, path, extra_args)
+            
+    def _media_file_from_head(self, path: str, head: Dict[str, Any], size: int) -> MediaFile:
+        """Создает MediaFile по заголовкам ответа head_object/get_object."""
+        return self._create_media_file(
+            name=path.split('/')[-1],
+            size=size,
+            owner=head.get('Owner', {}).get('DisplayName', 'unknown'),
+            created_at=head['LastModified'],
+            content_type=head.get('ContentType', 'application/octet-stream'),
+            metadata=head.get('Metadata', {})
+        )
+        
+    def _head(self, path: str) -> Optional[MediaFile]:
+        """
+        Возвращает MediaFile без содержимого по head_object (или из кэша метаданных).
+        
+        :return: None, если объекта нет
+        :raises ClientError: при прочих ошибках S3
+        """
+        cache = self.metadata_cache
+        if cache is not None:
+            cached = cache.get(path)
+            if cached is MISSING:
+                return None
+            if cached is not None:
+                return cached
+                
+        try:
+            head = self._requests.call(
+                'head_object', lambda: self.s3.head_object(Bucket=self.bucket_name, Key=path), path, hedge=True
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] == '404':
+                if cache is not None:
+                    cache.put_missing(path)
+                return None
+            raise
+            
+        media_file = self._media_file_from_head(path, head, head['ContentLength'])
+        if cache is not None:
+            cache.put(path, media_file)
+        return media_file
+        
+    def _load_with_get(self, path: str) -> Optional[MediaFile]:
+        """
+        Загружает файл, начиная сразу с GET первой части вместо head_object.
+        
+        Остальные части запрашиваются с IfMatch по ETag первого ответа, чтобы
+        не склеить файл из разных версий объекта. Если объект перезаписали
+        во время загрузки (PreconditionFailed), она начинается заново.
+        """
+        for attempt in range(VERSION_RESTARTS + 1):
+            try:
+                response = self._requests.call('get_first_part', lambda: self._read_body(self.s3.get_object(
+                    Bucket=self.bucket_name, Key=path, Range=f'bytes=0-{self.part_size - 1}'
+                )), path, hedge=True)
+            except ClientError as e:
+                code = e.response['Error']['Code']
+                if code in ('404', 'NoSuchKey'):
+                    if self.metadata_cache is not None:
+                        self.metadata_cache.put_missing(path)
+                    return None
+                if code == 'InvalidRange':
+                    # Пустой объект: диапазон для него не определен
+                    return self.load(path)
+                raise
+                
+            # ContentRange: 'bytes 0-8388607/123456789'
+            content_range = response.get('ContentRange')
+            size = int(content_range.rsplit('/', 1)[1]) if content_range else response['ContentLength']
+            media_file = self._media_file_from_head(path, response, size)
+            
+            first_part = response['Body']
+            if size <= len(first_part):
+                media_file.content = BytesIO(first_part)
+            else:
+                buffer = BytesIO()
+                try:
+                    self._download_ranges(path, size, buffer, start=len(first_part), etag=response.get('ETag'))
+                except ClientError as e:
+                    if error_code(e) != 'PreconditionFailed' or attempt == VERSION_RESTARTS:
+                        raise
+                    logger.info("Object %s changed during download, restarting", path,
+                                extra={'storage': 's3', 'operation': 'load', 'bucket': self.bucket_name,
+                                       'path': path, 'error_code': error_code(e)})
+                    continue
+                view = buffer.getbuffer()
+                view[:len(first_part)] = first_part
+                view.release()
+                buffer.seek(0)
+                media_file.content = buffer
+                
+            if self.metadata_cache is not None:
+                self.metadata_cache.put(path, media_file)
+            return media_file
+        
+    def _get_pool(self) -> ThreadPoolExecutor:
+        """Возвращает общий для хранилища пул потоков для передачи частей."""
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(
+                        max_workers=self.max_concurrency, thread_name_prefix='s3-transfer'
+                    )
+        return self._pool
+        
+    def _get_batch_pool(self) -> ThreadPoolExecutor:
+        """
+        Возвращает пул потоков хранилища для пакетных вызовов (load_many, stat_many...).
+        
+        Это отдельный от _get_pool пул: задачи load_many сами ставят части
+        в пул передачи и ждут их, и в общем пуле они могли бы занять все потоки.
+        """
+        if self._batch_pool is None:
+            with self._pool_lock:
+                if self._batch_pool is None:
+                    self._batch_pool = ThreadPoolExecutor(
+                        max_workers=self.batch_concurrency, thread_name_prefix='s3-batch'
+                    )
+        return self._batch_pool
+        
+    def _upload_stream(self, stream: BinaryIO, path: str, extra_args: Dict[str, Any]) -> None:
+        """Загружает поток в S3 (multipart, если данных больше одной части)."""
+        with _S3Writer(self, path, extra_args) as writer:
+            while True:
+                chunk = stream.read(self.part_size)
+                if not chunk:
+                    break
+                writer.write(chunk)
+                
+    def _download_ranges(self, path: str, size: int, buffer: BytesIO, start: int = 0,
+                         etag: Optional[str] = None) -> None:
+        """
+        Скачивает байты [start, size) объекта параллельными ranged GET в заранее выделенный буфер.
+        
+        :param etag: если передан, части читаются только из этой версии объекта
+                     (иначе ClientError PreconditionFailed)
+        """
+        buffer.seek(size - 1)
+        buffer.write(b'\0')
+        view = buffer.getbuffer()
+        futures: List[Future] = []
+        try:
+            for part_start in range(start, size, self.part_size):
+                part_end = min(part_start + self.part_size, size)
+                futures.append(self._get_pool().submit(
+                    self._download_range, path, part_start, part_end, view, etag
+                ))
+            for future in futures:
+                future.result()
+        finally:
+            wait(futures)
+            view.release()
+            
+    def _download_range(self, path: str, start: int, end: int, view: memoryview,
+                        etag: Optional[str] = None) -> None:
+        """Скачивает байты [start, end) объекта в соответствующий срез буфера."""
+        if self._requests.hedge_policy is not None:
+            # Дубликат запроса может завершиться уже после возврата буфера,
+            # поэтому каждая попытка читает в свой bytes, а копируется только победитель
+            view[start:end] = self._requests.call(
+                'get_part', lambda: self._get_range(path, start, end, etag), path, hedge=True
+            )
+            return
+        self._requests.call('get_part', lambda: self._stream_range(path, start, end, view, etag), path)
+        
+    def _stream_range(self, path: str, start: int, end: int, view: memoryview,
+                      etag: Optional[str] = None) -> None:
+        """Пишет тело ranged GET прямо в срез буфера по мере получения."""
+        body = self.s3.get_object(
+            Bucket=self.bucket_name, Key=path, Range=f'bytes={start}-{end - 1}', **self._if_match(etag)
+        )['Body']
+        offset = start
+        for chunk in body.iter_chunks(CHUNK_SIZE):
+            view[offset:offset + len(chunk)] = chunk
+            offset += len(chunk)
+        if offset != end:
+            raise IncompleteReadError(actual_bytes=offset - start, expected_bytes=end - start)
+            
+    def _get_range(self, path: str, start: int, end: int, etag: Optional[str] = None) -> bytes:
+        """Читает байты [start, end) объекта одним ranged GET (без повторов)."""
+        return self.s3.get_object(
+            Bucket=self.bucket_name, Key=path, Range=f'bytes={start}-{end - 1}', **self._if_match(etag)
+        )['Body'].read()
+        
+    @staticmethod
+    def _if_match(etag: Optional[str]) -> Dict[str, str]:
+        """Условие запроса к конкретной версии объекта (пустое, если ETag неизвестен)."""
+        return {'IfMatch': etag} if etag else {}
+        
+    @staticmethod
+    def _read_body(response: Dict[str, Any]) -> Dict[str, Any]:
+        """Дочитывает тело ответа get_object, чтобы повтор или дубликат покрывал и передачу данных."""
+        response['Body'] = response['Body'].read()
+        return response
+            
+    def _log_error(self, operation: str, path: str, error: ClientError, message: str) -> None:
+        """Пишет ошибку S3 в лог со структурированными полями."""
+        logger.error(message, path, error, extra={
+            'storage': 's3', 'operation': operation, 'bucket': self.bucket_name,
+            'path': path, 'error_code': error_code(error),
+        })
+
+    def _get_upload_args(self, media_file: MediaFile) -> Dict[str, Any]:
+        """Генерирует дополнительные аргументы для загрузки."""
+        return {
+            'Metadata': self._get_metadata(media_file),
+            'ContentType': self._get_content_type(media_file),
+        }
+        
+    def generate_presigned_url(self, path: str, expires_in: int = 3600) -> Optional[str]:
+        """Генерирует временную ссылку для доступа к файлу."""
+        try:
+            url = self.s3.generate_presigned_url(
+                'get_object',
+                Params={'Bucket': self.bucket_name, 'Key': path},
+                ExpiresIn=expires_in
+            )
+            return url
+        except ClientError as e:
+            self._log_error('presign', path, e, 'Failed to generate presigned URL for %s: %s')
             return None
\ No newline at end of file
@@ -0,0 +1,418 @@
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Dict, Optional, BinaryIO, Iterator
+from homework_04.domain.base import MediaFile
+from homework_04.infra.storage.base import Storage, error_code
+from homework_04.infra.storage.local import LocalStorage, MappedContent
+
+logger = logging.getLogger(__name__)
+
+WRITE_THROUGH = 'write-through'
+WRITE_BACK = 'write-back'
+WRITE_AROUND = 'write-around'
+
+
+@dataclass
+class TierStats:
+    """Счетчики дискового кэша."""
+    hits: int = 0
+    misses: int = 0
+    coalesced: int = 0
+    evictions: int = 0
+    bytes_saved: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        """Доля чтений, обслуженных с диска без обращения к основному хранилищу."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class _TieredWriter:
+    """Пишет в дисковый кэш и после закрытия передает файл в основное хранилище."""
+
+    def __init__(self, storage: 'TieredStorage', path: str, writer: BinaryIO):
+        self.storage = storage
+        self.path = path
+        self._writer = writer
+
+    def write(self, data) -> int:
+        return self._writer.write(data)
+
+    def writable(self) -> bool:
+        return True
+
+    @property
+    def closed(self) -> bool:
+        return self._writer.closed
+
+    def discard(self) -> None:
+        """Отменяет запись."""
+        self._writer.discard()
+
+    def close(self) -> None:
+        if self._writer.closed:
+            return
+        self._writer.close()
+        self.storage._written(self.path, media_file=None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.discard()
+        else:
+            self.close()
+
+
+class TieredStorage(Storage):
+    """
+    Двухуровневое хранилище: LocalStorage как дисковый кэш перед основным хранилищем (например, S3).
+
+    Чтение — read-through: промах загружает файл из основного хранилища на диск,
+    одновременные промахи по одному ключу схлопываются в одну загрузку.
+    Объем кэша ограничен max_bytes, при переполнении вытесняются давно не
+    использованные файлы (LRU). Последний использованный файл не вытесняется
+    никогда, поэтому файл больше max_bytes остается в кэше до следующего.
+    Содержимое, возвращенное load(), держит файл кэша открытым и не
+    пропадает при его вытеснении.
+
+    Режимы записи:
+    - write-through: файл пишется в основное хранилище и в кэш синхронно;
+    - write-back: файл пишется в кэш, а в основное хранилище — в фоне
+      (flush() дожидается окончания всех фоновых загрузок). Файл, который не
+      удалось записать, остается в кэше и не вытесняется; flush() повторяет
+      запись и выбрасывает IOError, если она снова не удалась;
+    - write-around: файл пишется только в основное хранилище, кэш сбрасывается.
+    """
+
+    def __init__(self,
+                 backend: Storage,
+                 cache: LocalStorage,
+                 max_bytes: int,
+                 write_mode: str = WRITE_THROUGH,
+                 write_back_workers: int = 4):
+        """
+        :param backend: основное хранилище
+        :param cache: локальное хранилище, используемое как дисковый кэш
+        :param max_bytes: максимальный объем кэша в байтах
+        :param write_mode: write-through, write-back или write-around
+        :param write_back_workers: число потоков фоновой записи в режиме write-back
+        """
+        if write_mode not in (WRITE_THROUGH, WRITE_BACK, WRITE_AROUND):
+            raise ValueError(f"Unknown write mode: {write_mode}")
+
+        self.backend = backend
+        self.cache = cache
+        self.max_bytes = max_bytes
+        self.write_mode = write_mode
+        self.stats = TierStats()
+
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[str, int]' = OrderedDict()
+        self._cached_bytes = 0
+        self._fetches: Dict[str, Future] = {}
+        self._dirty: Dict[str, Future] = {}
+        # Неудавшиеся фоновые записи: путь -> аргумент media_file для повтора
+        self._failed: Dict[str, Optional[MediaFile]] = {}
+        # Файлы, которые сейчас читаются из кэша: их нельзя вытеснять
+        self._pins: Dict[str, int] = {}
+        self._write_back_pool = (
+            ThreadPoolExecutor(max_workers=write_back_workers, thread_name_prefix='write-back')
+            if write_mode == WRITE_BACK else None
+        )
+        self._scan_cache()
+
+    @property
+    def cached_bytes(self) -> int:
+        """Текущий объем кэша в байтах."""
+        return self._cached_bytes
+
+    def save(self, media_file: MediaFile, path: str) -> bool:
+        """Сохраняет файл согласно режиму записи."""
+        if self.write_mode == WRITE_AROUND:
+            self._forget(path)
+            return self.backend.save(media_file, path)
+
+        if self.write_mode == WRITE_THROUGH and not self.backend.save(media_file, path):
+            return False
+
+        if not self.cache.save(media_file, path):
+            return self.write_mode == WRITE_THROUGH
+        self._written(path, media_file)
+        return True
+
+    def load(self, path: str, load_content: bool = True) -> Optional[MediaFile]:
+        """Загружает файл: с диска при попадании, иначе через основное хранилище."""
+        if not load_content and not self._is_cached(path):
+            return self.backend.load(path, load_content=False)
+        if not self._ensure_cached(path):
+            return None
+        try:
+            media_file = self.cache.load(path, load_content=load_content)
+            if media_file is not None and isinstance(media_file.content, MappedContent):
+                # Открываем файл, пока он закреплен: вытеснение потом не отнимет содержимое
+                media_file.content.keep_open()
+            return media_file
+        finally:
+            self._unpin(path)
+
+    def delete(self, path: str) -> bool:
+        """Удаляет файл из кэша и основного хранилища."""
+        self._wait_dirty(path)
+        with self._lock:
+            if path in self._failed:
+                del self._failed[path]
+                del self._dirty[path]
+        self._forget(path)
+        return self.backend.delete(path)
+
+    def version(self, path: str) -> Optional[str]:
+        """Версия файла в основном хранилище."""
+        return self.backend.version(path)
+
+    def exists(self, path: str) -> bool:
+        """Проверяет существование файла (сначала в кэше)."""
+        return self._is_cached(path) or self.backend.exists(path)
+
+    def list_paths(self, prefix: str = '') -> Iterator[str]:
+        """Перечисляет файлы основного хранилища."""
+        return self.backend.list_paths(prefix)
+
+    def open_reader(self, path: str) -> BinaryIO:
+        """Открывает файл на чтение с диска, предварительно скачав его при промахе."""
+        if not self._ensure_cached(path):
+            raise FileNotFoundError(path)
+        try:
+            return self.cache.open_reader(path)
+        finally:
+            self._unpin(path)
+
+    def load_range(self, path: str, start: int, end: int) -> bytes:
+        """Читает диапазон байт с диска, предварительно скачав файл при промахе."""
+        if not self._ensure_cached(path):
+            raise FileNotFoundError(path)
+        try:
+            return self.cache.load_range(path, start, end)
+        finally:
+            self._unpin(path)
+
+    def open_writer(self, path: str) -> BinaryIO:
+        """Открывает файл на запись; в основное хранилище он попадает согласно режиму записи."""
+        if self.write_mode == WRITE_AROUND:
+            self._forget(path)
+            return self.backend.open_writer(path)
+        return _TieredWriter(self, path, self.cache.open_writer(path))
+
+    def flush(self) -> None:
+        """
+        Дожидается окончания всех фоновых записей в основное хранилище.
+
+        Неудавшиеся ранее записи запускаются повторно.
+
+        :raises IOError: если часть файлов так и не удалось записать
+            (они остаются в кэше до следующей попытки)
+        """
+        with self._lock:
+            retries = self._failed
+            self._failed = {}
+            for path, media_file in retries.items():
+                self._dirty[path] = self._write_back_pool.submit(self._write_back, path, media_file, None)
+            pending = {path: self._dirty[path] for path in retries}
+            waiting = list(self._dirty.values())
+        for path, future in pending.items():
+            future.add_done_callback(lambda done, path=path, media_file=retries[path]:
+                                     self._clean(path, media_file, done))
+        wait(waiting)
+
+        with self._lock:
+            failed = sorted(self._failed)
+        if failed:
+            raise IOError(f"Write-back failed for {len(failed)} file(s): {', '.join(failed[:10])}")
+
+    def close(self) -> None:
+        """
+        Сбрасывает отложенные записи и останавливает фоновые потоки.
+
+        :raises IOError: если часть файлов не удалось записать в основное хранилище
+        """
+        try:
+            self.flush()
+        finally:
+            if self._write_back_pool is not None:
+                self._write_back_pool.shutdown()
+
+    def _is_cached(self, path: str) -> bool:
+        with self._lock:
+            return path in self._entries
+
+    def _ensure_cached(self, path: str) -> bool:
+        """
+        Гарантирует наличие файла в кэше.
+
+        Только первый промах по ключу идет в основное хранилище, остальные
+        потоки ждут результата той же загрузки. Если файл есть, он
+        закрепляется в кэше, и после чтения нужно вызвать _unpin(path).
+        """
+        with self._lock:
+            self._pins[path] = self._pins.get(path, 0) + 1
+            size = self._entries.get(path)
+            if size is not None:
+                self._entries.move_to_end(path)
+                self.stats.hits += 1
+                self.stats.bytes_saved += size
+                return True
+
+            future = self._fetches.get(path)
+            if future is not None:
+                self.stats.coalesced += 1
+                leader = False
+            else:
+                self.stats.misses += 1
+                future = self._fetches[path] = Future()
+                leader = True
+
+        found = False
+        try:
+            if not leader:
+                found = future.result()
+                return found
+            try:
+                found = self._fetch(path)
+                future.set_result(found)
+                return found
+            except BaseException as e:
+                future.set_exception(e)
+                raise
+            finally:
+                with self._lock:
+                    self._fetches.pop(path, None)
+        finally:
+            if not found:
+                self._unpin(path)
+
+    def _unpin(self, path: str) -> None:
+        """Снимает закрепление, поставленное _ensure_cached, и вытесняет то, что ждало."""
+        with self._lock:
+            self._pins[path] -= 1
+            if not self._pins[path]:
+                del self._pins[path]
+        self._evict()
+
+    def _fetch(self, path: str) -> bool:
+        """Потоково копирует файл из основного хранилища в кэш."""
+        media_file = self.backend.load(path, load_content=False)
+        if media_file is None:
+            return False
+
+        with self.cache.open_writer(path, media_file) as writer:
+            for chunk in self.backend.iter_chunks(path, self.cache.chunk_size):
+                writer.write(chunk)
+        self._add_entry(path)
+        return True
+
+    def _written(self, path: str, media_file: Optional[MediaFile]) -> None:
+        """Учитывает записанный в кэш файл и, если нужно, отправляет его в основное хранилище."""
+        if self.write_mode == WRITE_BACK:
+            with self._lock:
+                previous = self._dirty.get(path)
+                future = self._write_back_pool.submit(self._write_back, path, media_file, previous)
+                self._dirty[path] = future
+                # Новая запись заменяет неудавшуюся
+                self._failed.pop(path, None)
+            future.add_done_callback(lambda done: self._clean(path, media_file, done))
+        elif media_file is None:
+            self._upload_from_cache(path)
+        self._add_entry(path)
+
+    def _write_back(self, path: str, media_file: Optional[MediaFile], previous: Optional[Future]) -> None:
+        """Фоновая запись в основное хранилище (по порядку для одного ключа)."""
+        if previous is not None:
+            wait([previous])
+        if media_file is not None:
+            # Метаданные берем из сайдкара кэша, а не из объекта вызывающего кода
+            if not self.backend.save(self.cache.load(path), path):
+                raise IOError(f"Write-back of {path} failed")
+        else:
+            self._upload_from_cache(path)
+
+    def _upload_from_cache(self, path: str) -> None:
+        """Копирует файл из кэша в основное хранилище потоком."""
+        with self.backend.open_writer(path) as writer:
+            for chunk in self.cache.iter_chunks(path):
+                writer.write(chunk)
+
+    def _clean(self, path: str, media_file: Optional[MediaFile], future: Future) -> None:
+        """
+        Завершает фоновую запись: после успеха файл можно вытеснять, после
+        ошибки он остается в _dirty и запоминается для повтора во flush().
+        """
+        error = future.exception()
+        with self._lock:
+            if self._dirty.get(path) is future:
+                if error is None:
+                    del self._dirty[path]
+                else:
+                    self._failed[path] = media_file
+        if error is not None:
+            logger.error("Write-back of %s failed: %s", path, error,
+                         extra={'storage': 'tiered', 'operation': 'write_back', 'path': path,
+                                'error_code': error_code(error)})
+        self._evict()
+
+    def _wait_dirty(self, path: str) -> None:
+        with self._lock:
+            future = self._dirty.get(path)
+        if future is not None:
+            wait([future])
+
+    def _add_entry(self, path: str) -> None:
+        full_path = self.cache.base_path / path
+        size = full_path.stat().st_size
+        with self._lock:
+            self._cached_bytes += size - self._entries.pop(path, 0)
+            self._entries[path] = size
+        self._evict()
+
+    def _forget(self, path: str) -> None:
+        """Удаляет файл из кэша."""
+        with self._lock:
+            size = self._entries.pop(path, None)
+            if size is None:
+                return
+            self._cached_bytes -= size
+            self.cache.delete(path)
+
+    def _evict(self) -> None:
+        """Вытесняет давно не использованные файлы, пока кэш не уложится в max_bytes."""
+        while True:
+            with self._lock:
+                if self._cached_bytes <= self.max_bytes:
+                    return
+                # Незаписанные в основное хранилище, читаемые сейчас и последний
+                # использованный (только что загруженный или записанный) файлы вытеснять нельзя
+                newest = next(reversed(self._entries), None)
+                victim = next((p for p in self._entries
+                               if p not in self._dirty and p not in self._pins and p != newest), None)
+                if victim is None:
+                    return
+                self._cached_bytes -= self._entries.pop(victim)
+                self.stats.evictions += 1
+                # Удаляем под блокировкой: иначе удаление может догнать повторную загрузку того же ключа
+                self.cache.delete(victim)
+
+    def _scan_cache(self) -> None:
+        """Восстанавливает индекс по файлам, оставшимся в директории кэша (старые — первыми)."""
+        files = [
+            p for p in self.cache.base_path.rglob('*')
+            if p.is_file() and not p.name.startswith('.')
+        ]
+        for full_path in sorted(files, key=lambda p: p.stat().st_atime):
+            path = full_path.relative_to(self.cache.base_path).as_posix()
+            self._entries[path] = full_path.stat().st_size
+            self._cached_bytes += self._entries[path]
+        self._evict()
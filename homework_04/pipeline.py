@@ -0,0 +1,275 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+from homework_04.domain.base import MediaFile
+from homework_04.infra.storage.base import Storage
+
+# Маркер конца потока в очередях между стадиями
+_DONE = object()
+
+
+def process_media(media_file: MediaFile) -> Any:
+    """Задача по умолчанию: MediaFile.process()."""
+    return media_file.process()
+
+
+@dataclass
+class PipelineResult:
+    """
+    Результат обработки одного файла.
+
+    :param path: путь исходного файла
+    :param value: то, что вернула задача обработки
+    :param error: исключение, если какая-то стадия упала
+    """
+    path: str
+    value: Any = None
+    error: Optional[Exception] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class StageStats:
+    """Статистика стадии конвейера."""
+    name: str
+    workers: int
+    items: int = 0
+    errors: int = 0
+    busy_seconds: float = 0.0
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    max_queue_depth: int = 0
+    _depth_sum: int = field(default=0, repr=False)
+
+    @property
+    def wall_seconds(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+    @property
+    def throughput(self) -> float:
+        """Файлов в секунду."""
+        return self.items / self.wall_seconds if self.wall_seconds else 0.0
+
+    @property
+    def utilization(self) -> float:
+        """Доля времени, которую воркеры стадии были заняты (близко к 1 — узкое место)."""
+        capacity = self.wall_seconds * self.workers
+        return self.busy_seconds / capacity if capacity else 0.0
+
+    @property
+    def avg_queue_depth(self) -> float:
+        """Средняя глубина входной очереди (растет перед узким местом)."""
+        return self._depth_sum / self.items if self.items else 0.0
+
+
+class _Stage:
+    """Стадия конвейера: пул потоков, читающих из входной очереди и пишущих в выходную."""
+
+    def __init__(self,
+                 name: str,
+                 func: Optional[Callable[[str, Any], Any]],
+                 workers: int,
+                 inbox: queue.Queue,
+                 outbox: queue.Queue,
+                 downstream_workers: int,
+                 stop: threading.Event):
+        self.func = func
+        self.inbox = inbox
+        self.outbox = outbox
+        self.downstream_workers = downstream_workers
+        self.stop = stop
+        self.stats = StageStats(name, workers)
+        self._alive = workers
+        self._lock = threading.Lock()
+        self._threads = [
+            threading.Thread(target=self._work, name=f'pipeline-{name}-{i}', daemon=True)
+            for i in range(workers)
+        ]
+
+    def start(self) -> None:
+        self.stats.started_at = time.perf_counter()
+        for thread in self._threads:
+            thread.start()
+
+    def _work(self) -> None:
+        try:
+            while not self.stop.is_set():
+                depth = self.inbox.qsize()
+                try:
+                    # Ждем с таймаутом, чтобы поток завершился после остановки конвейера
+                    item = self.inbox.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if item is _DONE:
+                    break
+                seq, path, value, error = item
+                failed = False
+                if error is None:
+                    started = time.perf_counter()
+                    try:
+                        value = self.func(path, value)
+                    except Exception as e:
+                        error = e
+                        failed = True
+                    elapsed = time.perf_counter() - started
+                else:
+                    # Ошибка предыдущей стадии передается дальше, но не считается ошибкой этой
+                    elapsed = 0.0
+                with self._lock:
+                    self.stats.items += 1
+                    self.stats.errors += failed
+                    self.stats.busy_seconds += elapsed
+                    self.stats.max_queue_depth = max(self.stats.max_queue_depth, depth)
+                    self.stats._depth_sum += depth
+                _put(self.outbox, (seq, path, value, error), self.stop)
+        finally:
+            with self._lock:
+                self._alive -= 1
+                last = self._alive == 0
+            if last:
+                self.stats.finished_at = time.perf_counter()
+                for _ in range(self.downstream_workers):
+                    _put(self.outbox, _DONE, self.stop)
+
+
+def _put(q: queue.Queue, item: Any, stop: threading.Event) -> None:
+    """Кладет элемент в ограниченную очередь, пока конвейер не остановлен."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return
+        except queue.Full:
+            continue
+
+
+class MediaPipeline:
+    """
+    Конвейер обработки медиа-файлов: загрузка -> обработка -> сохранение.
+
+    - load: файлы читаются из source-хранилища в пуле потоков (I/O);
+    - process: CPU-задача выполняется в пуле процессов (обходит GIL);
+    - save: результаты, являющиеся MediaFile, пишутся в sink-хранилище.
+
+    Стадии связаны ограниченными очередями, поэтому быстрая стадия не
+    убегает вперед медленной (backpressure), а в памяти одновременно
+    находится не больше queue_size файлов на стадию. По stats видно,
+    какая стадия узкое место: у нее utilization близко к 1, а очередь
+    перед ней заполнена.
+    """
+
+    def __init__(self,
+                 source: Storage,
+                 task: Callable[[MediaFile], Any] = process_media,
+                 sink: Optional[Storage] = None,
+                 result_path: Callable[[str], str] = lambda path: path,
+                 load_workers: int = 8,
+                 process_workers: Optional[int] = None,
+                 save_workers: int = 8,
+                 queue_size: int = 32,
+                 ordered: bool = False):
+        """
+        :param source: хранилище исходных файлов
+        :param task: функция обработки MediaFile (должна быть picklable: функция уровня модуля)
+        :param sink: хранилище для результатов (если None — результаты не сохраняются)
+        :param result_path: путь результата по пути исходного файла
+        :param load_workers: потоков загрузки
+        :param process_workers: процессов обработки (по умолчанию — число CPU)
+        :param save_workers: потоков сохранения
+        :param queue_size: размер каждой очереди между стадиями
+        :param ordered: отдавать результаты в порядке входных путей
+        """
+        self.source = source
+        self.task = task
+        self.sink = sink
+        self.result_path = result_path
+        self.load_workers = load_workers
+        self.process_workers = process_workers or os.cpu_count() or 1
+        self.save_workers = save_workers
+        self.queue_size = queue_size
+        self.ordered = ordered
+        self.stats: Dict[str, StageStats] = {}
+
+    def run(self, paths: Iterable[str]) -> Iterator[PipelineResult]:
+        """Обрабатывает файлы, отдавая результаты по мере готовности."""
+        stop = threading.Event()
+        load_q, process_q, save_q, out_q = (queue.Queue(self.queue_size) for _ in range(4))
+
+        with ProcessPoolExecutor(max_workers=self.process_workers) as pool:
+            def load(path: str, _: Any) -> MediaFile:
+                media_file = self.source.load(path)
+                if media_file is None:
+                    raise FileNotFoundError(path)
+                return media_file
+
+            def process(path: str, media_file: MediaFile) -> Any:
+                return pool.submit(self.task, media_file).result()
+
+            def save(path: str, result: Any) -> Any:
+                if self.sink is not None and isinstance(result, MediaFile):
+                    if not self.sink.save(result, self.result_path(path)):
+                        raise IOError(f"Failed to save result for {path}")
+                return result
+
+            stages = [
+                _Stage('load', load, self.load_workers, load_q, process_q, self.process_workers, stop),
+                _Stage('process', process, self.process_workers, process_q, save_q, self.save_workers, stop),
+                _Stage('save', save, self.save_workers, save_q, out_q, 1, stop),
+            ]
+            self.stats = {stage.stats.name: stage.stats for stage in stages}
+
+            def feed() -> None:
+                for seq, path in enumerate(paths):
+                    if stop.is_set():
+                        return
+                    _put(load_q, (seq, path, None, None), stop)
+                for _ in range(self.load_workers):
+                    _put(load_q, _DONE, stop)
+
+            for stage in stages:
+                stage.start()
+            threading.Thread(target=feed, name='pipeline-feed', daemon=True).start()
+
+            try:
+                yield from self._collect(out_q)
+            finally:
+                stop.set()
+
+    def _collect(self, out_q: queue.Queue) -> Iterator[PipelineResult]:
+        """Читает результаты; в режиме ordered восстанавливает порядок входных путей."""
+        pending: Dict[int, PipelineResult] = {}
+        next_seq = 0
+        while True:
+            item = out_q.get()
+            if item is _DONE:
+                break
+            seq, path, value, error = item
+            result = PipelineResult(path, value, error)
+            if not self.ordered:
+                yield result
+                continue
+            pending[seq] = result
+            while next_seq in pending:
+                yield pending.pop(next_seq)
+                next_seq += 1
+        yield from (pending[seq] for seq in sorted(pending))
+
+    def report(self) -> str:
+        """Текстовый отчет по стадиям последнего запуска."""
+        lines = [f"{'stage':<8} {'workers':>7} {'items':>7} {'errors':>6} {'items/s':>9} "
+                 f"{'util':>6} {'avg q':>6} {'max q':>6}"]
+        for stats in self.stats.values():
+            lines.append(
+                f"{stats.name:<8} {stats.workers:>7} {stats.items:>7} {stats.errors:>6} "
+                f"{stats.throughput:>9.1f} {stats.utilization:>6.0%} "
+                f"{stats.avg_queue_depth:>6.1f} {stats.max_queue_depth:>6}"
+            )
+        return '\n'.join(lines)
@@ -0,0 +1,125 @@
+"""
+Повторы, бюджет повторов и hedged-запросы S3Storage на локальной замене S3.
+
+Запуск из корня проекта:
+    python -m pytest homework_04/tests
+"""
+import time
+import pytest
+from botocore.exceptions import ClientError
+from homework_04.domain.photofile import PhotoFile
+from homework_04.infra.storage.resilience import HedgePolicy, ResilientExecutor, RetryBudget, RetryPolicy
+from homework_04.infra.storage.s3 import is_retryable
+from homework_04.benchmarks.s3_standin import FaultInjector, s3_standin
+
+PATH = 'photos/a.jpg'
+DATA = b'x' * 1024
+FAST_RETRIES = RetryPolicy(max_attempts=3, base_delay=0.001, max_delay=0.001)
+
+
+def unlimited_budget() -> RetryBudget:
+    return RetryBudget(ratio=10.0, min_per_second=1e9, capacity=1e9)
+
+
+def empty_budget() -> RetryBudget:
+    return RetryBudget(ratio=0.0, min_per_second=0.0, capacity=0.0)
+
+
+def save_photo(storage) -> None:
+    assert storage.save(PhotoFile('a.jpg', len(DATA), 'test', resolution='1x1', content=DATA), PATH)
+
+
+def throttle_gets(storage) -> FaultInjector:
+    faults = FaultInjector(throttle_rate=1.0, operations={'GetObject'})
+    faults.install(storage.s3)
+    return faults
+
+
+def test_executor_gives_up_after_max_attempts():
+    with s3_standin(rtt=0.001) as storage:
+        save_photo(storage)
+        faults = throttle_gets(storage)
+        executor = ResilientExecutor(is_retryable, retry_policy=FAST_RETRIES, retry_budget=unlimited_budget())
+
+        with pytest.raises(ClientError) as error:
+            executor.call('get_object', lambda: storage.s3.get_object(Bucket=storage.bucket_name, Key=PATH), PATH)
+
+        assert error.value.response['Error']['Code'] == 'SlowDown'
+        assert faults.counts['throttled'] == FAST_RETRIES.max_attempts
+        assert executor.stats.retries == FAST_RETRIES.max_attempts - 1
+        assert executor.stats.budget_exhausted == 0
+
+
+def test_executor_does_not_retry_without_budget():
+    with s3_standin(rtt=0.001) as storage:
+        save_photo(storage)
+        faults = throttle_gets(storage)
+        executor = ResilientExecutor(is_retryable, retry_policy=FAST_RETRIES, retry_budget=empty_budget())
+
+        with pytest.raises(ClientError):
+            executor.call('get_object', lambda: storage.s3.get_object(Bucket=storage.bucket_name, Key=PATH), PATH)
+
+        assert faults.counts['throttled'] == 1
+        assert executor.stats.retries == 0
+        assert executor.stats.budget_exhausted == 1
+
+
+def test_storage_exhausts_retries():
+    with s3_standin(rtt=0.001, retry_policy=FAST_RETRIES, retry_budget=unlimited_budget()) as storage:
+        save_photo(storage)
+        faults = throttle_gets(storage)
+
+        assert storage.get_content(PATH, size=len(DATA)) is None
+        assert faults.counts['throttled'] == FAST_RETRIES.max_attempts
+        assert storage.request_stats.retries == FAST_RETRIES.max_attempts - 1
+
+
+def test_storage_budget_refuses_retries():
+    with s3_standin(rtt=0.001, retry_policy=FAST_RETRIES, retry_budget=empty_budget()) as storage:
+        save_photo(storage)
+        faults = throttle_gets(storage)
+
+        assert storage.get_content(PATH, size=len(DATA)) is None
+        assert faults.counts['throttled'] == 1
+        assert storage.request_stats.retries == 0
+        assert storage.request_stats.budget_exhausted == 1
+
+
+def test_storage_recovers_from_single_error():
+    with s3_standin(rtt=0.001, retry_policy=FAST_RETRIES, retry_budget=unlimited_budget()) as storage:
+        save_photo(storage)
+        faults = FaultInjector(error_rate=1.0, operations={'GetObject'})
+        faults.install(storage.s3)
+        # Отказывает только первый запрос
+        storage.s3.meta.events.register('after-call.s3.GetObject', lambda **kwargs: setattr(faults, 'error_rate', 0.0))
+
+        assert storage.get_content(PATH, size=len(DATA)).getvalue() == DATA
+        assert faults.counts['errors'] == 1
+        assert storage.request_stats.retries == 1
+
+
+def test_hedge_wins_and_loser_is_cancelled():
+    straggler_delay = 5.0
+    hedging = HedgePolicy(warmup=1, min_delay=0.01, max_delay=0.05)
+    with s3_standin(rtt=0.001, hedge_policy=hedging) as storage:
+        save_photo(storage)
+        # Первый замер задержки: без него запросы не дублируются
+        assert storage.get_content(PATH, size=len(DATA)).getvalue() == DATA
+        faults = FaultInjector(straggler_rate=1.0, straggler_delay=straggler_delay, max_stragglers=1,
+                               operations={'GetObject'})
+        faults.install(storage.s3)
+
+        started = time.perf_counter()
+        content = storage.get_content(PATH, size=len(DATA))
+        elapsed = time.perf_counter() - started
+
+        assert content.getvalue() == DATA
+        assert elapsed < straggler_delay / 2
+        stats = storage.request_stats
+        assert (stats.hedges, stats.hedge_wins, stats.hedges_cancelled) == (1, 1, 1)
+        # Отстающий запрос прерывается по сигналу отмены, а не ждет straggler_delay
+        deadline = time.monotonic() + straggler_delay / 2
+        while faults.counts['cancelled'] < 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert faults.counts['stragglers'] == 1
+        assert faults.counts['cancelled'] == 1
@@ -2,12 +2,14 @@
 Домашнее задание: Пишем классы и плодим наследников
 """
 
-from . import base, car, engine, exceptions, plane
+from . import base, car, engine, exceptions, fleet, plane, simulation
 
 __all__ = [
     "base",
     "car",
     "engine",
     "exceptions",
+    "fleet",
     "plane",
+    "simulation",
 ]
@@ -0,0 +1,69 @@
+"""
+Бенчмарк дискретно-событийной симуляции: событий в секунду в зависимости от размера парка.
+
+Каждое транспортное средство совершает несколько рейсов в сутки (заправка,
+погрузка у самолетов, запуск, несколько перегонов, выгрузка). Симуляция
+выполняется в одном процессе (run) и в пуле процессов (run_parallel);
+журналы и итоговое состояние сверяются.
+
+Запуск из корня проекта:
+    python -m homework_05.benchmarks.simulation --sizes 1000 10000 100000 --workers 4
+"""
+import argparse
+import os
+import random
+import time
+
+from homework_05.car import Car
+from homework_05.plane import Plane
+from homework_05.simulation import Simulator
+
+
+def build(size: int, trips: int, seed: int = 0) -> Simulator:
+    """Парк из автомобилей и самолетов (каждый десятый) с расписанием рейсов на сутки"""
+    rng = random.Random(seed)
+    vehicles = [Plane(fuel=rng.uniform(500, 5000)) if i % 10 == 0 else Car(fuel=rng.uniform(5, 50))
+                for i in range(size)]
+    simulator = Simulator(vehicles)
+    for i, vehicle in enumerate(vehicles):
+        plane = isinstance(vehicle, Plane)
+        for trip in range(trips):
+            legs = [rng.uniform(50, 800) if plane else rng.uniform(5, 120) for _ in range(rng.randint(1, 4))]
+            simulator.schedule_trip(
+                i, depart=trip * 24 / trips + rng.uniform(0, 2), legs=legs,
+                speed=800 if plane else 60,
+                cargo=rng.uniform(1000, 25000) if plane else 0.0,
+                refuel=rng.uniform(0, 3000) if plane else rng.uniform(0, 30),
+            )
+    return simulator
+
+
+def measure(simulator: Simulator, workers: int) -> tuple:
+    started = time.perf_counter()
+    log = simulator.run() if workers == 1 else simulator.run_parallel(workers)
+    return time.perf_counter() - started, log
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--trips', type=int, default=4, help='рейсов на транспортное средство')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    print(f"{'vehicles':>9} {'events':>9} {'1 process ev/s':>15} "
+          f"{f'{args.workers} processes ev/s':>18} {'speedup':>8}")
+    for size in args.sizes:
+        serial = build(size, args.trips)
+        serial_time, serial_log = measure(serial, 1)
+        parallel = build(size, args.trips)
+        parallel_time, parallel_log = measure(parallel, args.workers)
+        assert serial_log == parallel_log, "parallel run diverged from serial run"
+        assert all(serial.vehicles[i].__dict__ == parallel.vehicles[i].__dict__ for i in serial.vehicles)
+        events = len(serial_log)
+        print(f"{size:>9} {events:>9} {events / serial_time:>15,.0f} {events / parallel_time:>18,.0f} "
+              f"{serial_time / parallel_time:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+from typing import Iterable, List, Optional
+
+import numpy as np
+
+from homework_05.base import Vehicle
+from homework_05.car import Car
+from homework_05.engine import Engine
+from homework_05.plane import Plane
+
+# Классы транспортных средств по коду вида (массив Fleet.kind)
+KINDS = (Vehicle, Car, Plane)
+VEHICLE, CAR, PLANE = range(len(KINDS))
+
+
+class Fleet:
+    """
+    Парк транспортных средств в виде структуры массивов (struct-of-arrays)
+
+    Каждый атрибут Vehicle/Car/Plane хранится в отдельном массиве NumPy,
+    поэтому start, move и load_cargo выполняются одной векторной операцией
+    над всем парком. Вместо исключений методы возвращают маску
+    транспортных средств, для которых одиночный метод выкинул бы
+    исключение; их состояние при этом не меняется.
+
+    Числовые атрибуты хранятся как float64, количество поршней — как int64.
+    """
+
+    def __init__(self, weight, fuel, fuel_consumption, started=False, kind=VEHICLE,
+                 cargo=0.0, max_cargo=0.0, engine_volume=0.0, engine_pistons=0, has_engine=False):
+        """
+        Создание парка из массивов атрибутов (скаляры растягиваются на весь парк)
+
+        :param weight: массы (кг)
+        :param fuel: количество топлива (л)
+        :param fuel_consumption: расход топлива (л/100 км)
+        :param started: запущен ли двигатель
+        :param kind: коды видов из KINDS (VEHICLE, CAR, PLANE)
+        :param cargo: масса груза (кг), только для самолетов
+        :param max_cargo: грузоподъемность (кг), только для самолетов
+        :param engine_volume: объем двигателя (л), только для автомобилей
+        :param engine_pistons: количество поршней, только для автомобилей
+        :param has_engine: установлен ли двигатель у автомобиля
+        """
+        arrays = np.broadcast_arrays(
+            np.asarray(weight, dtype=np.float64), np.asarray(fuel, dtype=np.float64),
+            np.asarray(fuel_consumption, dtype=np.float64), np.asarray(started, dtype=bool),
+            np.asarray(kind, dtype=np.int8), np.asarray(cargo, dtype=np.float64),
+            np.asarray(max_cargo, dtype=np.float64), np.asarray(engine_volume, dtype=np.float64),
+            np.asarray(engine_pistons, dtype=np.int64), np.asarray(has_engine, dtype=bool),
+        )
+        # Копии: broadcast_arrays возвращает представления только для чтения
+        (self.weight, self.fuel, self.fuel_consumption, self.started, self.kind, self.cargo,
+         self.max_cargo, self.engine_volume, self.engine_pistons, self.has_engine) = (
+            np.array(array, ndmin=1) for array in arrays
+        )
+        if self.weight.ndim != 1:
+            raise ValueError("Fleet attributes must be one-dimensional")
+
+    @classmethod
+    def from_vehicles(cls, vehicles: Iterable[Vehicle]) -> 'Fleet':
+        """
+        Создание парка из объектов Vehicle, Car и Plane
+
+        :raises TypeError: для других классов (их атрибуты не сохранились бы)
+        """
+        vehicles = list(vehicles)
+        kinds = []
+        for vehicle in vehicles:
+            if type(vehicle) not in KINDS:
+                raise TypeError(f"Unsupported vehicle type: {type(vehicle).__name__}")
+            kinds.append(KINDS.index(type(vehicle)))
+        engines = [getattr(vehicle, 'engine', None) for vehicle in vehicles]
+        return cls(
+            weight=[vehicle.weight for vehicle in vehicles],
+            fuel=[vehicle.fuel for vehicle in vehicles],
+            fuel_consumption=[vehicle.fuel_consumption for vehicle in vehicles],
+            started=[vehicle.started for vehicle in vehicles],
+            kind=np.array(kinds, dtype=np.int8),
+            cargo=[getattr(vehicle, 'cargo', 0.0) for vehicle in vehicles],
+            max_cargo=[getattr(vehicle, 'max_cargo', 0.0) for vehicle in vehicles],
+            engine_volume=[engine.volume if engine is not None else 0.0 for engine in engines],
+            engine_pistons=np.array([engine.pistons if engine is not None else 0 for engine in engines],
+                                    dtype=np.int64),
+            has_engine=[engine is not None for engine in engines],
+        )
+
+    def to_vehicles(self) -> List[Vehicle]:
+        """Создание объектов Vehicle, Car и Plane с текущим состоянием парка"""
+        return [self[i] for i in range(len(self))]
+
+    def __len__(self) -> int:
+        return len(self.weight)
+
+    def __getitem__(self, i: int) -> Vehicle:
+        """Создание объекта для i-го транспортного средства"""
+        kind = KINDS[self.kind[i]]
+        if kind is Plane:
+            vehicle = Plane(self.weight[i].item(), self.fuel[i].item(),
+                            self.fuel_consumption[i].item(), self.max_cargo[i].item())
+            vehicle.cargo = self.cargo[i].item()
+        else:
+            vehicle = kind(self.weight[i].item(), self.fuel[i].item(), self.fuel_consumption[i].item())
+        if kind is Car and self.has_engine[i]:
+            vehicle.set_engine(Engine(self.engine_volume[i].item(), self.engine_pistons[i].item()))
+        vehicle.started = bool(self.started[i])
+        return vehicle
+
+    @property
+    def is_plane(self) -> np.ndarray:
+        return self.kind == PLANE
+
+    def start(self, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Запуск двигателей (всех или отмеченных в mask)
+
+        :return: маска незапущенных из-за нехватки топлива (LowFuelError у Vehicle.start)
+        """
+        selected = ~self.started if mask is None else mask & ~self.started
+        failed = selected & ~(self.fuel > 0)
+        self.started |= selected & ~failed
+        return failed
+
+    def move(self, distances) -> np.ndarray:
+        """
+        Перемещение транспортных средств на указанные дистанции
+
+        :param distances: дистанции в км (скаляр или массив длины парка)
+        :return: маска не сдвинувшихся из-за нехватки топлива (NotEnoughFuel у Vehicle.move)
+        """
+        required_fuel = (np.asarray(distances, dtype=np.float64) * self.fuel_consumption) / 100
+        moved = self.fuel >= required_fuel
+        np.subtract(self.fuel, required_fuel, out=self.fuel, where=moved)
+        return ~moved
+
+    def load_cargo(self, amounts) -> np.ndarray:
+        """
+        Загрузка груза в самолеты
+
+        :param amounts: масса груза (кг), скаляр или массив длины парка
+        :return: маска незагруженных: перегруз (CargoOverload у Plane.load_cargo) или не самолет
+        """
+        amounts = np.broadcast_to(np.asarray(amounts, dtype=np.float64), self.cargo.shape)
+        loaded = self.is_plane & ~(self.cargo + amounts > self.max_cargo)
+        np.add(self.cargo, amounts, out=self.cargo, where=loaded)
+        return ~loaded
+
+    def remove_all_cargo(self) -> np.ndarray:
+        """
+        Выгрузка всего груза из самолетов
+
+        :return: массы выгруженного груза (кг)
+        """
+        removed_cargo = self.cargo.copy()
+        self.cargo[:] = 0
+        return removed_cargo
\ No newline at end of file
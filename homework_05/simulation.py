@@ -0,0 +1,317 @@
+import heapq
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from homework_05.base import Vehicle
+from homework_05.exceptions import CargoOverload, LowFuelError, NotEnoughFuel
+from homework_05.plane import Plane
+
+# Виды событий
+START = 'start'
+MOVE = 'move'
+REFUEL = 'refuel'
+LOAD = 'load'
+UNLOAD = 'unload'
+EVENT_KINDS = (START, MOVE, REFUEL, LOAD, UNLOAD)
+# Отправление в рейс: одна запись в куче вместо заправки, погрузки, запуска и первого перегона
+_DEPART = 'depart'
+
+# Ошибки событий; в журнале хранится номер в этом кортеже
+ERRORS = (None, LowFuelError, NotEnoughFuel, CargoOverload)
+_ERROR_CODES = {error: code for code, error in enumerate(ERRORS)}
+_EVENT_CODES = {kind: code for code, kind in enumerate(EVENT_KINDS)}
+
+# Рейс: (длины перегонов в км, скорость в км/ч, груз в кг, литры заправки при отправлении).
+# Обычный кортеж, а не класс: очередь передается в процессы пула и обратно
+_Trip = Tuple[Tuple[float, ...], float, float, float]
+
+
+class TripRecord(NamedTuple):
+    """Запись журнала: событие и состояние транспортного средства после него"""
+    time: float
+    vehicle: int
+    seq: int
+    event: str
+    value: float
+    ok: bool
+    error: Optional[str]
+    fuel: float
+    cargo: float
+
+
+class TripLog:
+    """
+    Журнал событий симуляции по колонкам
+
+    Каждое поле хранится в отдельном массиве (array), вид события и
+    ошибка — кодами, а TripRecord создается только при обращении к записи.
+    Так журнал из миллионов событий дешево дописывать, а части журнала
+    передаются между процессами как сырые буферы.
+    """
+
+    _COLUMNS = (('time', 'd'), ('vehicle', 'q'), ('seq', 'q'), ('event', 'b'),
+                ('value', 'd'), ('error', 'b'), ('fuel', 'd'), ('cargo', 'd'))
+
+    def __init__(self):
+        for name, typecode in self._COLUMNS:
+            setattr(self, name, array(typecode))
+
+    def append(self, time: float, vehicle: int, seq: int, event: int, value: float,
+               error: int, fuel: float, cargo: float) -> None:
+        """
+        Добавление записи
+
+        :param event: код вида события (индекс в EVENT_KINDS)
+        :param error: код ошибки (индекс в ERRORS, 0 — без ошибки)
+        """
+        self.time.append(time)
+        self.vehicle.append(vehicle)
+        self.seq.append(seq)
+        self.event.append(event)
+        self.value.append(value)
+        self.error.append(error)
+        self.fuel.append(fuel)
+        self.cargo.append(cargo)
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+    def __getitem__(self, i: Union[int, slice]) -> Union[TripRecord, 'TripLog']:
+        """Запись с номером i или журнал из записей среза"""
+        if isinstance(i, slice):
+            log = TripLog()
+            for name, _ in self._COLUMNS:
+                setattr(log, name, getattr(self, name)[i])
+            return log
+        error = ERRORS[self.error[i]]
+        return TripRecord(self.time[i], self.vehicle[i], self.seq[i], EVENT_KINDS[self.event[i]],
+                          self.value[i], error is None, error and error.__name__,
+                          self.fuel[i], self.cargo[i])
+
+    def __iter__(self) -> Iterator[TripRecord]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, TripLog):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name, _ in self._COLUMNS)
+
+    def extend(self, other: 'TripLog') -> None:
+        for name, _ in self._COLUMNS:
+            getattr(self, name).extend(getattr(other, name))
+
+    @classmethod
+    def merge(cls, logs: Sequence['TripLog']) -> 'TripLog':
+        """Слияние журналов в порядок (время, транспортное средство, номер события)"""
+        columns = {name: np.concatenate([np.frombuffer(getattr(log, name), dtype=typecode) for log in logs])
+                   for name, typecode in cls._COLUMNS}
+        order = np.lexsort((columns['seq'], columns['vehicle'], columns['time']))
+        merged = cls()
+        for name, _ in cls._COLUMNS:
+            getattr(merged, name).frombytes(columns[name][order].tobytes())
+        return merged
+
+
+class Simulator:
+    """
+    Дискретно-событийная симуляция парка транспортных средств
+
+    События хранятся в куче и обрабатываются по времени, а при равном
+    времени — по номеру транспортного средства и порядку планирования для
+    него. Поэтому порядок журнала не зависит от того, как парк разбит на
+    части: транспортные средства независимы, и run_parallel обрабатывает
+    их группы в отдельных процессах, а затем сливает журналы в тот же
+    порядок, что дал бы run.
+
+    Ошибка события (LowFuelError, NotEnoughFuel, CargoOverload) не
+    прерывает симуляцию: она попадает в журнал, а рейс, в котором она
+    случилась, отменяется.
+    """
+
+    def __init__(self, vehicles: Union[Sequence[Vehicle], Dict[int, Vehicle]]):
+        """
+        :param vehicles: транспортные средства (номер в списке — идентификатор в событиях)
+        """
+        self.vehicles: Dict[int, Vehicle] = dict(vehicles) if isinstance(vehicles, dict) \
+            else dict(enumerate(vehicles))
+        self.now = 0.0
+        self.log = TripLog()
+        # (время, транспортное средство, порядковый номер, вид, значение, рейс, номер перегона)
+        self._queue: List[tuple] = []
+        self._seq: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        """Количество запланированных событий"""
+        return len(self._queue)
+
+    def schedule(self, time: float, vehicle: int, kind: str, value: float = 0.0) -> None:
+        """
+        Планирование события
+
+        :param time: время события в часах
+        :param vehicle: идентификатор транспортного средства
+        :param kind: вид события (START, MOVE, REFUEL, LOAD, UNLOAD)
+        :param value: дистанция (MOVE), литры топлива (REFUEL) или масса груза (LOAD)
+        :raises ValueError: если время в прошлом или вид события неизвестен
+        :raises TypeError: если груз планируется не для самолета
+        """
+        self._check(time, vehicle, kind)
+        self._push(time, vehicle, kind, value)
+
+    def schedule_trip(self, vehicle: int, depart: float, legs: Iterable[float], speed: float,
+                      cargo: float = 0.0, refuel: float = 0.0) -> None:
+        """
+        Планирование рейса: заправка, погрузка и запуск в момент отправления,
+        затем перегоны друг за другом и выгрузка по прибытии (если был груз)
+
+        Если погрузка, запуск или перегон завершились ошибкой, оставшиеся
+        события рейса отменяются. В очереди рейс занимает одну запись до
+        отправления и одну на каждый следующий перегон, поэтому куча не
+        растет от числа событий внутри рейса.
+
+        :param depart: время отправления в часах
+        :param legs: длины перегонов в км
+        :param speed: скорость в км/ч
+        :param cargo: масса груза для погрузки (только самолеты)
+        :param refuel: сколько литров залить перед отправлением
+        """
+        self._check(depart, vehicle, LOAD if cargo else START)
+        legs = tuple(legs)
+        self._push(depart, vehicle, _DEPART, 0.0, (legs, speed, cargo, refuel))
+        # Номера событий при отправлении резервируются сразу, как при отдельном планировании
+        self._seq[vehicle] += bool(refuel) + bool(cargo) + bool(legs)
+
+    def run(self, until: Optional[float] = None) -> TripLog:
+        """
+        Обработка событий по порядку
+
+        :param until: обработать только события не позже этого времени
+        :return: записи журнала, добавленные этим запуском
+        """
+        start = len(self.log)
+        queue = self._queue
+        while queue and (until is None or queue[0][0] <= until):
+            self._process(*heapq.heappop(queue))
+        if until is not None:
+            self.now = max(self.now, until)
+        return self.log[start:]
+
+    def run_parallel(self, workers: int, until: Optional[float] = None) -> TripLog:
+        """
+        То же, что run, но группы транспортных средств обрабатываются в отдельных процессах
+
+        Результат (журнал, состояние транспортных средств, оставшиеся
+        события) совпадает с результатом run.
+
+        :param workers: количество процессов
+        """
+        shards = self.shard(workers)
+        with ProcessPoolExecutor(max_workers=len(shards)) as pool:
+            shards = list(pool.map(_run_shard, shards, [until] * len(shards)))
+
+        records = TripLog.merge([shard.log for shard in shards])
+        self.log.extend(records)
+        self._queue = [event for shard in shards for event in shard._queue]
+        heapq.heapify(self._queue)
+        for shard in shards:
+            self.vehicles.update(shard.vehicles)
+            self._seq.update(shard._seq)
+        if until is not None:
+            self.now = max(self.now, until)
+        return records
+
+    def shard(self, count: int) -> List['Simulator']:
+        """Разбиение на независимые симуляции по транспортным средствам (по кругу)"""
+        count = max(1, min(count, len(self.vehicles)))
+        shards = [Simulator({}) for _ in range(count)]
+        for shard in shards:
+            shard.now = self.now
+        for vehicle_id, vehicle in self.vehicles.items():
+            shard = shards[vehicle_id % count]
+            shard.vehicles[vehicle_id] = vehicle
+            if vehicle_id in self._seq:
+                shard._seq[vehicle_id] = self._seq[vehicle_id]
+        for event in self._queue:
+            shards[event[1] % count]._queue.append(event)
+        for shard in shards:
+            heapq.heapify(shard._queue)
+        return shards
+
+    def _check(self, time: float, vehicle: int, kind: str) -> None:
+        if kind not in EVENT_KINDS:
+            raise ValueError(f"Unknown event kind: {kind}")
+        if time < self.now:
+            raise ValueError(f"Event time {time} is before current time {self.now}")
+        if kind in (LOAD, UNLOAD) and not isinstance(self.vehicles[vehicle], Plane):
+            raise TypeError(f"Vehicle {vehicle} has no cargo hold")
+
+    def _push(self, time: float, vehicle: int, kind: str, value: float,
+              trip: Optional[_Trip] = None, leg: int = 0) -> None:
+        seq = self._seq.get(vehicle, 0)
+        self._seq[vehicle] = seq + 1
+        heapq.heappush(self._queue, (time, vehicle, seq, kind, value, trip, leg))
+
+    def _process(self, time: float, vehicle_id: int, seq: int, kind: str, value: float,
+                 trip: Optional[_Trip], leg: int) -> None:
+        """Применяет событие (или все события отправления в рейс) и пишет записи в журнал"""
+        self.now = time
+        if kind != _DEPART:
+            if self._apply(time, vehicle_id, seq, kind, value) and kind == MOVE and trip is not None:
+                self._next_leg(time, vehicle_id, trip, leg)
+            return
+
+        legs, _, cargo, refuel = trip
+        steps = []
+        if refuel:
+            steps.append((REFUEL, refuel))
+        if cargo:
+            steps.append((LOAD, cargo))
+        steps.append((START, 0.0))
+        if legs:
+            steps.append((MOVE, legs[0]))
+        for i, (step, step_value) in enumerate(steps):
+            if not self._apply(time, vehicle_id, seq + i, step, step_value):
+                # Остаток рейса отменяется
+                return
+        if legs:
+            self._next_leg(time, vehicle_id, trip, 0)
+
+    def _apply(self, time: float, vehicle_id: int, seq: int, kind: str, value: float) -> bool:
+        """Применяет одно событие к транспортному средству; False — если оно завершилось ошибкой"""
+        vehicle = self.vehicles[vehicle_id]
+        error = 0
+        try:
+            if kind == MOVE:
+                vehicle.move(value)
+            elif kind == START:
+                vehicle.start()
+            elif kind == REFUEL:
+                vehicle.fuel += value
+            elif kind == LOAD:
+                vehicle.load_cargo(value)
+            else:
+                value = vehicle.remove_all_cargo()
+        except (LowFuelError, NotEnoughFuel, CargoOverload) as e:
+            error = _ERROR_CODES[type(e)]
+        self.log.append(time, vehicle_id, seq, _EVENT_CODES[kind], value, error,
+                        vehicle.fuel, getattr(vehicle, 'cargo', 0.0))
+        return not error
+
+    def _next_leg(self, time: float, vehicle_id: int, trip: _Trip, leg: int) -> None:
+        """Планирует перегон рейса, следующий за пройденным перегоном leg, или выгрузку по прибытии"""
+        legs, speed, cargo, _ = trip
+        arrival = time + legs[leg] / speed
+        if leg + 1 < len(legs):
+            self._push(arrival, vehicle_id, MOVE, legs[leg + 1], trip, leg + 1)
+        elif cargo:
+            self._push(arrival, vehicle_id, UNLOAD, 0.0)
+
+
+def _run_shard(simulator: Simulator, until: Optional[float]) -> Simulator:
+    """Обработка одной части в процессе пула; часть (с журналом по колонкам) возвращается целиком"""
+    simulator.run(until)
+    return simulator
\ No newline at end of file
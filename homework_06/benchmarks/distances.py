@@ -0,0 +1,51 @@
+"""
+Бенчмарк матрицы попарных расстояний: функции cal_* (пара за вызов) против pairwise_distances.
+
+Для каждого количества векторов n считается матрица (n, n) случайных
+векторов размерности dim. Поэлементные функции замеряются только до
+--per-pair-max векторов (время растет как n^2); результаты сверяются.
+
+Запуск из корня проекта:
+    python -m homework_06.benchmarks.distances --sizes 100 300 1000 3000 10000 --dim 30
+"""
+import argparse
+import time
+
+import numpy as np
+
+from homework_06.distances import METRICS, PER_PAIR, pairwise_distances
+
+
+def per_pair_matrix(X: list, metric: str) -> np.ndarray:
+    distance = PER_PAIR[metric]
+    return np.array([[distance(a, b) for b in X] for a in X])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 300, 1000, 3000, 10000])
+    parser.add_argument('--dim', type=int, default=30)
+    parser.add_argument('--per-pair-max', type=int, default=1000, help='максимум векторов для cal_*')
+    parser.add_argument('--block-mb', type=int, default=64, help='ограничение на блок pairwise_distances')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'metric':>10} {'n':>7} {'cal_* s':>9} {'pairwise s':>11} {'speedup':>9}")
+    for size in args.sizes:
+        X = rng.normal(size=(size, args.dim))
+        for metric in METRICS:
+            started = time.perf_counter()
+            matrix = pairwise_distances(X, metric=metric, block_bytes=args.block_mb * 1024 * 1024)
+            vectorized = time.perf_counter() - started
+            if size > args.per_pair_max:
+                print(f"{metric:>10} {size:>7} {'-':>9} {vectorized:>11.4f} {'-':>9}")
+                continue
+            started = time.perf_counter()
+            reference = per_pair_matrix(X.tolist(), metric)
+            per_pair = time.perf_counter() - started
+            assert np.allclose(matrix, reference, atol=1e-9), f"{metric}: results differ"
+            print(f"{metric:>10} {size:>7} {per_pair:>9.3f} {vectorized:>11.4f} {per_pair / vectorized:>8.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""
+Метрики расстояния из задачи 4: поэлементные версии и векторные ядра NumPy
+
+cal_euclidean, cal_manhattan и cal_cosine — решения из ноутбука на базовых
+функциях Python (одна пара векторов за вызов). pairwise_distances считает
+расстояния сразу между всеми строками двух матриц, обрабатывая их блоками,
+чтобы промежуточные массивы не превышали block_bytes.
+"""
+import math
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+
+METRICS = ('euclidean', 'manhattan', 'cosine')
+
+# Ограничение на размер промежуточных массивов одного блока
+BLOCK_BYTES = 64 * 1024 * 1024
+
+
+def cal_euclidean(a, b):
+    return math.sqrt(sum((x - y) ** 2 for x, y in zip(a, b)))
+
+
+def cal_manhattan(a, b):
+    return sum(abs(x - y) for x, y in zip(a, b))
+
+
+def cal_cosine(a, b):
+    dot_product = sum(x * y for x, y in zip(a, b))
+    norm_a = math.sqrt(sum(x ** 2 for x in a))
+    norm_b = math.sqrt(sum(y ** 2 for y in b))
+    if norm_a == 0 or norm_b == 0:
+        return 1.0
+    return 1 - dot_product / (norm_a * norm_b)
+
+
+PER_PAIR = {'euclidean': cal_euclidean, 'manhattan': cal_manhattan, 'cosine': cal_cosine}
+
+
+def pairwise_distances(X, Y=None, metric: str = 'euclidean', block_bytes: int = BLOCK_BYTES) -> np.ndarray:
+    """
+    Матрица расстояний между строками X и Y
+
+    :param X: матрица (n, d)
+    :param Y: матрица (m, d); по умолчанию X
+    :param metric: 'euclidean', 'manhattan' или 'cosine'
+    :param block_bytes: ограничение на промежуточные массивы одного блока
+    :return: матрица (n, m) float64
+    """
+    X, Y = _prepare(X, Y)
+    out = np.empty((len(X), len(Y)))
+    for rows, cols, block in pairwise_blocks(X, Y, metric, block_bytes):
+        out[rows, cols] = block
+    return out
+
+
+def pairwise_blocks(X, Y=None, metric: str = 'euclidean',
+                    block_bytes: int = BLOCK_BYTES) -> Iterator[Tuple[slice, slice, np.ndarray]]:
+    """
+    Расстояния между строками X и Y блоками (строки, столбцы, блок)
+
+    Вся матрица (n, m) в памяти не собирается: вызывающий код может сразу
+    свернуть блок (например, выбрать k ближайших).
+    """
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric: {metric}; expected one of {METRICS}")
+    same = Y is None or Y is X
+    X, Y = _prepare(X, Y)
+    if metric == 'manhattan':
+        # Блок и временный массив разностей по одной координате
+        pair_bytes = 16
+        kernel = _manhattan
+        x_aux = y_aux = None
+        Y = np.ascontiguousarray(Y.T)
+    else:
+        pair_bytes = 8
+        kernel = _euclidean if metric == 'euclidean' else _cosine
+        x_aux, y_aux = _row_norms(X, metric), _row_norms(Y, metric)
+        if metric == 'cosine':
+            X, Y = _normalize(X, x_aux), _normalize(Y, y_aux)
+
+    # Для манхэттенской метрики Y транспонирована: координаты по строкам
+    m = Y.shape[1] if metric == 'manhattan' else len(Y)
+    cols_per_block = max(1, min(m, block_bytes // pair_bytes))
+    rows_per_block = max(1, block_bytes // (pair_bytes * cols_per_block))
+    for col in range(0, m, cols_per_block):
+        cols = slice(col, min(col + cols_per_block, m))
+        for row in range(0, len(X), rows_per_block):
+            rows = slice(row, min(row + rows_per_block, len(X)))
+            block = kernel(X[rows], Y[:, cols] if metric == 'manhattan' else Y[cols],
+                           x_aux[rows] if x_aux is not None else None,
+                           y_aux[cols] if y_aux is not None else None)
+            if same and metric == 'euclidean':
+                # Через скалярные произведения расстояние точки до самой себя выходит ~1e-8, а не 0
+                diagonal = np.arange(max(rows.start, cols.start), min(rows.stop, cols.stop))
+                block[diagonal - rows.start, diagonal - cols.start] = 0
+            yield rows, cols, block
+
+
+def _prepare(X, Y: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+    Y = X if Y is None else np.atleast_2d(np.asarray(Y, dtype=np.float64))
+    if X.shape[1] != Y.shape[1]:
+        raise ValueError(f"Dimension mismatch: {X.shape[1]} != {Y.shape[1]}")
+    return X, Y
+
+
+def _row_norms(X: np.ndarray, metric: str) -> np.ndarray:
+    """Квадраты норм строк (для евклидовой метрики) или нормы (для косинусной)"""
+    squared = np.einsum('ij,ij->i', X, X)
+    return squared if metric == 'euclidean' else np.sqrt(squared)
+
+
+def _normalize(X: np.ndarray, norms: np.ndarray) -> np.ndarray:
+    """Строки единичной длины; нулевые строки остаются нулевыми (расстояние до них 1)"""
+    return X / np.where(norms == 0, 1.0, norms)[:, None]
+
+
+def _euclidean(X: np.ndarray, Y: np.ndarray, x_sq: np.ndarray, y_sq: np.ndarray) -> np.ndarray:
+    # ||x - y||^2 = ||x||^2 + ||y||^2 - 2 x.y: одно матричное умножение вместо разностей
+    block = X @ Y.T
+    block *= -2
+    block += x_sq[:, None]
+    block += y_sq[None, :]
+    np.maximum(block, 0, out=block)
+    return np.sqrt(block, out=block)
+
+
+def _manhattan(X: np.ndarray, Y_T: np.ndarray, *_) -> np.ndarray:
+    # Сумма по координатам: в памяти только блок (строки, столбцы), а не все разности (строки, столбцы, d)
+    block = np.zeros((len(X), Y_T.shape[1]))
+    delta = np.empty_like(block)
+    for x, y in zip(X.T, Y_T):
+        np.subtract(x[:, None], y, out=delta)
+        block += np.abs(delta, out=delta)
+    return block
+
+
+def _cosine(X: np.ndarray, Y: np.ndarray, *_) -> np.ndarray:
+    block = X @ Y.T
+    np.subtract(1, block, out=block)
+    return block
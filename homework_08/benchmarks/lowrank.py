@@ -0,0 +1,104 @@
+"""
+Бенчмарк малоранговых приближений в зависимости от размера матрицы n x n.
+
+Матрица — сумма ранга --rank с убывающим спектром и шума; она
+записывается блоками в np.memmap во временном каталоге, поэтому n = 20000
+(3.2 ГБ) не обязана помещаться в память. Замеряются:
+  - цикл из ноутбука: сборка A_r и норма для каждого r (только до --loop-max);
+  - полный np.linalg.svd и кривая ошибок error_curve (только до --full-max);
+  - randomized_svd по memmap и ошибка приближения, посчитанная по блокам;
+  - truncated_svd (метод Ланцоша) по memmap (только до --truncated-max).
+Где есть точное SVD, сингулярные числа и ошибки сверяются с ним.
+
+Запуск из корня проекта:
+    python -m homework_08.benchmarks.lowrank --sizes 100 300 1000 3000 10000 20000 --rank 20
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from homework_08.lowrank import (BLOCK_BYTES, approximation_error, error_curve, frobenius_norm,
+                                 randomized_svd, truncated_svd)
+
+
+def make_matrix(path: str, n: int, rank: int, noise: float, seed: int = 0) -> np.memmap:
+    """Матрица L @ R + шум, записанная в memmap по блокам строк"""
+    rng = np.random.default_rng(seed)
+    L = rng.standard_normal((n, rank)) * np.geomspace(100, 1, rank)
+    R = rng.standard_normal((rank, n)) / np.sqrt(n)
+    A = np.memmap(path, dtype=np.float64, mode='w+', shape=(n, n))
+    step = max(1, BLOCK_BYTES // (8 * n))
+    for start in range(0, n, step):
+        rows = slice(start, min(start + step, n))
+        A[rows] = L[rows] @ R + noise * rng.standard_normal((rows.stop - rows.start, n))
+    A.flush()
+    return np.memmap(path, dtype=np.float64, mode='r', shape=(n, n))
+
+
+def notebook_errors(A: np.ndarray) -> list:
+    U, S, Vt = np.linalg.svd(A, full_matrices=False)
+    return [np.linalg.norm(A - U[:, :r] @ np.diag(S[:r]) @ Vt[:r, :], ord='fro') for r in range(1, len(S) + 1)]
+
+
+def timed(func, *args, **kwargs) -> tuple:
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - started, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 300, 1000, 3000, 10000, 20000])
+    parser.add_argument('--rank', type=int, default=20, help='ранг приближения (и сигнальной части матрицы)')
+    parser.add_argument('--noise', type=float, default=0.01)
+    parser.add_argument('--loop-max', type=int, default=300)
+    parser.add_argument('--full-max', type=int, default=3000)
+    parser.add_argument('--truncated-max', type=int, default=5000)
+    args = parser.parse_args()
+
+    # scipy импортируется при первом вызове truncated_svd: не включаем импорт в замер
+    truncated_svd(np.eye(3), 1)
+    print(f"{'n':>6} {'loop s':>8} {'svd s':>8} {'curve ms':>9} {'randomized s':>13} {'rel. error':>11} "
+          f"{'truncated s':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        for n in args.sizes:
+            path = os.path.join(directory, f'{n}.dat')
+            A = make_matrix(path, n, min(args.rank, n), args.noise)
+            rank = min(args.rank, n - 1)
+            row = {'loop': '-', 'svd': '-', 'curve': '-', 'truncated': '-'}
+
+            exact = None
+            if n <= args.full_max:
+                dense = np.array(A)
+                svd_time, (_, S, _) = timed(np.linalg.svd, dense, full_matrices=False)
+                curve_time, exact = timed(error_curve, S)
+                row['svd'], row['curve'] = f"{svd_time:.3f}", f"{curve_time * 1000:.3f}"
+                if n <= args.loop_max:
+                    loop_time, errors = timed(notebook_errors, dense)
+                    assert np.allclose(errors, exact, atol=1e-8 * errors[0]), "error curve differs from notebook loop"
+                    row['loop'] = f"{loop_time:.3f}"
+
+            randomized_time, (U, S_r, Vt) = timed(randomized_svd, A, rank, seed=0)
+            error = approximation_error(A, U, S_r, Vt, rank)
+            curve = error_curve(S_r, norm=frobenius_norm(A))
+            assert np.isclose(curve[-1], error, rtol=1e-3), "error curve differs from blockwise error"
+            if exact is not None:
+                assert np.isclose(error, exact[rank - 1], rtol=1e-3), "randomized error differs from exact"
+            relative = error / frobenius_norm(A)
+
+            if n <= args.truncated_max:
+                truncated_time, (_, S_t, _) = timed(truncated_svd, A, rank)
+                assert np.allclose(S_t, S_r, rtol=1e-6), "truncated and randomized singular values differ"
+                row['truncated'] = f"{truncated_time:.3f}"
+            del A
+            os.remove(path)
+
+            print(f"{n:>6} {row['loop']:>8} {row['svd']:>8} {row['curve']:>9} {randomized_time:>13.3f} "
+                  f"{relative:>11.2e} {row['truncated']:>12}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+"""
+Малоранговые приближения матрицы из задания 8
+
+Ошибка приближения ранга r по теореме Эккарта — Янга выражается через
+сингулярные числа: ||A - A_r||_F = sqrt(s_{r+1}^2 + ... + s_n^2), поэтому
+вся кривая E(r) считается одной накопленной суммой, без сборки A_r.
+
+Для больших матриц (в том числе np.memmap) первые rank сингулярных
+троек ищутся рандомизированным (randomized_svd) или итерационным
+(truncated_svd) методом; матрица читается блоками строк, а приближение
+A_r собирается и сравнивается с A тоже по блокам.
+"""
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+
+# Ограничение на размер блока строк, читаемого из матрицы за раз
+BLOCK_BYTES = 64 * 1024 * 1024
+
+
+def error_curve(S, norm: Optional[float] = None) -> np.ndarray:
+    """
+    Ошибки ||A - A_r||_F для r = 1..len(S)
+
+    :param S: сингулярные числа по убыванию
+    :param norm: норма Фробениуса A; нужна, если S — только первые
+        сингулярные числа (после randomized_svd или truncated_svd)
+    :return: массив длины len(S), элемент r - 1 — ошибка приближения ранга r
+    """
+    squares = np.asarray(S, dtype=np.float64) ** 2
+    if norm is None:
+        # Хвостовые суммы: сложение от малых чисел к большим точнее
+        tail = np.cumsum(squares[::-1])[::-1]
+        return np.sqrt(np.append(tail[1:], 0.0))
+    return np.sqrt(np.maximum(norm ** 2 - np.cumsum(squares), 0.0))
+
+
+def frobenius_norm(A, block_bytes: int = BLOCK_BYTES) -> float:
+    """Норма Фробениуса матрицы, читаемой блоками строк"""
+    total = 0.0
+    for rows in _row_blocks(A, block_bytes):
+        block = np.asarray(A[rows], dtype=np.float64)
+        total += np.einsum('ij,ij->', block, block)
+    return float(np.sqrt(total))
+
+
+def randomized_svd(A, rank: int, oversample: int = 10, power_iterations: int = 2,
+                   seed: Optional[int] = None,
+                   block_bytes: int = BLOCK_BYTES) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Первые rank сингулярных троек рандомизированным методом (Halko, Martinsson, Tropp)
+
+    Базис образа A ищется по произведению A на случайную матрицу из
+    rank + oversample столбцов; степенные итерации (с переортогонализацией)
+    уточняют его для медленно убывающих спектров. Матрица читается
+    2 * power_iterations + 2 раза.
+
+    :param A: матрица (m, n): ndarray или np.memmap
+    :param rank: количество сингулярных троек
+    :param oversample: дополнительные столбцы случайной матрицы
+    :param power_iterations: количество степенных итераций
+    :param seed: зерно генератора случайных чисел
+    :param block_bytes: ограничение на блок строк A
+    :return: U (m, rank), S (rank,), Vt (rank, n)
+    """
+    m, n = A.shape
+    if not 1 <= rank <= min(m, n):
+        raise ValueError(f"rank must be between 1 and {min(m, n)}")
+    size = min(rank + oversample, m, n)
+    rng = np.random.default_rng(seed)
+
+    Q, _ = np.linalg.qr(_matmul(A, rng.standard_normal((n, size)), block_bytes))
+    for _ in range(power_iterations):
+        Z, _ = np.linalg.qr(_rmatmul(A, Q, block_bytes))
+        Q, _ = np.linalg.qr(_matmul(A, Z, block_bytes))
+
+    # B = Q^T A маленькая (size, n): ее SVD дает сингулярные тройки A
+    U_B, S, Vt = np.linalg.svd(_rmatmul(A, Q, block_bytes).T, full_matrices=False)
+    return (Q @ U_B[:, :rank]), S[:rank], Vt[:rank]
+
+
+def truncated_svd(A, rank: int, tol: float = 0.0,
+                  block_bytes: int = BLOCK_BYTES) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Первые rank сингулярных троек итерационным методом Ланцоша (scipy.sparse.linalg.svds)
+
+    Точнее randomized_svd при медленно убывающем спектре, но читает матрицу
+    больше раз. Произведения на A и A^T считаются по блокам строк.
+
+    :param A: матрица (m, n): ndarray или np.memmap
+    :param rank: количество сингулярных троек (меньше min(m, n))
+    :param tol: относительная точность (0 — машинная)
+    :param block_bytes: ограничение на блок строк A
+    :return: U (m, rank), S (rank,), Vt (rank, n), сингулярные числа по убыванию
+    """
+    from scipy.sparse.linalg import LinearOperator, svds
+
+    m, n = A.shape
+    if not 1 <= rank < min(m, n):
+        raise ValueError(f"rank must be between 1 and {min(m, n) - 1}")
+    operator = LinearOperator(
+        (m, n), dtype=np.float64,
+        matvec=lambda x: _matmul(A, x.reshape(n, -1), block_bytes).ravel(),
+        matmat=lambda X: _matmul(A, X, block_bytes),
+        rmatvec=lambda y: _rmatmul(A, y.reshape(m, -1), block_bytes).ravel(),
+        rmatmat=lambda Y: _rmatmul(A, Y, block_bytes),
+    )
+    U, S, Vt = svds(operator, k=rank, tol=tol)
+    order = np.argsort(S)[::-1]
+    return U[:, order], S[order], Vt[order]
+
+
+def low_rank_blocks(U, S, Vt, rank: int,
+                    block_bytes: int = BLOCK_BYTES) -> Iterator[Tuple[slice, np.ndarray]]:
+    """
+    Приближение ранга rank по блокам строк (строки, блок)
+
+    Вся матрица (m, n) не собирается: блок можно сразу записать или сравнить с A.
+    """
+    US = U[:, :rank] * S[:rank]
+    Vt = Vt[:rank]
+    for rows in _row_blocks(US, block_bytes, Vt.shape[1]):
+        yield rows, US[rows] @ Vt
+
+
+def reconstruct(U, S, Vt, rank: int, out: Optional[np.ndarray] = None,
+                block_bytes: int = BLOCK_BYTES) -> np.ndarray:
+    """
+    Приближение ранга rank целиком
+
+    :param out: массив (m, n) для результата, например np.memmap на диске
+    :return: out или новый массив
+    """
+    if out is None:
+        out = np.empty((U.shape[0], Vt.shape[1]))
+    for rows, block in low_rank_blocks(U, S, Vt, rank, block_bytes):
+        out[rows] = block
+    return out
+
+
+def approximation_error(A, U, S, Vt, rank: int, block_bytes: int = BLOCK_BYTES) -> float:
+    """Ошибка ||A - A_r||_F, посчитанная по блокам без сборки A_r"""
+    total = 0.0
+    for rows, block in low_rank_blocks(U, S, Vt, rank, block_bytes):
+        block -= A[rows]
+        total += np.einsum('ij,ij->', block, block)
+    return float(np.sqrt(total))
+
+
+def _row_blocks(A, block_bytes: int, n_cols: Optional[int] = None) -> Iterator[slice]:
+    """Срезы строк, блок которых (строки, n_cols) float64 не больше block_bytes"""
+    n_cols = A.shape[1] if n_cols is None else n_cols
+    step = max(1, block_bytes // (8 * max(n_cols, 1)))
+    for start in range(0, A.shape[0], step):
+        yield slice(start, min(start + step, A.shape[0]))
+
+
+def _matmul(A, B: np.ndarray, block_bytes: int) -> np.ndarray:
+    """A @ B по блокам строк A"""
+    out = np.empty((A.shape[0], B.shape[1]))
+    for rows in _row_blocks(A, block_bytes):
+        out[rows] = np.asarray(A[rows], dtype=np.float64) @ B
+    return out
+
+
+def _rmatmul(A, B: np.ndarray, block_bytes: int) -> np.ndarray:
+    """A^T @ B по блокам строк A"""
+    out = np.zeros((A.shape[1], B.shape[1]))
+    for rows in _row_blocks(A, block_bytes):
+        out += np.asarray(A[rows], dtype=np.float64).T @ B[rows]
+    return out
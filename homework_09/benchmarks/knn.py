@@ -0,0 +1,73 @@
+"""
+Бенчмарк поиска k ближайших соседей в зависимости от количества точек.
+
+Сравниваются:
+  - перебор пар функциями cal_* из homework_06 (как в ноутбуке, только до --per-pair-max точек);
+  - полный перебор блоками (brute_kneighbors);
+  - KDTree в одном процессе и с делением запросов между --workers процессами.
+
+Точки и запросы — случайные векторы размерности dim; ответы всех способов сверяются.
+
+Запуск из корня проекта:
+    python -m homework_09.benchmarks.knn --sizes 1000 10000 100000 1000000 --dim 3 --queries 2000 --workers 4
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from homework_06.distances import PER_PAIR
+from homework_09.knn import NearestNeighbors, brute_kneighbors
+
+
+def per_pair_kneighbors(X: list, queries: list, k: int, metric: str) -> np.ndarray:
+    distance = PER_PAIR[metric]
+    return np.array([sorted(distance(query, point) for point in X)[:k] for query in queries])
+
+
+def timed(func, *args, **kwargs) -> tuple:
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - started, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000, 1000000])
+    parser.add_argument('--dim', type=int, default=3)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--metric', default='euclidean', choices=sorted(PER_PAIR))
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--per-pair-max', type=int, default=10000, help='максимум точек для перебора cal_*')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    queries = rng.normal(size=(args.queries, args.dim))
+    print(f"{'n':>8} {'cal_* q/s':>10} {'brute q/s':>10} {'build s':>8} {'kd_tree q/s':>12} "
+          f"{f'x{args.workers} q/s':>10}")
+    for size in args.sizes:
+        X = rng.normal(size=(size, args.dim))
+        brute_time, (reference, _) = timed(brute_kneighbors, X, queries, args.k, args.metric)
+
+        build_time, index = timed(NearestNeighbors(args.k, args.metric, 'kd_tree').fit, X)
+        tree_time, (distances, _) = timed(index.kneighbors, queries)
+        assert np.allclose(distances, reference), "kd_tree differs from brute force"
+        sharded_time, (distances, _) = timed(index.kneighbors, queries, workers=args.workers)
+        assert np.allclose(distances, reference), "sharded kd_tree differs from brute force"
+
+        per_pair = '-'
+        if size <= args.per_pair_max:
+            # Перебор на Python медленный: замеряется на части запросов
+            count = max(1, args.queries * 1000 // size)
+            per_pair_time, distances = timed(per_pair_kneighbors, X.tolist(), queries[:count].tolist(),
+                                             args.k, args.metric)
+            assert np.allclose(distances, reference[:count]), "cal_* differs from brute force"
+            per_pair = f"{count / per_pair_time:,.0f}"
+        print(f"{size:>8} {per_pair:>10} {args.queries / brute_time:>10,.0f} {build_time:>8.2f} "
+              f"{args.queries / tree_time:>12,.0f} {args.queries / sharded_time:>10,.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,333 @@
+"""
+Поиск k ближайших соседей без перебора пар в Python
+
+KDTree — индекс для низкоразмерных данных, brute_kneighbors — полный
+перебор блоками через pairwise_distances из homework_06. NearestNeighbors
+выбирает один из них и умеет делить запросы между процессами,
+KNNClassifier — замена KNeighborsClassifier из ноутбука (голосование
+соседей с равными весами).
+"""
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+
+import numpy as np
+from sklearn.base import BaseEstimator, ClassifierMixin
+
+from homework_06.distances import BLOCK_BYTES, METRICS, pairwise_blocks
+
+ALGORITHMS = ('auto', 'kd_tree', 'brute')
+
+# При большей размерности KD-дерево почти не отсекает листья, и перебор быстрее
+KD_TREE_MAX_FEATURES = 16
+
+
+class KDTree:
+    """
+    KD-дерево для поиска k ближайших соседей
+
+    Точки делятся по медиане вдоль координаты с наибольшим разбросом, пока
+    в узле не останется не больше leaf_size точек. Листья хранятся массивом
+    (листья, leaf_size, d), дополненным до одного размера, вместе с
+    ограничивающими параллелепипедами; соседние в порядке обхода листья
+    объединены в группы примерно по sqrt(листья) штук (верхний уровень
+    дерева) со своими параллелепипедами.
+
+    Запросы обрабатываются пачками: каждый запрос просматривает группы по
+    возрастанию нижней оценки расстояния до их параллелепипедов, внутри
+    группы так же листья, и останавливается, когда оценка не меньше
+    расстояния до k-го найденного соседа. Результат совпадает с полным
+    перебором.
+
+    Косинусное расстояние сводится к евклидову между нормированными
+    векторами: 1 - cos(u, v) = |u - v|^2 / 2.
+    """
+
+    def __init__(self, X, metric: str = 'euclidean', leaf_size: int = 40, block_bytes: int = BLOCK_BYTES):
+        """
+        Построение дерева
+
+        :param X: матрица точек (n, d)
+        :param metric: 'euclidean', 'manhattan' или 'cosine'
+        :param leaf_size: максимальное количество точек в листе
+        :param block_bytes: ограничение на промежуточные массивы одной пачки запросов
+        """
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric: {metric}; expected one of {METRICS}")
+        if leaf_size < 1:
+            raise ValueError("leaf_size must be positive")
+        X = self._prepare(np.asarray(X, dtype=np.float64), metric)
+        if X.ndim != 2 or not len(X):
+            raise ValueError("X must be a non-empty two-dimensional array")
+        self.metric = metric
+        self.leaf_size = leaf_size
+        self.block_bytes = block_bytes
+        self.n_samples, self.n_features = X.shape
+
+        leaves = self._split(X, leaf_size)
+        self._group_size = max(1, round(len(leaves) ** 0.5))
+        groups = -(-len(leaves) // self._group_size)
+        size = max(len(leaf) for leaf in leaves)
+        # Пустые листья в конце последней группы: параллелепипед "наизнанку" дает оценку inf
+        self._index = np.full((groups * self._group_size, size), -1, dtype=np.int64)
+        self._points = np.zeros((groups * self._group_size, size, self.n_features))
+        self._lower = np.full((groups * self._group_size, self.n_features), np.inf)
+        self._upper = np.full((groups * self._group_size, self.n_features), -np.inf)
+        for i, leaf in enumerate(leaves):
+            points = X[leaf]
+            self._index[i, :len(leaf)] = leaf
+            self._points[i, :len(leaf)] = points
+            self._lower[i] = points.min(axis=0)
+            self._upper[i] = points.max(axis=0)
+        self._group_lower = self._lower.reshape(groups, self._group_size, -1).min(axis=1)
+        self._group_upper = self._upper.reshape(groups, self._group_size, -1).max(axis=1)
+
+    def query(self, X, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Поиск k ближайших соседей
+
+        :param X: матрица запросов (m, d)
+        :param k: количество соседей
+        :return: расстояния (m, k) по возрастанию и индексы соседей (m, k)
+        """
+        X = self._prepare(np.atleast_2d(np.asarray(X, dtype=np.float64)), self.metric)
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"Dimension mismatch: {X.shape[1]} != {self.n_features}")
+        if not 1 <= k <= self.n_samples:
+            raise ValueError(f"k must be between 1 and {self.n_samples}")
+
+        distances = np.empty((len(X), k))
+        indices = np.empty((len(X), k), dtype=np.int64)
+        # Самые большие массивы пачки — (пачка, группы или листья группы, d)
+        width = max(len(self._group_lower), self._group_size, self._index.shape[1])
+        batch = max(1, self.block_bytes // (8 * width * self.n_features))
+        for start in range(0, len(X), batch):
+            rows = slice(start, start + batch)
+            distances[rows], indices[rows] = self._query_batch(X[rows], k)
+
+        # Внутри дерева евклидово расстояние хранится в квадрате
+        if self.metric == 'euclidean':
+            np.sqrt(distances, out=distances)
+        elif self.metric == 'cosine':
+            distances /= 2
+        return distances, indices
+
+    @staticmethod
+    def _prepare(X: np.ndarray, metric: str) -> np.ndarray:
+        if metric != 'cosine':
+            return X
+        norms = np.linalg.norm(X, axis=-1, keepdims=True)
+        return X / np.where(norms == 0, 1.0, norms)
+
+    @staticmethod
+    def _split(X: np.ndarray, leaf_size: int) -> list:
+        """Разбиение индексов точек на листья по медианам (в порядке обхода дерева)"""
+        leaves = []
+        stack = [np.arange(len(X))]
+        while stack:
+            node = stack.pop()
+            if len(node) <= leaf_size:
+                leaves.append(node)
+                continue
+            points = X[node]
+            dim = np.argmax(points.max(axis=0) - points.min(axis=0))
+            middle = len(node) // 2
+            node = node[np.argpartition(points[:, dim], middle)]
+            stack.append(node[middle:])
+            stack.append(node[:middle])
+        return leaves
+
+    def _reduce(self, delta: np.ndarray) -> np.ndarray:
+        """Сворачивание покоординатных разностей в расстояние (евклидово — в квадрате)"""
+        if self.metric == 'manhattan':
+            return np.abs(delta).sum(axis=-1)
+        return np.einsum('...i,...i->...', delta, delta)
+
+    def _box_bounds(self, X: np.ndarray, lower: np.ndarray, upper: np.ndarray) -> np.ndarray:
+        """Нижние оценки расстояний от точек X (a, 1, d) до параллелепипедов (.., b, d)"""
+        gap = np.maximum(lower - X, X - upper)
+        np.maximum(gap, 0, out=gap)
+        return self._reduce(gap)
+
+    def _query_batch(self, X: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        bounds = self._box_bounds(X[:, None], self._group_lower, self._group_upper)
+        distances = np.full((len(X), k), np.inf)
+        indices = np.full((len(X), k), -1, dtype=np.int64)
+        active = np.arange(len(X))
+        while len(active):
+            groups = bounds[active].argmin(axis=1)
+            needed = bounds[active, groups] < distances[active, -1]
+            active, groups = active[needed], groups[needed]
+            if not len(active):
+                break
+            bounds[active, groups] = np.inf
+            self._visit_groups(X, active, groups, distances, indices, k)
+        return distances, indices
+
+    def _visit_groups(self, X: np.ndarray, active: np.ndarray, groups: np.ndarray,
+                      distances: np.ndarray, indices: np.ndarray, k: int) -> None:
+        """Просмотр листьев групп groups (по одной на запрос active) по возрастанию оценки"""
+        leaves = groups[:, None] * self._group_size + np.arange(self._group_size)
+        bounds = self._box_bounds(X[active, None], self._lower[leaves], self._upper[leaves])
+        order = np.argsort(bounds, axis=1)
+        bounds = np.take_along_axis(bounds, order, axis=1)
+        leaves = np.take_along_axis(leaves, order, axis=1)
+        for step in range(self._group_size):
+            needed = bounds[:, step] < distances[active, -1]
+            if not needed.any():
+                break
+            rows = active[needed]
+            leaf = leaves[needed, step]
+            leaf_distances = self._reduce(self._points[leaf] - X[rows, None])
+            leaf_indices = self._index[leaf]
+            leaf_distances[leaf_indices < 0] = np.inf
+            distances[rows], indices[rows] = _merge_top_k(
+                distances[rows], indices[rows], leaf_distances, leaf_indices, k
+            )
+
+
+def brute_kneighbors(X, queries, k: int = 1, metric: str = 'euclidean',
+                     block_bytes: int = BLOCK_BYTES) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Поиск k ближайших соседей полным перебором
+
+    Матрица расстояний считается блоками pairwise_blocks, из каждого блока
+    сразу отбираются k лучших, поэтому вся матрица (m, n) не хранится.
+
+    :return: расстояния (m, k) по возрастанию и индексы соседей (m, k)
+    """
+    X = np.asarray(X, dtype=np.float64)
+    queries = np.atleast_2d(np.asarray(queries, dtype=np.float64))
+    if not 1 <= k <= len(X):
+        raise ValueError(f"k must be between 1 and {len(X)}")
+    distances = np.full((len(queries), k), np.inf)
+    indices = np.full((len(queries), k), -1, dtype=np.int64)
+    for rows, cols, block in pairwise_blocks(queries, X, metric, block_bytes):
+        # Сначала k лучших внутри блока, чтобы не копировать весь блок при слиянии
+        block_indices = np.argpartition(block, k - 1, axis=1)[:, :k] if block.shape[1] > k else \
+            np.broadcast_to(np.arange(block.shape[1]), block.shape)
+        block = np.take_along_axis(block, block_indices, axis=1)
+        distances[rows], indices[rows] = _merge_top_k(distances[rows], indices[rows], block,
+                                                      block_indices + cols.start, k)
+    return distances, indices
+
+
+def _merge_top_k(distances: np.ndarray, indices: np.ndarray, new_distances: np.ndarray,
+                 new_indices: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """k лучших из текущих соседей и новых кандидатов, по возрастанию расстояния"""
+    distances = np.concatenate([distances, new_distances], axis=1)
+    indices = np.concatenate([indices, new_indices], axis=1)
+    best = np.argpartition(distances, k - 1, axis=1)[:, :k]
+    distances = np.take_along_axis(distances, best, axis=1)
+    indices = np.take_along_axis(indices, best, axis=1)
+    order = np.argsort(distances, axis=1, kind='stable')
+    return np.take_along_axis(distances, order, axis=1), np.take_along_axis(indices, order, axis=1)
+
+
+class NearestNeighbors:
+    """
+    Индекс ближайших соседей с выбором алгоритма и делением запросов между процессами
+
+    algorithm='auto' строит KDTree, если признаков не больше
+    KD_TREE_MAX_FEATURES, иначе использует перебор блоками.
+    """
+
+    def __init__(self, n_neighbors: int = 5, metric: str = 'euclidean', algorithm: str = 'auto',
+                 leaf_size: int = 40, workers: int = 1):
+        """
+        :param n_neighbors: количество соседей по умолчанию
+        :param metric: 'euclidean', 'manhattan' или 'cosine'
+        :param algorithm: 'auto', 'kd_tree' или 'brute'
+        :param leaf_size: размер листа KD-дерева
+        :param workers: количество процессов для запросов (1 — в текущем процессе)
+        """
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric: {metric}; expected one of {METRICS}")
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Unknown algorithm: {algorithm}; expected one of {ALGORITHMS}")
+        self.n_neighbors = n_neighbors
+        self.metric = metric
+        self.algorithm = algorithm
+        self.leaf_size = leaf_size
+        self.workers = workers
+        self._data = None
+        self._tree = None
+
+    def fit(self, X) -> 'NearestNeighbors':
+        self._data = np.asarray(X, dtype=np.float64)
+        if self._data.ndim != 2 or not len(self._data):
+            raise ValueError("X must be a non-empty two-dimensional array")
+        use_tree = self.algorithm == 'kd_tree' or (
+            self.algorithm == 'auto' and self._data.shape[1] <= KD_TREE_MAX_FEATURES
+        )
+        self._tree = KDTree(self._data, self.metric, self.leaf_size) if use_tree else None
+        return self
+
+    def kneighbors(self, X, n_neighbors: Optional[int] = None,
+                   workers: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Поиск ближайших соседей для пачки запросов
+
+        :param X: матрица запросов (m, d)
+        :param n_neighbors: количество соседей (по умолчанию из конструктора)
+        :param workers: количество процессов (по умолчанию из конструктора)
+        :return: расстояния (m, k) по возрастанию и индексы соседей (m, k)
+        """
+        if self._data is None:
+            raise RuntimeError("NearestNeighbors is not fitted")
+        k = n_neighbors or self.n_neighbors
+        workers = workers or self.workers
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        if workers <= 1 or len(X) < 2:
+            return self._kneighbors(X, k)
+
+        # Каждому процессу достается индекс и своя часть запросов
+        shards = np.array_split(X, min(workers, len(X)))
+        with ProcessPoolExecutor(max_workers=len(shards)) as pool:
+            results = list(pool.map(_kneighbors_shard, [self] * len(shards), shards, [k] * len(shards)))
+        return (np.concatenate([distances for distances, _ in results]),
+                np.concatenate([indices for _, indices in results]))
+
+    def _kneighbors(self, X: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        if self._tree is not None:
+            return self._tree.query(X, k)
+        return brute_kneighbors(self._data, X, k, self.metric)
+
+
+def _kneighbors_shard(index: NearestNeighbors, X: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Поиск для одной части запросов в процессе пула"""
+    return index._kneighbors(X, k)
+
+
+class KNNClassifier(ClassifierMixin, BaseEstimator):
+    """
+    Классификатор k ближайших соседей (голосование с равными весами)
+
+    Замена KNeighborsClassifier из ноутбука: те же fit, predict,
+    predict_proba и score, параметры подбираются GridSearchCV. При равенстве
+    голосов выбирается меньшая метка.
+    """
+
+    def __init__(self, n_neighbors: int = 5, metric: str = 'euclidean', algorithm: str = 'auto',
+                 leaf_size: int = 40, workers: int = 1):
+        self.n_neighbors = n_neighbors
+        self.metric = metric
+        self.algorithm = algorithm
+        self.leaf_size = leaf_size
+        self.workers = workers
+
+    def fit(self, X, y) -> 'KNNClassifier':
+        self.classes_, self._labels = np.unique(np.asarray(y), return_inverse=True)
+        self._index = NearestNeighbors(self.n_neighbors, self.metric, self.algorithm,
+                                       self.leaf_size, self.workers).fit(X)
+        return self
+
+    def predict_proba(self, X) -> np.ndarray:
+        """Доли голосов соседей за каждый класс (m, классы)"""
+        _, neighbors = self._index.kneighbors(X)
+        votes = self._labels[neighbors]
+        proba = np.zeros((len(votes), len(self.classes_)))
+        np.add.at(proba, (np.arange(len(votes))[:, None], votes), 1)
+        return proba / self.n_neighbors
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
@@ -0,0 +1,137 @@
+"""
+Бенчмарк перебора энкодер x скейлер x модель из части 2 задания 10.
+
+Сравнивается run_full_pipeline из ноутбука (копия DataFrame и обучение всех
+стадий на каждую пару энкодер x скейлер, три cross_val_score на модель) с
+run_grid в одном процессе и в пуле процессов; метрики должны совпасть.
+Выводится отчет run_grid: время и пиковая память каждой ячейки.
+
+Данные — AB_NYC_2019.csv (--csv) после удаления столбцов как в ноутбуке
+или, без файла, синтетическая таблица той же схемы из --rows строк.
+
+Запуск из корня проекта:
+    python -m homework_10.benchmarks.grid --csv AB_NYC_2019.csv --workers 4
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.impute import SimpleImputer
+from sklearn.model_selection import cross_val_score
+
+from homework_10.pipeline import StageCache, default_encoders, default_models, default_scalers, run_grid
+
+CAT_COLS = ['neighbourhood_group', 'neighbourhood', 'room_type']
+GROUPS = ['Manhattan', 'Brooklyn', 'Queens', 'Bronx', 'Staten Island']
+ROOM_TYPES = ['Entire home/apt', 'Private room', 'Shared room']
+
+
+def load(path: str) -> pd.DataFrame:
+    data = pd.read_csv(path)
+    return data.drop(['id', 'name', 'host_id', 'host_name', 'last_review'], axis=1)
+
+
+def synthetic(rows: int, seed: int = 0) -> pd.DataFrame:
+    """Таблица со столбцами AB_NYC_2019.csv после удаления неинформативных"""
+    rng = np.random.default_rng(seed)
+    group = rng.choice(len(GROUPS), rows, p=[0.44, 0.41, 0.12, 0.02, 0.01])
+    room = rng.choice(len(ROOM_TYPES), rows, p=[0.52, 0.46, 0.02])
+    reviews = rng.poisson(20, rows)
+    per_month = np.where(reviews > 0, rng.gamma(1.5, 1.0, rows), np.nan)
+    return pd.DataFrame({
+        'neighbourhood_group': np.array(GROUPS, dtype=object)[group],
+        'neighbourhood': np.array([f'{GROUPS[g]} {n}' for g, n in zip(group, rng.integers(0, 45, rows))],
+                                  dtype=object),
+        'latitude': 40.7 + 0.05 * group + rng.normal(0, 0.05, rows),
+        'longitude': -73.95 + 0.03 * group + rng.normal(0, 0.05, rows),
+        'room_type': np.array(ROOM_TYPES, dtype=object)[room],
+        'price': np.round(np.exp(5.2 - 0.6 * room - 0.1 * group + rng.normal(0, 0.6, rows))).astype(np.int64),
+        'minimum_nights': rng.geometric(0.3, rows),
+        'number_of_reviews': reviews,
+        'reviews_per_month': per_month,
+        'calculated_host_listings_count': rng.geometric(0.5, rows),
+        'availability_365': rng.integers(0, 366, rows),
+    })
+
+
+def notebook_grid(data: pd.DataFrame, cat_cols: list, target: str = 'price') -> pd.DataFrame:
+    """run_full_pipeline, preprocess и evaluate из ноутбука"""
+    encoders, scalers, models = default_encoders(), default_scalers(), default_models()
+
+    def preprocess(data, enc_name, scaler_name, cat_cols, target="price"):
+        df = data.copy()
+        cat_imputer = SimpleImputer(strategy="most_frequent")
+        df[cat_cols] = cat_imputer.fit_transform(df[cat_cols])
+        enc = encoders[enc_name]
+        if enc_name == "OneHotEncoder":
+            encoded = enc.fit_transform(df[cat_cols])
+            encoded_df = pd.DataFrame(encoded, index=df.index,
+                                      columns=[f"{col}_{i}" for i, col in enumerate(encoded.T)])
+            df = df.drop(cat_cols, axis=1).join(encoded_df)
+        else:
+            df[cat_cols] = enc.fit_transform(df[cat_cols])
+        num_cols = [col for col in df.columns if col != target]
+        num_imputer = SimpleImputer(strategy="median")
+        df[num_cols] = num_imputer.fit_transform(df[num_cols])
+        scaler = scalers[scaler_name]
+        X_scaled = scaler.fit_transform(df.drop(target, axis=1))
+        y = df[target]
+        return X_scaled, y
+
+    def evaluate(model_name, X, y):
+        model = models[model_name]
+        r2 = cross_val_score(model, X, y, cv=5, scoring="r2").mean()
+        mae = cross_val_score(model, X, y, cv=5, scoring="neg_mean_absolute_error").mean()
+        rmse = cross_val_score(model, X, y, cv=5, scoring="neg_root_mean_squared_error").mean()
+        return round(r2, 4), round(mae, 4), round(rmse, 4)
+
+    results = []
+    for enc_name in encoders:
+        for scaler_name in scalers:
+            X, y = preprocess(data, enc_name, scaler_name, cat_cols, target)
+            for model_name in models:
+                r2, mae, rmse = evaluate(model_name, X, y)
+                results.append({"model": model_name, "encoder": enc_name, "scaler": scaler_name,
+                                "R2": r2, "MAE": mae, "RMSE": rmse})
+    return pd.DataFrame(results)
+
+
+def timed(func, *args, **kwargs) -> tuple:
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - started, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--csv', help='путь к AB_NYC_2019.csv')
+    parser.add_argument('--rows', type=int, default=20000, help='строк синтетических данных без --csv')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--skip-notebook', action='store_true', help='не запускать код ноутбука')
+    args = parser.parse_args()
+
+    data = load(args.csv) if args.csv else synthetic(args.rows)
+    print(f"data: {data.shape[0]} rows x {data.shape[1]} columns")
+
+    cache = StageCache()
+    serial_time, serial = timed(run_grid, data, CAT_COLS, workers=1, cache=cache)
+    print(f"stage cache: {cache.misses} stages fitted, {cache.hits} reused")
+    parallel_time, parallel = timed(run_grid, data, CAT_COLS, workers=args.workers)
+    metrics = ['model', 'encoder', 'scaler', 'R2', 'MAE', 'RMSE']
+    pd.testing.assert_frame_equal(serial[metrics], parallel[metrics])
+
+    if not args.skip_notebook:
+        notebook_time, notebook = timed(notebook_grid, data, CAT_COLS)
+        pd.testing.assert_frame_equal(notebook, serial[metrics], check_exact=False, atol=1e-4)
+        print(f"notebook run_full_pipeline: {notebook_time:8.2f} s")
+    print(f"run_grid, 1 process:        {serial_time:8.2f} s")
+    print(f"run_grid, {args.workers} processes:{'':<{max(0, 7 - len(str(args.workers)))}}{parallel_time:8.2f} s")
+    print()
+    with pd.option_context('display.width', 200, 'display.max_columns', None, 'display.float_format', '{:.4f}'.format):
+        print(parallel)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,308 @@
+"""
+Перебор предобработки и моделей из части 2 задания 10 (цены Airbnb)
+
+preprocess из ноутбука копирует весь DataFrame и заново обучает импутеры и
+энкодер для каждой пары энкодер x скейлер, а evaluate трижды прогоняет
+кросс-валидацию для каждой модели. Здесь:
+  - стадии (импутер категорий, энкодер, импутер чисел, скейлер) обучаются
+    один раз на ключ содержимого: ключ стадии — хеш ключа ее входа и
+    параметров, поэтому общие префиксы сетки считаются однократно;
+  - DataFrame не копируется: стадии работают с блоками столбцов, матрица
+    признаков собирается один раз и масштабируется на месте;
+  - ячейки сетки энкодер x скейлер x модель оцениваются в пуле процессов,
+    матрицы передаются через файлы .npy, открытые как memmap;
+  - одна cross_validate с тремя метриками вместо трех cross_val_score.
+run_grid возвращает те же метрики, что run_full_pipeline из ноутбука, и
+время и прирост пикового RSS для каждой ячейки. Пиковый RSS процесса
+сбрасывается через /proc/self/clear_refs (Linux); на других системах
+память в отчете — nan.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.impute import SimpleImputer
+from sklearn.linear_model import ElasticNetCV, LassoCV, LinearRegression, RidgeCV
+from sklearn.model_selection import cross_validate
+from sklearn.preprocessing import MinMaxScaler, OneHotEncoder, OrdinalEncoder, RobustScaler, StandardScaler
+
+logger = logging.getLogger(__name__)
+
+# Метрики ноутбука: название -> scoring для cross_validate
+SCORING = {'R2': 'r2', 'MAE': 'neg_mean_absolute_error', 'RMSE': 'neg_root_mean_squared_error'}
+
+
+def default_encoders() -> Dict[str, Any]:
+    """Энкодеры ноутбука; CountEncoder — только если установлен category_encoders"""
+    encoders = {'OrdinalEncoder': OrdinalEncoder()}
+    try:
+        from category_encoders import CountEncoder
+    except ImportError:
+        logger.warning("category_encoders is not installed, CountEncoder is skipped")
+    else:
+        encoders['CountEncoder'] = CountEncoder()
+    encoders['OneHotEncoder'] = OneHotEncoder(handle_unknown='ignore', sparse_output=False)
+    return encoders
+
+
+def default_scalers() -> Dict[str, Any]:
+    return {'StandardScaler': StandardScaler(), 'RobustScaler': RobustScaler(), 'MinMaxScaler': MinMaxScaler()}
+
+
+def default_models() -> Dict[str, Any]:
+    return {'LinearRegression': LinearRegression(), 'RidgeCV': RidgeCV(),
+            'LassoCV': LassoCV(), 'ElasticNetCV': ElasticNetCV()}
+
+
+def content_key(frame: pd.DataFrame) -> str:
+    """Хеш содержимого таблицы: значений, индекса, имен и типов столбцов"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr([(str(column), str(dtype)) for column, dtype in frame.dtypes.items()]).encode())
+    digest.update(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def stage_key(parent: str, estimator: Any) -> str:
+    """Ключ стадии: ключ входа, класс и параметры оценщика"""
+    params = sorted((name, repr(value)) for name, value in estimator.get_params(deep=False).items())
+    identity = f"{parent}|{type(estimator).__module__}.{type(estimator).__qualname__}|{params!r}"
+    return hashlib.blake2b(identity.encode(), digest_size=16).hexdigest()
+
+
+class FittedStage(NamedTuple):
+    """Обученный оценщик и его результат на входе стадии"""
+    estimator: Any
+    output: np.ndarray
+
+
+class StageCache:
+    """
+    Обученные стадии по ключу (LRU)
+
+    Результаты стадий общие для всех, кто их получил, и не должны изменяться.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None):
+        """
+        :param max_entries: максимальное количество стадий (None — без ограничения)
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._stages: 'OrderedDict[str, FittedStage]' = OrderedDict()
+
+    def get_or_fit(self, key: str, fit: Callable[[], FittedStage]) -> FittedStage:
+        stage = self._stages.get(key)
+        if stage is not None:
+            self.hits += 1
+            self._stages.move_to_end(key)
+            return stage
+        self.misses += 1
+        stage = self._stages[key] = fit()
+        if self.max_entries is not None and len(self._stages) > self.max_entries:
+            self._stages.popitem(last=False)
+        return stage
+
+    def __len__(self) -> int:
+        return len(self._stages)
+
+    def clear(self) -> None:
+        self._stages.clear()
+
+
+class FeaturePipeline:
+    """
+    preprocess из ноутбука со стадиями в StageCache
+
+    Стадии и ключи:
+      - категории: SimpleImputer(most_frequent) по содержимому cat_cols;
+      - энкодер: по ключу категорий;
+      - числа: SimpleImputer(median) по содержимому остальных признаков
+        (в ноутбуке импутер обучается и на закодированных столбцах, но
+        пропусков в них нет, поэтому результат тот же);
+      - скейлер: по ключам энкодера и чисел.
+    Порядок столбцов как в ноутбуке: закодированные категории на своих
+    местах, а у OneHotEncoder — после остальных признаков.
+    """
+
+    def __init__(self, cat_cols: Sequence[str], target: str = 'price', cache: Optional[StageCache] = None):
+        self.cat_cols = list(cat_cols)
+        self.target = target
+        self.cache = cache if cache is not None else StageCache()
+
+    def transform(self, data: pd.DataFrame, encoder: Any, scaler: Any) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Матрица признаков и целевая переменная
+
+        :param data: исходная таблица (не изменяется и не копируется целиком)
+        :param encoder: энкодер категорий (обучается его копия)
+        :param scaler: скейлер (обучается его копия)
+        :return: X (общая с кэшем, только для чтения) и y
+        """
+        features = [column for column in data.columns if column != self.target]
+        numeric_cols = [column for column in features if column not in self.cat_cols]
+
+        cat_frame = data[self.cat_cols]
+        imputer = SimpleImputer(strategy='most_frequent')
+        categories_key = stage_key(content_key(cat_frame), imputer)
+        categories = self.cache.get_or_fit(categories_key, lambda: self._fit(imputer, cat_frame))
+
+        encoded_key = stage_key(categories_key, encoder)
+        encoded = self.cache.get_or_fit(encoded_key, lambda: self._fit(
+            clone(encoder), pd.DataFrame(categories.output, index=data.index, columns=self.cat_cols)
+        ))
+
+        numeric_frame = data[numeric_cols]
+        imputer = SimpleImputer(strategy='median')
+        numeric_key = stage_key(content_key(numeric_frame), imputer)
+        numeric = self.cache.get_or_fit(numeric_key, lambda: self._fit(imputer, numeric_frame))
+
+        scaled = self.cache.get_or_fit(
+            stage_key(encoded_key + numeric_key, scaler),
+            lambda: self._scale(scaler, features, numeric_cols, encoded.output, numeric.output,
+                                isinstance(encoder, OneHotEncoder)),
+        )
+        return scaled.output, data[self.target].to_numpy()
+
+    @staticmethod
+    def _fit(estimator: Any, frame: pd.DataFrame) -> FittedStage:
+        output = estimator.fit_transform(frame)
+        return FittedStage(estimator, output if isinstance(output, np.ndarray) else np.asarray(output))
+
+    def _scale(self, scaler: Any, features: Sequence[str], numeric_cols: Sequence[str],
+               encoded: np.ndarray, numeric: np.ndarray, appended: bool) -> FittedStage:
+        """Сборка матрицы признаков (одно выделение памяти) и масштабирование на месте"""
+        X = np.empty((len(numeric), len(numeric_cols) + encoded.shape[1]))
+        if appended:
+            X[:, :len(numeric_cols)] = numeric
+            X[:, len(numeric_cols):] = encoded
+        else:
+            is_categorical = np.isin(features, self.cat_cols)
+            X[:, ~is_categorical] = numeric
+            # Столбцы энкодера идут в порядке cat_cols, а в матрице — в порядке features
+            order = [self.cat_cols.index(column) for column in features if column in self.cat_cols]
+            X[:, is_categorical] = encoded[:, order]
+        scaler = clone(scaler)
+        if 'copy' in scaler.get_params():
+            scaler.set_params(copy=False)
+        return FittedStage(scaler, scaler.fit_transform(X))
+
+
+def evaluate(model: Any, X: np.ndarray, y: np.ndarray, cv: int = 5) -> Tuple[float, float, float]:
+    """
+    R2, MAE и RMSE кросс-валидации, как evaluate из ноутбука
+
+    Одна cross_validate с тремя метриками обучает модель cv раз, а не 3 * cv:
+    разбиения те же, поэтому результаты совпадают.
+    """
+    scores = cross_validate(model, X, y, cv=cv, scoring=SCORING)
+    return tuple(round(scores[f'test_{name}'].mean(), 4) for name in SCORING)
+
+
+class CellReport(NamedTuple):
+    """Метрики, время (с) и прирост пикового RSS (МБ) при оценке одной ячейки сетки"""
+    scores: Tuple[float, float, float]
+    seconds: float
+    peak_mb: float
+
+
+def evaluate_cell(model: Any, X_path: str, y_path: str, cv: int = 5) -> CellReport:
+    """Оценка модели на матрицах из файлов .npy (открываются как memmap, без копирования)"""
+    X = np.load(X_path, mmap_mode='r')
+    y = np.load(y_path, mmap_mode='r')
+    baseline = _reset_peak_rss()
+    started = time.perf_counter()
+    scores = evaluate(clone(model), X, y, cv)
+    return CellReport(scores, time.perf_counter() - started, _memory_mb('VmHWM') - baseline)
+
+
+def _reset_peak_rss() -> float:
+    """
+    Сброс пикового RSS процесса до текущего
+
+    tracemalloc замедляет обучение моделей в разы, а сброс пика бесплатен.
+
+    :return: текущий RSS (МБ) или nan, если /proc недоступен
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as clear_refs:
+            clear_refs.write('5')
+    except OSError:
+        return float('nan')
+    return _memory_mb('VmRSS')
+
+
+def _memory_mb(field: str) -> float:
+    """Поле VmRSS или VmHWM из /proc/self/status в МБ"""
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return float('nan')
+
+
+def run_grid(data: pd.DataFrame, cat_cols: Sequence[str], target: str = 'price',
+             encoders: Optional[Dict[str, Any]] = None, scalers: Optional[Dict[str, Any]] = None,
+             models: Optional[Dict[str, Any]] = None, workers: Optional[int] = None,
+             cache: Optional[StageCache] = None, cv: int = 5) -> pd.DataFrame:
+    """
+    Оценка всех комбинаций энкодер x скейлер x модель (run_full_pipeline из ноутбука)
+
+    Предобработка выполняется в текущем процессе (через кэш стадий), ячейки
+    оцениваются в пуле из workers процессов (1 — в текущем процессе).
+
+    :return: таблица с колонками model, encoder, scaler, R2, MAE, RMSE, время (с)
+        и прирост пикового RSS (МБ): preprocess_s, preprocess_peak_mb — подготовка
+        матрицы пары энкодер x скейлер (почти 0 при попадании в кэш), fit_s,
+        peak_mb — кросс-валидация ячейки
+    """
+    encoders = default_encoders() if encoders is None else encoders
+    scalers = default_scalers() if scalers is None else scalers
+    models = default_models() if models is None else models
+    workers = workers or os.cpu_count() or 1
+    pipeline = FeaturePipeline(cat_cols, target, cache)
+
+    cells, preprocessing = [], []
+    with tempfile.TemporaryDirectory() as directory:
+        y_path = os.path.join(directory, 'y.npy')
+        np.save(y_path, data[target].to_numpy())
+        for encoder_name, encoder in encoders.items():
+            for scaler_name, scaler in scalers.items():
+                baseline = _reset_peak_rss()
+                started = time.perf_counter()
+                X, _ = pipeline.transform(data, encoder, scaler)
+                preprocessing.append((time.perf_counter() - started, _memory_mb('VmHWM') - baseline))
+                X_path = os.path.join(directory, f'{encoder_name}-{scaler_name}.npy')
+                np.save(X_path, X)
+                for model_name in models:
+                    cells.append((encoder_name, scaler_name, model_name, len(preprocessing) - 1, X_path))
+
+        arguments = ([models[cell[2]] for cell in cells], [cell[4] for cell in cells],
+                     [y_path] * len(cells), [cv] * len(cells))
+        if workers == 1:
+            reports = list(map(evaluate_cell, *arguments))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                reports = list(pool.map(evaluate_cell, *arguments))
+
+    rows = []
+    for (encoder_name, scaler_name, model_name, pair, _), report in zip(cells, reports):
+        r2, mae, rmse = report.scores
+        rows.append({
+            'model': model_name, 'encoder': encoder_name, 'scaler': scaler_name,
+            'R2': r2, 'MAE': mae, 'RMSE': rmse,
+            'preprocess_s': preprocessing[pair][0], 'preprocess_peak_mb': preprocessing[pair][1],
+            'fit_s': report.seconds, 'peak_mb': report.peak_mb,
+        })
+    return pd.DataFrame(rows)